@@ -1,31 +1,556 @@
 import requests
+import hashlib
+import io
 import json
-import streamlit as st
+import mmap
+import os
 import config
+import json_stream
+import metrics
+import package_index
+import random
+import re
 import time
+import threading
 import traceback
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlparse
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_session = None
+_session_lock = threading.Lock()
 
 def get_session():
     """
-    Create a requests session with retry logic
+    Get the process-wide requests session used to talk to the backend
+
+    The session is created once and shared by every Streamlit session and rerun,
+    so connections to the backend are pooled and kept alive instead of paying a
+    new TCP+TLS handshake per migration.
     
     Returns:
-        requests.Session: Configured session with retry capabilities
+        requests.Session: Shared session with connection pooling
     """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+def _create_session():
     session = requests.Session()
-    retry_strategy = Retry(
-        total=5,
-        backoff_factor=2,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["POST", "GET"]
+    # Retries are handled by request_with_retry, so urllib3 must not retry on its own
+    adapter = TimedHTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=config.HTTP_POOL_SIZE
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
 
+class _TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        with metrics.span("connect", host=self.host):
+            return super()._new_conn()
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        started = time.perf_counter()
+        with metrics.span("connect", host=self.host):
+            sock = super()._new_conn()
+        self._tcp_seconds = time.perf_counter() - started
+        return sock
+
+    def connect(self):
+        # HTTPSConnection.connect opens the TCP connection first, the rest is the TLS handshake
+        self._tcp_seconds = 0
+        started = time.perf_counter()
+        super().connect()
+        metrics.record("tls", time.perf_counter() - started - self._tcp_seconds, started=started + self._tcp_seconds, host=self.host)
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that records "connect" and "tls" spans for new connections
+
+    Reused keep-alive connections record nothing, so the span counts also show
+    how often the pool had to open a connection.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+_backend_slots = {}
+
+def backend_slot(endpoint=None):
+    """
+    Get the semaphore that caps concurrent migrations against one backend host
+
+    Args:
+        endpoint: Backend URL, defaults to config.API_ENDPOINT
+
+    Returns:
+        threading.BoundedSemaphore: Shared by every migration sent to the same host
+    """
+    host = urlparse(endpoint or config.API_ENDPOINT).netloc
+    with _session_lock:
+        slot = _backend_slots.get(host)
+        if slot is None:
+            slot = _backend_slots[host] = threading.BoundedSemaphore(config.BACKEND_MAX_CONCURRENCY)
+    return slot
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without contacting the backend while its circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Fails requests to a backend host fast while it keeps failing
+
+    After config.CIRCUIT_FAILURE_THRESHOLD consecutive connection errors,
+    timeouts or 5xx responses the circuit opens and requests fail immediately.
+    After config.CIRCUIT_RESET_SECONDS one trial request is let through:
+    success closes the circuit again, failure keeps it open for another period.
+    A trial that ends without either, e.g. on an unexpected exception, is
+    released so the next request becomes the trial.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.time() - self.opened_at < config.CIRCUIT_RESET_SECONDS:
+                return "open"
+            return "half-open"
+
+    def before_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + config.CIRCUIT_RESET_SECONDS - time.time()
+            if remaining > 0 or self.trial_in_flight:
+                raise CircuitOpenError(
+                    f"SnapLogic backend unavailable after {self.failures} failed requests, "
+                    f"not contacting it for another {max(remaining, 0):.0f}s"
+                )
+            self.trial_in_flight = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= config.CIRCUIT_FAILURE_THRESHOLD or self.opened_at is not None:
+                if self.opened_at is None:
+                    metrics.record("circuit_open", 0.0, failures=self.failures)
+                self.opened_at = time.time()
+
+    def release_trial(self):
+        with self.lock:
+            self.trial_in_flight = False
+
+_circuit_breakers = {}
+
+def get_circuit_breaker(endpoint=None):
+    """
+    Get the circuit breaker shared by every request to one backend host
+
+    Args:
+        endpoint: Backend URL, defaults to config.API_ENDPOINT
+
+    Returns:
+        CircuitBreaker: Breaker for the host of the URL
+    """
+    host = urlparse(endpoint or config.API_ENDPOINT).netloc
+    with _session_lock:
+        breaker = _circuit_breakers.get(host)
+        if breaker is None:
+            breaker = _circuit_breakers[host] = CircuitBreaker()
+    return breaker
+
+# Methods that can be repeated safely; other requests are only retried with an Idempotency-Key
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+
+def request_with_retry(method, url, **kwargs):
+    """
+    Send a backend request through the retry layer shared by every API call
+
+    Connection errors, timeouts and the status codes in
+    config.API_RETRY_STATUS_CODES are retried up to config.API_MAX_RETRIES
+    times. The wait honors Retry-After and otherwise is an exponential backoff
+    with full jitter. POST requests are only retried when they carry an
+    Idempotency-Key header, so the backend can recognize a request it already
+    received instead of starting a second migration.
+
+    Args:
+        method: HTTP method
+        url: Absolute URL of the request
+        **kwargs: Passed to requests.Session.request; the body must be
+            re-readable (bytes, a dict, or StreamingMultipartBody)
+
+    Returns:
+        requests.Response: First response that is not retried, or the last
+            response once the retries are used up
+
+    Raises:
+        CircuitOpenError: While the circuit breaker of the backend host is open
+        requests.exceptions.RequestException: If no response was received
+    """
+    session = get_session()
+    breaker = get_circuit_breaker(url)
+    headers = kwargs.get("headers") or {}
+    max_retries = config.API_MAX_RETRIES
+    if method.upper() not in IDEMPOTENT_METHODS and "Idempotency-Key" not in headers:
+        max_retries = 0
+
+    attempt = 0
+    while True:
+        breaker.before_request()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            breaker.record_failure()
+            if attempt >= max_retries:
+                raise
+            delay = get_backoff_delay(attempt)
+            reason = e.__class__.__name__
+        except BaseException:
+            # Says nothing about the health of the host, but must not leave a trial request pending forever
+            breaker.release_trial()
+            raise
+        else:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                # A 429 counts as success: the host answered, it only asks to slow down
+                breaker.record_success()
+            if response.status_code not in config.API_RETRY_STATUS_CODES or attempt >= max_retries:
+                return response
+            delay = get_retry_after(response)
+            if delay is None:
+                delay = get_backoff_delay(attempt)
+            reason = response.status_code
+            response.close()
+        with metrics.span("retry_wait", method=method, url=url, attempt=attempt + 1, max_retries=max_retries, reason=reason, delay_s=round(delay, 3)):
+            time.sleep(delay)
+        attempt += 1
+
+def get_backoff_delay(attempt):
+    """
+    Get the jittered exponential backoff before a retry
+
+    Args:
+        attempt: Number of the failed attempt, starting at 0
+
+    Returns:
+        float: Seconds to wait, drawn uniformly up to the exponential cap
+    """
+    return random.uniform(0, min(config.API_RETRY_MAX_DELAY, config.API_RETRY_BASE_DELAY * 2 ** attempt))
+
+def get_retry_after(response):
+    """
+    Read the Retry-After header of a response
+
+    Args:
+        response: requests.Response
+
+    Returns:
+        float: Seconds to wait, capped at config.API_RETRY_MAX_DELAY, or None
+            if the header is missing or invalid
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0), config.API_RETRY_MAX_DELAY)
+
+def get_timeout():
+    """
+    Get the (connect, read) timeout applied to every backend request
+
+    Returns:
+        tuple: Connect and read timeouts in seconds
+    """
+    return (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+
+class StreamingMultipartBody:
+    """
+    multipart/form-data request body that reads the package in fixed-size chunks
+
+    The body is built lazily while requests sends it, so only one chunk of the
+    package is held in memory at a time instead of the whole ZIP. Because the
+    total length is known up front, the request is sent with a Content-Length
+    header rather than chunked transfer encoding.
+    """
+
+    def __init__(self, field_name, file_name, source, file_size, fields=None, chunk_size=None, progress_callback=None):
+        """
+        Args:
+            field_name: Name of the form field that carries the file
+            file_name: File name reported to the backend
+            source: Readable, seekable file-like object with the package bytes
+            file_size: Size of the package in bytes
+            fields: Optional dictionary of extra text form fields
+            chunk_size: Bytes read from the source per chunk
+            progress_callback: Optional callable(bytes_sent, bytes_total) invoked as chunks are sent
+        """
+        self.boundary = uuid.uuid4().hex
+        self.source = source
+        self.file_size = file_size
+        self.chunk_size = chunk_size or config.UPLOAD_CHUNK_SIZE
+        self.progress_callback = progress_callback
+
+        preamble = b""
+        for name, value in (fields or {}).items():
+            preamble += (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            ).encode("utf-8")
+        preamble += (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{file_name}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        self.preamble = preamble
+        self.epilogue = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+        # perf_counter() times of the last send, for the upload and server wait spans
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self.preamble) + self.file_size + len(self.epilogue)
+
+    def __iter__(self):
+        # Each chunk has been handed to the socket once the next one is requested
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        yield self.preamble
+        bytes_sent = 0
+        self.source.seek(0)
+        while True:
+            chunk = self.source.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+            bytes_sent += len(chunk)
+            if self.progress_callback:
+                self.progress_callback(bytes_sent, self.file_size)
+        yield self.epilogue
+        self.finished_at = time.perf_counter()
+
+class PackageFile(io.BufferedReader):
+    """
+    Package ZIP on disk that can be used wherever an uploaded file is expected
+
+    It exposes the same name and size attributes as Streamlit's UploadedFile,
+    but reads from disk instead of holding the package in memory. A mapped
+    package is read through a memory map, so its pages live in the OS page
+    cache, shared by every reader, rather than in this process's heap.
+    """
+
+    def __init__(self, path, name=None, mapped=False, sha256=None):
+        self._map = None
+        self._map_lock = threading.Lock()
+        raw = MappedFileIO(path) if mapped and os.path.getsize(path) else io.FileIO(path, "rb")
+        super().__init__(raw, buffer_size=config.UPLOAD_CHUNK_SIZE)
+        self.path = path
+        self.display_name = name or os.path.basename(path)
+        self.size = os.path.getsize(path)
+        # Known digest of the contents, e.g. computed while the upload was spooled
+        self.sha256 = sha256
+
+    @property
+    def name(self):
+        return self.display_name
+
+    def open_reader(self):
+        """
+        Open another reader of this package with its own position, e.g. for another thread
+
+        Readers share the memory map of the package (created here for
+        packages that are not mapped), so the file is not opened again by
+        path and stays readable even if it has been deleted meanwhile.
+
+        Returns:
+            io.BufferedReader: Reader to close before this package is closed
+        """
+        with self._map_lock:
+            if self._map is None:
+                if isinstance(self.raw, MappedFileIO):
+                    self._map = self.raw.map
+                else:
+                    self._map = mmap.mmap(self.fileno(), 0, access=mmap.ACCESS_READ)
+        return io.BufferedReader(MappedFileIO(self._map), buffer_size=config.UPLOAD_CHUNK_SIZE)
+
+    def close(self):
+        shared_map = getattr(self, "_map", None)
+        if shared_map is not None and not isinstance(self.raw, MappedFileIO):
+            shared_map.close()
+        super().close()
+
+class MappedFileIO(io.RawIOBase):
+    """
+    Read-only raw file that copies its reads out of a memory map
+    """
+
+    def __init__(self, source):
+        """
+        Args:
+            source: Path of the file to map, or a memory map shared with other
+                readers, which stays open when this reader is closed
+        """
+        super().__init__()
+        if isinstance(source, mmap.mmap):
+            self.map = source
+            self._owns_map = False
+        else:
+            with open(source, "rb") as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._owns_map = True
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.map[self._position:self._position + len(buffer)]
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self.map)
+        if offset < 0:
+            raise ValueError("Negative seek position")
+        self._position = offset
+        return offset
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        if not self.closed and self._owns_map:
+            self.map.close()
+        super().close()
+
+def get_upload_size(uploaded_file):
+    """
+    Get the size of an uploaded file without reading its contents
+
+    Args:
+        uploaded_file: The file uploaded by the user
+
+    Returns:
+        int: Size of the file in bytes
+    """
+    size = getattr(uploaded_file, "size", None)
+    if size is None:
+        position = uploaded_file.tell()
+        size = uploaded_file.seek(0, 2)
+        uploaded_file.seek(position)
+    return size
+
+def get_migration_options():
+    """
+    Get the migration settings sent with every package
+
+    Returns:
+        dict: Migration options
+    """
+    return {
+        "include_documentation": config.ENABLE_DOCUMENTATION,
+        "generate_mappings": config.ENABLE_FIELD_MAPPINGS,
+        "convert_transformations": config.ENABLE_TRANSFORMATIONS,
+        "analyze_dependencies": config.ENABLE_DEPENDENCY_ANALYSIS
+    }
+
+def get_option_fields(migration_options):
+    """
+    Convert migration options into the form fields of an upload
+
+    Args:
+        migration_options: Dictionary with migration settings
+
+    Returns:
+        dict: camelCase field names mapped to "true"/"false" or the value as text,
+            e.g. {"generateMappings": "true"}
+    """
+    fields = {}
+    for key, value in (migration_options or {}).items():
+        first, *rest = key.split("_")
+        name = first + "".join(part.capitalize() for part in rest)
+        fields[name] = ("true" if value else "false") if isinstance(value, bool) else str(value)
+    return fields
+
+def hash_upload(uploaded_file):
+    """
+    Compute the SHA-256 of an uploaded file, reading it in chunks
+
+    Packages spooled to disk already carry their digest and are not read again.
+
+    Args:
+        uploaded_file: The file uploaded by the user
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    if getattr(uploaded_file, "sha256", None):
+        return uploaded_file.sha256
+    digest = hashlib.sha256()
+    with metrics.span("hash") as span:
+        uploaded_file.seek(0)
+        while True:
+            chunk = uploaded_file.read(config.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+        uploaded_file.seek(0)
+        span["bytes"] = get_upload_size(uploaded_file)
+    return digest.hexdigest()
+
 def validate_file(uploaded_file):
     """
     Validate the uploaded file
@@ -36,6 +561,12 @@ def validate_file(uploaded_file):
     Returns:
         tuple: (is_valid, error_message)
     """
+    with metrics.span("validate") as span:
+        is_valid, error_message = _validate_file(uploaded_file)
+        span["valid"] = is_valid
+    return is_valid, error_message
+
+def _validate_file(uploaded_file):
     if uploaded_file is None:
         return False, "No file uploaded"
     
@@ -45,69 +576,375 @@ def validate_file(uploaded_file):
     
     # Check file size (convert MB to bytes)
     max_size_bytes = config.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-    if uploaded_file.size > max_size_bytes:
+    if get_upload_size(uploaded_file) > max_size_bytes:
         return False, f"File too large. Maximum size is {config.MAX_UPLOAD_SIZE_MB}MB."
     
+    return preflight_zip(uploaded_file)
+
+def preflight_zip(uploaded_file):
+    """
+    Check the ZIP structure of a package using only its central directory
+
+    Nothing is decompressed: entry counts, sizes and compression ratios all come
+    from the central directory, so broken archives and decompression bombs are
+    rejected before any network I/O.
+
+    Args:
+        uploaded_file: The file uploaded by the user
+
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    try:
+        uploaded_file.seek(0)
+        with zipfile.ZipFile(uploaded_file) as archive:
+            infos = archive.infolist()
+    except (zipfile.BadZipFile, OSError, EOFError) as e:
+        return False, f"The file is not a valid ZIP archive: {str(e)}"
+    finally:
+        uploaded_file.seek(0)
+
+    if len(infos) > config.MAX_ZIP_ENTRIES:
+        return False, f"The package contains {len(infos)} entries. Maximum is {config.MAX_ZIP_ENTRIES}."
+
+    total_size = 0
+    max_total_bytes = config.MAX_UNCOMPRESSED_SIZE_MB * 1024 * 1024
+    for info in infos:
+        name = info.filename
+        if name.startswith("/") or ".." in name.split("/"):
+            return False, f"The package contains an unsafe path: {name}"
+        if info.flag_bits & 0x1:
+            return False, f"The package contains an encrypted entry: {name}"
+
+        extension = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+        if not info.is_dir() and extension in config.NESTED_ARCHIVE_EXTENSIONS:
+            return False, f"Nested archives are not supported: {name}"
+
+        # Small entries compress extremely well without being dangerous, so only large ones are checked
+        if info.file_size >= config.MIN_RATIO_CHECK_SIZE and info.file_size > info.compress_size * config.MAX_COMPRESSION_RATIO:
+            return False, f"Suspicious compression ratio for {name}. The package may be a decompression bomb."
+
+        total_size += info.file_size
+        if total_size > max_total_bytes:
+            return False, f"The package is larger than {config.MAX_UNCOMPRESSED_SIZE_MB}MB when uncompressed."
+
+    if config.REQUIRE_MANIFEST and not any(
+        info.filename.rsplit("/", 1)[-1] == package_index.MANIFEST_NAME and info.filename.count("/") <= 1
+        for info in infos
+    ):
+        return False, f"No {package_index.MANIFEST_NAME} found. Please upload a Web Methods package ZIP."
+
     return True, ""
 
-def send_to_api(uploaded_file, migration_options):
+_upload_sessions = {}
+_upload_sessions_lock = threading.Lock()
+_chunked_unsupported = set()
+
+def get_uploads_url():
+    """
+    Get the URL below which the backend keeps chunked upload sessions
+
+    Returns:
+        str: Absolute URL of the upload sessions collection
+    """
+    return f"{config.API_ENDPOINT.rstrip('/')}/{config.CHUNKED_UPLOAD_PATH}"
+
+def upload_in_chunks(uploaded_file, file_size, headers, fields=None, progress_callback=None, idempotency_key=None):
+    """
+    Upload a package as parallel fixed-size chunks and finalize it with its checksum
+
+    When a chunk still fails after its retries, the upload session is kept per
+    package checksum, and the next attempt for the same package only sends the
+    chunks the backend has not acknowledged yet.
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        file_size: Size of the file in bytes
+        headers: Request headers with the authorization token
+        fields: Optional dictionary of text fields sent when finalizing
+        progress_callback: Optional callable(bytes_sent, bytes_total)
+        idempotency_key: Key of the migration, sent when opening and finalizing
+
+    Returns:
+        requests.Response: Response of the finalize request, which carries the
+            migration result like a single upload would, or None if the backend
+            does not support chunked uploads
+
+    Raises:
+        requests.exceptions.RequestException: If the upload could not be completed
+    """
+    uploads_url = get_uploads_url()
+    if uploads_url in _chunked_unsupported:
+        return None
+
+    idempotency_key = idempotency_key or uuid.uuid4().hex
+    trace_id = metrics.current_trace()
+    package_hash = hash_upload(uploaded_file)
+    upload = _open_upload_session(uploads_url, headers, uploaded_file.name, file_size, package_hash, idempotency_key)
+    if upload is None:
+        # The package is sent in one request instead
+        metrics.record("chunked_unsupported", 0.0, url=uploads_url)
+        _chunked_unsupported.add(uploads_url)
+        return None
+
+    upload_url = f"{uploads_url}/{upload['uploadId']}"
+    chunk_size = upload["chunkSize"]
+    chunk_count = max(1, -(-file_size // chunk_size))
+    received = set(upload["receivedChunks"])
+    pending = [index for index in range(chunk_count) if index not in received]
+
+    progress = {"bytes": sum(min(chunk_size, file_size - index * chunk_size) for index in received)}
+    progress_lock = threading.Lock()
+    read_lock = threading.Lock()
+    failed = threading.Event()
+    chunk_headers = dict(headers)
+    chunk_headers["Content-Type"] = "application/octet-stream"
+
+    def send_chunk(index):
+        if failed.is_set():
+            return
+        # Chunks are read when a worker picks them up, so at most one chunk per worker is in memory
+        with read_lock:
+            uploaded_file.seek(index * chunk_size)
+            data = uploaded_file.read(chunk_size)
+        request_headers = dict(chunk_headers)
+        request_headers["X-Chunk-Sha256"] = hashlib.sha256(data).hexdigest()
+
+        # PUT of a chunk index is idempotent, so the retry layer can repeat it as is
+        try:
+            with metrics.trace(trace_id), metrics.span("upload_chunk", index=index, bytes=len(data)) as span:
+                response = request_with_retry(
+                    "PUT",
+                    f"{upload_url}/chunks/{index}",
+                    data=data,
+                    headers=request_headers,
+                    timeout=get_timeout()
+                )
+                span["status_code"] = response.status_code
+            error = None if response.status_code in (200, 201, 204) else f"{response.status_code} - {response.text[:200]}"
+        except requests.exceptions.RequestException as e:
+            error = str(e)
+        if error:
+            failed.set()
+            raise requests.exceptions.RetryError(
+                f"Chunk {index + 1} of {chunk_count} failed: {error}. "
+                "Retrying the migration resumes the upload from the acknowledged chunks."
+            )
+
+        with progress_lock:
+            progress["bytes"] += len(data)
+            bytes_sent = progress["bytes"]
+        if progress_callback:
+            progress_callback(min(bytes_sent, file_size - 1), file_size)
+
+    try:
+        with metrics.span(
+            "upload", bytes=file_size, mode="chunked", upload_id=upload["uploadId"],
+            chunks=len(pending), total_chunks=chunk_count, resumed_chunks=len(received)
+        ):
+            with ThreadPoolExecutor(max_workers=config.CHUNKED_UPLOAD_PARALLELISM) as executor:
+                futures = [executor.submit(send_chunk, index) for index in pending]
+                for future in futures:
+                    future.result()
+
+        response = request_with_retry(
+            "POST",
+            f"{upload_url}/complete",
+            json={"sha256": package_hash, "fields": fields or {}},
+            headers=dict(headers, **{"Idempotency-Key": idempotency_key}),
+            timeout=get_timeout(),
+            stream=True
+        )
+        # The finalize request is tiny, so the time until its response headers is the backend working
+        metrics.record("server_wait", response.elapsed.total_seconds(), status_code=response.status_code)
+    except requests.exceptions.RequestException:
+        _save_upload_session(uploads_url, package_hash, upload["uploadId"])
+        raise
+    finally:
+        uploaded_file.seek(0)
+
+    if progress_callback:
+        progress_callback(file_size, file_size)
+    # Keep the session for a resume only if the backend failed before finishing it
+    if response.status_code >= 500:
+        _save_upload_session(uploads_url, package_hash, upload["uploadId"])
+    return response
+
+def _save_upload_session(uploads_url, package_hash, upload_id):
+    # Only failed uploads are remembered, so a concurrent upload never joins one in flight
+    with _upload_sessions_lock:
+        _upload_sessions[(uploads_url, package_hash)] = upload_id
+
+def _open_upload_session(uploads_url, headers, file_name, file_size, package_hash, idempotency_key):
+    # Resume a session opened earlier for the same package if the backend still has it
+    with _upload_sessions_lock:
+        upload_id = _upload_sessions.pop((uploads_url, package_hash), None)
+    if upload_id:
+        response = request_with_retry("GET", f"{uploads_url}/{upload_id}", headers=headers, timeout=get_timeout())
+        if response.status_code == 200:
+            upload = response.json()
+            upload.setdefault("uploadId", upload_id)
+            return upload
+
+    response = request_with_retry(
+        "POST",
+        uploads_url,
+        json={
+            "fileName": file_name,
+            "size": file_size,
+            "sha256": package_hash,
+            "chunkSize": config.CHUNKED_UPLOAD_CHUNK_SIZE,
+        },
+        headers=dict(headers, **{"Idempotency-Key": f"{idempotency_key}-open"}),
+        timeout=get_timeout()
+    )
+    if response.status_code in (404, 405, 501):
+        return None
+    response.raise_for_status()
+    try:
+        upload = response.json()
+    except ValueError:
+        upload = None
+    # A backend without upload sessions may answer any POST with a migration result
+    if not isinstance(upload, dict) or "uploadId" not in upload:
+        return None
+    upload.setdefault("chunkSize", config.CHUNKED_UPLOAD_CHUNK_SIZE)
+    upload.setdefault("receivedChunks", [])
+    return upload
+
+def send_to_api(uploaded_file, migration_options, progress_callback=None, extra_fields=None):
     """
     Send the uploaded file to the backend API for processing
+
+    Every stage is recorded as a timing span (see metrics.py) under a trace
+    named after the idempotency key of the migration.
     
     Args:
         uploaded_file: The file uploaded by the user
-        migration_options: Dictionary with migration settings (not used in API call)
+        migration_options: Dictionary with migration settings, sent as form fields
+        progress_callback: Optional callable(stage, stage_progress, message) receiving
+            upload progress and, if the backend reports it, server-side progress.
+            stage is "uploading" or "processing"; stage_progress is 0-100 or None.
+        extra_fields: Optional dictionary of text form fields sent along with the file
         
     Returns:
         dict: API response or error message
     """
+    # One key per migration, reused by every retry so the backend never starts it twice
+    idempotency_key = uuid.uuid4().hex
+    fields = dict(get_option_fields(migration_options), **(extra_fields or {}))
+    with metrics.trace(idempotency_key), metrics.span("send_to_api", endpoint=config.API_ENDPOINT) as span:
+        result = _send_package(uploaded_file, idempotency_key, span, progress_callback, fields)
+        span["success"] = result.get("success")
+    return result
+
+def _send_package(uploaded_file, idempotency_key, span, progress_callback, extra_fields):
     try:
-        # Using a regular session without retries
-        session = requests.Session()
-        files = {"file": (uploaded_file.name, uploaded_file.getvalue())}
         headers = {
             "Authorization": f"{config.API_BEARER_TOKEN}"
         }
+        file_size = get_upload_size(uploaded_file)
+        span["bytes"] = file_size
         
-        # Debug info
-        print(f"Using endpoint: {config.API_ENDPOINT}")
-        print(f"Auth header: {headers['Authorization'][:10]}...")
-        print(f"File size: {len(uploaded_file.getvalue())} bytes")
-        
+        def report(stage, stage_progress, message):
+            if progress_callback:
+                progress_callback(stage, stage_progress, message)
+
+        def on_upload_progress(bytes_sent, bytes_total):
+            if bytes_sent < bytes_total:
+                report(
+                    "uploading",
+                    int(bytes_sent * 100 / bytes_total),
+                    f"Uploading package... {bytes_sent / (1024 * 1024):.1f} of {bytes_total / (1024 * 1024):.1f} MB"
+                )
+            else:
+                report("processing", None, "Waiting for SnapLogic to process the package...")
+
         try:
-            # Single request with long timeout
-            response = session.post(
-                config.API_ENDPOINT,
-                files=files,
-                headers=headers
-            )
-            
-            # Debug: print status and content
-            print(f"Status code: {response.status_code}")
-            print(f"Response headers: {response.headers}")
-            
-            # Try to get response content for debugging
-            try:
-                content_preview = response.text[:500]
-                print(f"Response preview: {content_preview}")
-            except:
-                print("Could not get response preview")
+            report("uploading", 0, "Uploading package to SnapLogic...")
+            response = None
+            if config.CHUNKED_UPLOADS and file_size >= config.CHUNKED_UPLOAD_THRESHOLD_MB * 1024 * 1024:
+                response = upload_in_chunks(
+                    uploaded_file, file_size, headers,
+                    fields=extra_fields,
+                    progress_callback=on_upload_progress,
+                    idempotency_key=idempotency_key
+                )
+                span["mode"] = "chunked"
+            headers["Idempotency-Key"] = idempotency_key
+            if response is None and config.STREAM_UPLOADS:
+                # Stream the package in chunks instead of buffering the whole multipart body
+                span["mode"] = "stream"
+                body = StreamingMultipartBody(
+                    "file", uploaded_file.name, uploaded_file, file_size,
+                    fields=extra_fields,
+                    progress_callback=on_upload_progress
+                )
+                headers["Content-Type"] = body.content_type
+                response = request_with_retry(
+                    "POST",
+                    config.API_ENDPOINT,
+                    data=body,
+                    headers=headers,
+                    timeout=get_timeout(),
+                    stream=True
+                )
+                # The body records when the last byte was handed to the socket,
+                # everything after that is the backend working on the package
+                headers_received = time.perf_counter()
+                if body.finished_at is not None:
+                    metrics.record(
+                        "upload", body.finished_at - body.started_at,
+                        started=body.started_at, bytes=file_size, mode="stream"
+                    )
+                    metrics.record(
+                        "server_wait", headers_received - body.finished_at,
+                        started=body.finished_at, status_code=response.status_code
+                    )
+            elif response is None:
+                span["mode"] = "buffered"
+                files = {"file": (uploaded_file.name, uploaded_file.getvalue())}
+                response = request_with_retry(
+                    "POST",
+                    config.API_ENDPOINT,
+                    data=extra_fields,
+                    files=files,
+                    headers=headers,
+                    timeout=get_timeout(),
+                    stream=True
+                )
+                # requests sends a buffered body in one call, so upload and server wait cannot be told apart
+                metrics.record(
+                    "upload", response.elapsed.total_seconds(),
+                    bytes=file_size, mode="buffered", includes_server_wait=True
+                )
+            span["status_code"] = response.status_code
+
+            if response.status_code not in (200, 202, 204):
+                return {
+                    "success": False,
+                    "error": f"API Error: {response.status_code} - {read_response_preview(response)}"
+                }
+            data = read_json_response(response, report)
             
-            # Handle both 200 and 204 as success cases
-            if response.status_code in [200, 204]:
-                if response.status_code == 200:
-                    try:
-                        return {"success": True, "data": response.json()}
-                    except Exception as e:
-                        # Even if JSON parsing fails, still return success for 200
-                        return {"success": True, "data": {"message": "Migration completed successfully"}}
-                else:  # 204 case
-                    return {"success": True, "data": {"message": "Migration completed successfully"}}
-            else:
+            # The backend accepted the package and is processing it asynchronously
+            if response.status_code == 202:
+                status_url = _get_status_url(response, data)
+                if status_url:
+                    with metrics.span("server_wait", mode="async") as wait_span:
+                        result = wait_for_backend_job(status_url, headers, report)
+                        wait_span["success"] = result.get("success")
+                    return result
                 return {
                     "success": False,
-                    "error": f"API Error: {response.status_code} - {response.text[:1000]}"
+                    "error": f"API Error: 202 - {json.dumps(data)[:1000] if data is not None else ''}"
                 }
+
+            # Handle both 200 and 204 as success cases
+            if response.status_code == 200 and data is not None:
+                return {"success": True, "data": data}
+            # Even if JSON parsing fails, still return success for 200
+            return {"success": True, "data": {"message": "Migration completed successfully"}}
         except requests.exceptions.ConnectionError as e:
             print(f"Connection error: {str(e)}")
             return {"success": False, "error": f"Connection error: {str(e)}"}
@@ -120,6 +957,205 @@ def send_to_api(uploaded_file, migration_options):
         print(f"Unexpected error: {error_details}")
         return {"success": False, "error": f"Unexpected error: {str(e)}\n\nPlease check network settings and API configuration."}
 
+def read_json_response(response, report=None):
+    """
+    Read a JSON response body in chunks, parsing it while it arrives
+
+    Top-level fields are decoded as soon as they are complete, so summary
+    fields such as convertedServices are reported while a large pipelines
+    array is still downloading. Fields larger than RESPONSE_MAX_MEMBER_MB are
+    written to RESPONSE_SPOOL_DIR as they stream in and replaced by a
+    reference that json_stream.iter_members() reads back, so memory use is
+    bounded by that limit instead of by the size of the response.
+
+    Args:
+        response: Response of a request sent with stream=True
+        report: Optional callable(stage, stage_progress, message) for download progress
+
+    Returns:
+        The parsed document, or None if the body is empty or not a JSON object or array
+    """
+    try:
+        total = int(response.headers.get("Content-Length") or 0)
+    except ValueError:
+        total = 0
+    parser = json_stream.JsonStreamParser(
+        max_member_size=config.RESPONSE_MAX_MEMBER_MB * 1024 * 1024,
+        spill=open_response_spool
+    )
+    members = []
+    received = 0
+    parse_seconds = 0.0
+    last_report = time.perf_counter()
+    data = None
+
+    with metrics.span("download", status_code=response.status_code) as download_span:
+        try:
+            for chunk in response.iter_content(config.RESPONSE_CHUNK_SIZE):
+                received += len(chunk)
+                started = time.perf_counter()
+                try:
+                    new_members = parser.feed(chunk)
+                except ValueError:
+                    # Not a JSON object or array; there is nothing worth downloading
+                    parser = None
+                    break
+                finally:
+                    parse_seconds += time.perf_counter() - started
+                members.extend(new_members)
+                if report and started - last_report >= 0.25:
+                    last_report = started
+                    report("downloading", int(received * 100 / total) if total else None, _download_message(received, members))
+            if parser is not None and received:
+                parser.close()
+                if parser.kind == "object":
+                    data = dict(members)
+                else:
+                    data = [value for _, value in members]
+        except ValueError:
+            data = None
+        finally:
+            response.close()
+        download_span["bytes"] = received
+    metrics.record("parse", parse_seconds, json=data is not None, members=len(members))
+    return data
+
+def _download_message(received, members):
+    message = f"Receiving migration result... {received / (1024 * 1024):.1f} MB"
+    for key, value in members:
+        if key == "convertedServices" and isinstance(value, int):
+            message += f" • {value} services converted"
+    return message
+
+def read_response_preview(response, limit=1000):
+    """
+    Read the start of a response body, e.g. for an error message
+
+    Only the first chunk is downloaded, so a large error page is not buffered.
+
+    Args:
+        response: Response of a request sent with stream=True or not
+        limit: Maximum number of characters returned
+
+    Returns:
+        str: Start of the body
+    """
+    try:
+        chunk = next(response.iter_content(max(limit, 1024)), b"")
+    except StopIteration:
+        chunk = b""
+    finally:
+        response.close()
+    if isinstance(chunk, bytes):
+        chunk = chunk.decode(response.encoding or "utf-8", errors="replace")
+    return chunk[:limit]
+
+def open_response_spool(name):
+    """
+    Create a file in RESPONSE_SPOOL_DIR for a result field that is too large for memory
+
+    Files older than RESULT_CACHE_TTL_SECONDS are removed first, as no
+    cached result refers to them any more.
+
+    Args:
+        name: Field name or index, used in the file name
+
+    Returns:
+        file: Text file opened for writing
+    """
+    os.makedirs(config.RESPONSE_SPOOL_DIR, exist_ok=True)
+    _purge_response_spool()
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", str(name))[:64]
+    path = os.path.join(config.RESPONSE_SPOOL_DIR, f"{uuid.uuid4().hex}-{safe_name}.json")
+    return open(path, "w", encoding="utf-8")
+
+def _purge_response_spool():
+    cutoff = time.time() - config.RESULT_CACHE_TTL_SECONDS
+    try:
+        entries = list(os.scandir(config.RESPONSE_SPOOL_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+def _read_spooled_result(reference):
+    parser = json_stream.JsonStreamParser(
+        max_member_size=config.RESPONSE_MAX_MEMBER_MB * 1024 * 1024,
+        spill=open_response_spool
+    )
+    members = []
+    with open(reference[json_stream.SPOOLED_KEY], "rb") as f:
+        while True:
+            chunk = f.read(config.RESPONSE_CHUNK_SIZE)
+            if not chunk:
+                break
+            members.extend(parser.feed(chunk))
+    parser.close()
+    os.remove(reference[json_stream.SPOOLED_KEY])
+    if parser.kind == "object":
+        return dict(members)
+    return [value for _, value in members]
+
+def _get_status_url(response, data):
+    status_url = response.headers.get("Location")
+    if not status_url and isinstance(data, dict):
+        status_url = data.get("statusUrl")
+    return urljoin(config.API_ENDPOINT, status_url) if status_url else None
+
+def wait_for_backend_job(status_url, headers, report):
+    """
+    Poll the status URL of an asynchronous backend migration until it finishes
+
+    The status document is expected to carry a "status" field and may carry
+    "progress" (0-100), "message" or "stage", and "result" or "error".
+
+    Args:
+        status_url: Absolute URL returned by the backend for the migration
+        headers: Request headers with the authorization token
+        report: Callable(stage, stage_progress, message) for progress updates
+
+    Returns:
+        dict: API response or error message
+    """
+    deadline = time.time() + config.BACKEND_JOB_TIMEOUT
+    while time.time() < deadline:
+        response = request_with_retry(
+            "GET",
+            status_url,
+            headers={"Authorization": headers["Authorization"]},
+            timeout=get_timeout(),
+            stream=True
+        )
+        if response.status_code != 200:
+            return {
+                "success": False,
+                "error": f"API Error: {response.status_code} - {read_response_preview(response)}"
+            }
+        status = read_json_response(response, report)
+        if not isinstance(status, dict):
+            return {"success": False, "error": "The backend returned an invalid job status"}
+        state = str(status.get("status", "")).lower()
+        if state in ("completed", "succeeded", "success"):
+            result = status.get("result", status)
+            if json_stream.is_spooled(result):
+                # The whole result was too large to keep in memory; split it into its fields
+                result = _read_spooled_result(result)
+            return {"success": True, "data": result}
+        if state in ("failed", "error"):
+            return {"success": False, "error": status.get("error") or status.get("message") or "Migration failed on the server"}
+
+        report(
+            "processing",
+            status.get("progress"),
+            status.get("message") or status.get("stage") or "SnapLogic is processing the package..."
+        )
+        time.sleep(get_retry_after(response) or config.JOB_POLL_INTERVAL)
+    return {"success": False, "error": "Timed out waiting for the migration to finish on the server."}
+
 def simulate_processing(migration_options):
     """
     Simulate API processing for demo purposes
@@ -0,0 +1,398 @@
+# Artifact store for the Web Methods to SnapLogic Migration Accelerator
+#
+# Generated SnapLogic pipelines are saved as .slp files in a content-addressed
+# store: every file lives once under the SHA-256 of its bytes, so a pipeline
+# that several migrations produce identically is stored once. A migration is
+# a small manifest listing the paths and hashes of its files.
+#
+# By default the app hands the ZIP to st.download_button, which works wherever
+# the app does but keeps the whole file in server memory. Deployments that set
+# ARTIFACT_DOWNLOAD_URL route it, e.g. through their reverse proxy, to a small
+# HTTP server next to Streamlit instead, which builds the ZIP while it sends
+# it, a few hundred KB at a time. That server has no authentication of its
+# own: every link carries an unguessable token, handed to one session, that
+# opens one migration and expires after ARTIFACT_LINK_TTL_SECONDS.
+import hashlib
+import io
+import json
+import os
+import re
+import secrets
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import config
+import json_stream
+
+COPY_BUFFER_SIZE = 256 * 1024
+
+# Fields of a pipeline item that hold the .slp document itself
+PIPELINE_CONTENT_KEYS = ("slp", "pipeline", "content")
+
+_MANIFEST_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+_DOWNLOAD_RE = re.compile(r"^/artifacts/(?P<token>[A-Za-z0-9_-]{32,})\.zip$")
+_UNSAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# Fixed entry timestamp, so the same manifest always produces the same ZIP
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_lock = threading.Lock()
+_server = None
+# Token of every download link mapped to its manifest id, session and expiry
+_links = {}
+
+def store_result(data, package_name):
+    """
+    Save the pipelines of a migration result in the artifact store
+
+    Pipelines are read from the "pipelines" field, which may be a list, a
+    dictionary keyed by name, or a list written to disk while the result
+    downloaded (see json_stream). An item's "slp", "pipeline" or "content"
+    field is stored as the .slp document if present, otherwise the item itself.
+
+    Args:
+        data: The "data" field of a successful API response
+        package_name: File name of the migrated package
+
+    Returns:
+        dict: Manifest id, file count, total bytes and newly stored bytes,
+            or None if the result holds no pipelines
+    """
+    pipelines = data.get("pipelines") if isinstance(data, dict) else None
+    if not pipelines:
+        return None
+
+    objects_dir = os.path.join(config.ARTIFACT_STORE_DIR, "objects")
+    files = []
+    used_paths = set()
+    new_bytes = 0
+    with _lock:
+        for name, item in _iter_pipelines(pipelines):
+            content = _pipeline_content(item)
+            digest = hashlib.sha256(content).hexdigest()
+            path = _unique_path(f"pipelines/{_safe_name(name)}.slp", used_paths)
+            object_path = os.path.join(objects_dir, digest[:2], digest)
+            if not os.path.exists(object_path):
+                _write_atomic(object_path, content)
+                new_bytes += len(content)
+            files.append({"path": path, "sha256": digest, "size": len(content)})
+
+        manifest = {"package": package_name, "files": files}
+        manifest_bytes = json.dumps(manifest, sort_keys=True).encode("utf-8")
+        manifest_id = hashlib.sha256(manifest_bytes).hexdigest()
+        manifest_path = _manifest_path(manifest_id)
+        if os.path.exists(manifest_path):
+            # Identical migration; refresh it so it expires with the newest result
+            os.utime(manifest_path)
+        else:
+            _write_atomic(manifest_path, manifest_bytes)
+            _purge_expired()
+
+    return {
+        "id": manifest_id,
+        "files": len(files),
+        "bytes": sum(entry["size"] for entry in files),
+        "new_bytes": new_bytes,
+    }
+
+def load_manifest(manifest_id):
+    """
+    Load the file list of a stored migration
+
+    Args:
+        manifest_id: Id returned by store_result
+
+    Returns:
+        dict: Package name and files, or None if the id is unknown or expired
+    """
+    if not _MANIFEST_ID_RE.match(manifest_id or ""):
+        return None
+    try:
+        with open(_manifest_path(manifest_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def iter_zip(manifest):
+    """
+    Build the ZIP of a stored migration while it is being consumed
+
+    Args:
+        manifest: Manifest returned by load_manifest
+
+    Yields:
+        bytes: Consecutive blocks of the ZIP archive
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for entry in manifest["files"]:
+            info = zipfile.ZipInfo(entry["path"], date_time=_ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            # Lets zipfile decide on ZIP64 up front, as it cannot seek back in a stream
+            info.file_size = entry["size"]
+            with archive.open(info, "w") as member, open(_object_path(entry["sha256"]), "rb") as f:
+                while True:
+                    chunk = f.read(COPY_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    member.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain(final=True)
+
+def write_zip(manifest_id, output):
+    """
+    Write the ZIP of a stored migration to a file
+
+    Args:
+        manifest_id: Id returned by store_result
+        output: Writable binary file
+
+    Returns:
+        dict: Success status, or error message if the id is unknown
+    """
+    manifest = load_manifest(manifest_id)
+    if manifest is None:
+        return {"success": False, "error": f"No stored pipelines for {manifest_id}"}
+    size = 0
+    for block in iter_zip(manifest):
+        output.write(block)
+        size += len(block)
+    return {"success": True, "files": len(manifest["files"]), "bytes": size}
+
+def read_zip(manifest_id):
+    """
+    Build the ZIP of a stored migration in memory, e.g. for st.download_button
+
+    Args:
+        manifest_id: Id returned by store_result
+
+    Returns:
+        dict: File name and bytes ("data") of the ZIP, or None if the id is
+            unknown or expired
+    """
+    manifest = load_manifest(manifest_id)
+    if manifest is None:
+        return None
+    return {"file_name": _zip_file_name(manifest), "data": b"".join(iter_zip(manifest))}
+
+def get_download_url(manifest_id, session_id):
+    """
+    Get a link to the ZIP of a stored migration on the download server
+
+    Links are only handed out when config.ARTIFACT_DOWNLOAD_URL is set, as
+    the server is not reachable from other machines otherwise. A session
+    gets the same link again until half of its lifetime has passed. Starts
+    the download server on first use.
+
+    Args:
+        manifest_id: Id returned by store_result
+        session_id: Browser session the link is for
+
+    Returns:
+        str: Download URL, or None if downloads go through Streamlit, the
+            server could not be started, or the migration is no longer stored
+    """
+    if not config.ARTIFACT_DOWNLOAD_URL or load_manifest(manifest_id) is None:
+        return None
+    if start_download_server() is None:
+        return None
+    now = time.time()
+    with _lock:
+        for token in [token for token, link in _links.items() if link["expires_at"] < now]:
+            del _links[token]
+        token = next(
+            (
+                token for token, link in _links.items()
+                if link["manifest_id"] == manifest_id and link["session_id"] == session_id
+                and link["expires_at"] - now > config.ARTIFACT_LINK_TTL_SECONDS / 2
+            ),
+            None
+        )
+        if token is None:
+            token = secrets.token_urlsafe(32)
+            _links[token] = {
+                "manifest_id": manifest_id,
+                "session_id": session_id,
+                "expires_at": now + config.ARTIFACT_LINK_TTL_SECONDS,
+            }
+    return f"{config.ARTIFACT_DOWNLOAD_URL.rstrip('/')}/artifacts/{token}.zip"
+
+def resolve_download(token):
+    """
+    Find the migration a download link opens
+
+    Args:
+        token: Token of a link returned by get_download_url
+
+    Returns:
+        str: Manifest id, or None if the token is unknown or expired
+    """
+    with _lock:
+        link = _links.get(token)
+    if link is None or link["expires_at"] < time.time():
+        return None
+    return link["manifest_id"]
+
+class DownloadRequestHandler(BaseHTTPRequestHandler):
+    server_version = "WmToSlArtifacts/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        match = _DOWNLOAD_RE.match(unquote(self.path.split("?", 1)[0]))
+        manifest_id = resolve_download(match.group("token")) if match else None
+        manifest = load_manifest(manifest_id) if manifest_id else None
+        if manifest is None:
+            self.send_error(404, "Unknown or expired download link")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", f'attachment; filename="{_zip_file_name(manifest)}"')
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        try:
+            for block in iter_zip(manifest):
+                self.wfile.write(block)
+        except (BrokenPipeError, ConnectionResetError):
+            # The browser cancelled the download
+            pass
+
+def start_download_server():
+    """
+    Start the artifact download server on a background thread, once per process
+
+    Returns:
+        ThreadingHTTPServer: The running server, or None if the port is taken,
+            e.g. by another instance of the app, which would not know the
+            links of this one
+    """
+    global _server
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(
+                    (config.ARTIFACT_SERVER_HOST, config.ARTIFACT_SERVER_PORT),
+                    DownloadRequestHandler
+                )
+            except OSError as e:
+                print(f"Could not start the artifact download server: {str(e)}")
+                return None
+            _server.daemon_threads = True
+            thread = threading.Thread(target=_server.serve_forever, name="artifact-downloads", daemon=True)
+            thread.start()
+    return _server
+
+class _ZipSink(io.RawIOBase):
+    # Write-only, unseekable target that hands the written blocks to iter_zip
+    def __init__(self):
+        self.blocks = []
+        self.pending = 0
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.blocks.append(bytes(data))
+        self.pending += len(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self, final=False):
+        # Small entries are passed on together, so a socket gets few large writes
+        if not self.blocks or (self.pending < COPY_BUFFER_SIZE and not final):
+            return []
+        block = b"".join(self.blocks)
+        self.blocks = []
+        self.pending = 0
+        return [block]
+
+def _iter_pipelines(pipelines):
+    if json_stream.is_spooled(pipelines):
+        items = json_stream.iter_members(pipelines)
+    elif isinstance(pipelines, dict):
+        items = pipelines.items()
+    else:
+        items = enumerate(pipelines)
+    for key, item in items:
+        name = key
+        if not isinstance(key, str):
+            name = (item.get("name") or item.get("service")) if isinstance(item, dict) else None
+            name = name or f"pipeline_{key}"
+        yield str(name), item
+
+def _pipeline_content(item):
+    if isinstance(item, dict):
+        for key in PIPELINE_CONTENT_KEYS:
+            if key in item:
+                item = item[key]
+                break
+    if isinstance(item, str):
+        return item.encode("utf-8")
+    return json.dumps(item, indent=2).encode("utf-8")
+
+def _zip_file_name(manifest):
+    return f"{_safe_name(os.path.splitext(manifest.get('package') or 'migration')[0])}-snaplogic.zip"
+
+def _safe_name(name):
+    return _UNSAFE_NAME_RE.sub("_", name).strip("._") or "pipeline"
+
+def _unique_path(path, used_paths):
+    stem, extension = os.path.splitext(path)
+    candidate = path
+    counter = 2
+    while candidate.lower() in used_paths:
+        candidate = f"{stem}_{counter}{extension}"
+        counter += 1
+    used_paths.add(candidate.lower())
+    return candidate
+
+def _object_path(digest):
+    return os.path.join(config.ARTIFACT_STORE_DIR, "objects", digest[:2], digest)
+
+def _manifest_path(manifest_id):
+    return os.path.join(config.ARTIFACT_STORE_DIR, "manifests", f"{manifest_id}.json")
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def _purge_expired():
+    # Drop migrations older than the result cache, then the files no migration refers to
+    manifests_dir = os.path.join(config.ARTIFACT_STORE_DIR, "manifests")
+    cutoff = time.time() - config.RESULT_CACHE_TTL_SECONDS
+    removed = False
+    referenced = set()
+    for entry in os.scandir(manifests_dir):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed = True
+                continue
+            with open(entry.path, "r", encoding="utf-8") as f:
+                referenced.update(file["sha256"] for file in json.load(f)["files"])
+        except (OSError, ValueError, KeyError):
+            continue
+    if not removed:
+        return
+
+    objects_dir = os.path.join(config.ARTIFACT_STORE_DIR, "objects")
+    for root, _, names in os.walk(objects_dir):
+        for name in names:
+            if name not in referenced and not name.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(root, name))
+                except OSError:
+                    pass
@@ -0,0 +1,135 @@
+# Static asset pipeline for the Web Methods to SnapLogic Migration Accelerator
+#
+# All app CSS lives in styles.css. It is read once per process, minified,
+# stripped of duplicate rules and tagged with a content hash, so a session
+# only has to receive it when the hash changes instead of on every rerun.
+import hashlib
+import io
+import json
+import os
+import re
+from functools import lru_cache
+
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "styles.css")
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_WHITESPACE_RE = re.compile(r"\s+")
+_PUNCTUATION_RE = re.compile(r"\s*([{};,>])\s*")
+_COLON_RE = re.compile(r":\s+")
+
+def minify_css(css):
+    """
+    Minify CSS and drop duplicate top-level rules
+
+    When the same rule appears more than once only the last copy is kept,
+    which leaves the cascade unchanged.
+
+    Args:
+        css: Stylesheet source
+
+    Returns:
+        str: Minified stylesheet
+    """
+    css = _COMMENT_RE.sub("", css)
+    css = _WHITESPACE_RE.sub(" ", css)
+    css = _PUNCTUATION_RE.sub(r"\1", css)
+    # Spaces before ":" are kept because "a :hover" and "a:hover" are different selectors
+    css = _COLON_RE.sub(":", css)
+    css = css.replace(";}", "}")
+
+    rules = _split_rules(css)
+    last_index = {rule: index for index, rule in enumerate(rules)}
+    return "".join(rule for index, rule in enumerate(rules) if last_index[rule] == index)
+
+@lru_cache(maxsize=None)
+def get_stylesheet(path=STYLESHEET_PATH):
+    """
+    Load the minified stylesheet and its content hash
+
+    Args:
+        path: Path of the CSS source file
+
+    Returns:
+        tuple: (minified_css, content_hash)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        css = minify_css(f.read())
+    return css, hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+
+def get_style_injector(path=STYLESHEET_PATH):
+    """
+    Build an HTML snippet that adds the stylesheet to the parent page once
+
+    The snippet runs inside a Streamlit component iframe and writes a <style>
+    element tagged with the content hash into the app page. Styles from an
+    older hash are replaced, and nothing happens if the current one is present.
+
+    Args:
+        path: Path of the CSS source file
+
+    Returns:
+        tuple: (html_snippet, content_hash)
+    """
+    css, content_hash = get_stylesheet(path)
+    # Escape "</" so the CSS cannot terminate the script element
+    css_literal = json.dumps(css).replace("</", "<\\/")
+    html = f"""<script>
+const doc = window.parent.document;
+const styleId = "wmtosl-styles-{content_hash}";
+if (!doc.getElementById(styleId)) {{
+    doc.querySelectorAll("style[id^='wmtosl-styles-']").forEach((element) => element.remove());
+    const style = doc.createElement("style");
+    style.id = styleId;
+    style.textContent = {css_literal};
+    doc.head.appendChild(style);
+}}
+</script>"""
+    return html, content_hash
+
+@lru_cache(maxsize=None)
+def get_image(path, width=None):
+    """
+    Load an image, scaled down to a display width once per process
+
+    Streamlit re-encodes images wider than the requested width on every
+    rerun, so images are resized here and the result is kept.
+
+    Args:
+        path: Path of the image file
+        width: Display width in pixels, or None to keep the original size
+
+    Returns:
+        bytes: Image file contents
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if width is None:
+        return data
+
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    if image.width <= width:
+        return data
+    image = image.resize((width, int(image.height * width / image.width)), resample=Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format=image.format or "PNG")
+    return output.getvalue()
+
+def _split_rules(css):
+    # Split minified CSS into top-level rules, keeping @media/@keyframes blocks whole
+    rules = []
+    depth = 0
+    start = 0
+    for index, char in enumerate(css):
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append(css[start:index + 1].strip())
+                start = index + 1
+    tail = css[start:].strip()
+    if tail:
+        rules.append(tail)
+    return rules
@@ -0,0 +1,227 @@
+# Batch migrations for the Web Methods to SnapLogic Migration Accelerator
+#
+# A batch is a list of packages that each go through validate -> upload ->
+# result as an ordinary background job. Validation and submission run on a
+# helper thread so the caller returns immediately; the jobs then share the
+# job worker pool and the per-backend concurrency cap, so total wall-clock
+# time scales with concurrency instead of with the number of packages.
+import os
+import threading
+import time
+import traceback
+import uuid
+
+import api_helpers
+import config
+import jobs
+
+_batches = {}
+_lock = threading.Lock()
+
+def collect_packages(paths):
+    """
+    Expand file and directory paths into package files
+
+    Directories are searched recursively for ZIP files. Only the paths are
+    collected; submit_batch opens each package when it is submitted and its
+    job opens it again when it runs, so a batch of any size holds just a few
+    files open at a time.
+
+    Args:
+        paths: List of ZIP file or directory paths
+
+    Returns:
+        list: Paths of the package files, sorted
+    """
+    package_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, file_names in os.walk(path):
+                package_paths.extend(
+                    os.path.join(directory, file_name)
+                    for file_name in file_names
+                    if file_name.split(".")[-1].lower() in config.SUPPORTED_FILE_TYPES
+                )
+        else:
+            package_paths.append(path)
+    return sorted(package_paths)
+
+def submit_batch(packages, migration_options, force=False, owner=None):
+    """
+    Validate and submit a list of packages in the background
+
+    Args:
+        packages: List of uploaded files, api_helpers.PackageFile objects or
+            paths of package files, which are only opened while needed
+        migration_options: Dictionary with migration settings
+        force: Skip the result cache and delta migrations
+        owner: Session the jobs belong to for fair scheduling (see jobs.submit_job);
+            defaults to the batch itself
+
+    Returns:
+        str: Id of the batch
+    """
+    batch_id = uuid.uuid4().hex
+    items = [
+        {
+            "name": os.path.basename(package) if isinstance(package, str) else package.name,
+            "size": os.path.getsize(package) if isinstance(package, str) else api_helpers.get_upload_size(package),
+            "status": "pending",
+            "job_id": None,
+            "error": None,
+        }
+        for package in packages
+    ]
+    with _lock:
+        _purge_expired_batches()
+        _batches[batch_id] = {
+            "id": batch_id,
+            "items": items,
+            "created_at": time.time(),
+            "submitted_at": None,
+        }
+
+    thread = threading.Thread(
+        target=_submit_items,
+        args=(batch_id, packages, migration_options, force, owner or f"batch:{batch_id}"),
+        name=f"migration-batch-{batch_id[:8]}",
+        daemon=True
+    )
+    thread.start()
+    return batch_id
+
+def get_batch(batch_id, include_results=False):
+    """
+    Get the consolidated state of a batch
+
+    Args:
+        batch_id: Id returned by submit_batch
+        include_results: Add the full API response of each package to its row
+
+    Returns:
+        dict: Batch with one row per package and overall counts, or None if unknown
+    """
+    with _lock:
+        batch = _batches.get(batch_id)
+        if batch is None:
+            return None
+        items = [dict(item) for item in batch["items"]]
+        created_at = batch["created_at"]
+
+    rows = []
+    finished_at = created_at
+    # One snapshot of all jobs, so the queue schedule is estimated once per batch
+    job_ids = [item["job_id"] for item in items if item["job_id"]]
+    job_states = dict(zip(job_ids, jobs.get_jobs(job_ids)))
+    for item in items:
+        row = {
+            "package": item["name"],
+            "size_mb": round(item["size"] / (1024 * 1024), 2),
+            "status": item["status"],
+            "progress": 100 if item["status"] == "invalid" else 0,
+            "message": item["error"] or "",
+            "duration_s": None,
+            "source": "",
+        }
+        job = job_states.get(item["job_id"])
+        if job is not None:
+            result = job["result"] or {}
+            row["status"] = job["status"]
+            row["progress"] = job["progress"]
+            row["message"] = job["message"]
+            if job["status"] == "failed":
+                row["message"] = result.get("error") or job["message"]
+            if job["finished_at"] is not None:
+                row["duration_s"] = round(job["finished_at"] - job["created_at"], 1)
+                finished_at = max(finished_at, job["finished_at"])
+            if result.get("cached"):
+                row["source"] = "cache"
+            elif (result.get("delta") or {}).get("mode"):
+                row["source"] = result["delta"]["mode"]
+            elif result:
+                row["source"] = "full"
+        if include_results:
+            row["result"] = job["result"] if job is not None else None
+        rows.append(row)
+
+    counts = {}
+    for row in rows:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    done = all(row["status"] in ("completed", "failed", "invalid") for row in rows)
+    return {
+        "id": batch_id,
+        "rows": rows,
+        "counts": counts,
+        "done": done,
+        "elapsed_s": round((finished_at if done else time.time()) - created_at, 1),
+    }
+
+def wait_for_batch(batch_id, poll_interval=None, include_results=False):
+    """
+    Block until every package of a batch has finished
+
+    Args:
+        batch_id: Id returned by submit_batch
+        poll_interval: Seconds between checks, defaults to config.JOB_POLL_INTERVAL
+        include_results: Add the full API response of each package to its row
+
+    Returns:
+        dict: Final state of the batch as returned by get_batch
+    """
+    while True:
+        batch = get_batch(batch_id, include_results=include_results)
+        if batch is None or batch["done"]:
+            return batch
+        time.sleep(poll_interval or config.JOB_POLL_INTERVAL)
+
+def _set_item(batch_id, index, **fields):
+    with _lock:
+        batch = _batches.get(batch_id)
+        if batch is not None:
+            batch["items"][index].update(fields)
+
+def _submit_items(batch_id, packages, migration_options, force, owner):
+    for index, package in enumerate(packages):
+        _set_item(batch_id, index, status="validating")
+        # Packages given by path are closed again once submitted; their job reopens them
+        on_disk = isinstance(package, str)
+        name = package if on_disk else package.name
+        try:
+            if on_disk:
+                package = api_helpers.PackageFile(package)
+            try:
+                is_valid, error_message = api_helpers.validate_file(package)
+                if not is_valid:
+                    _set_item(batch_id, index, status="invalid", error=error_message)
+                    continue
+                job_id = jobs.submit_job(
+                    package, migration_options, force=force, owner=owner,
+                    reopen=_reopener(package) if on_disk else None
+                )
+                _set_item(batch_id, index, status="queued", job_id=job_id)
+            finally:
+                if on_disk:
+                    package.close()
+        except Exception as e:
+            print(f"Could not submit {name}: {traceback.format_exc()}")
+            _set_item(batch_id, index, status="failed", error=f"Unexpected error: {str(e)}")
+
+    with _lock:
+        batch = _batches.get(batch_id)
+        if batch is not None:
+            batch["submitted_at"] = time.time()
+
+def _reopener(package):
+    # Open a package on disk again when its job starts, keeping the digest computed on submission
+    return lambda: api_helpers.PackageFile(package.path, sha256=package.sha256)
+
+def _purge_expired_batches():
+    # A batch expires once all of its jobs have expired
+    cutoff = time.time() - config.JOB_RETENTION_SECONDS
+    expired = [
+        batch_id for batch_id, batch in _batches.items()
+        if batch["submitted_at"] is not None and batch["submitted_at"] < cutoff
+        and not any(jobs.get_jobs([item["job_id"] for item in batch["items"] if item["job_id"]]))
+    ]
+    for batch_id in expired:
+        del _batches[batch_id]
@@ -0,0 +1,403 @@
+# Benchmarks for the Web Methods to SnapLogic Migration Accelerator
+#
+# Measures the validate -> hash/index -> upload path on synthetic packages of
+# several sizes and at several concurrency levels, against a local mock backend
+# started in-process. Every case reports throughput, p50/p95/p99 latency and
+# peak RSS, and the report is written as JSON so two runs can be compared:
+#
+#   python benchmark.py --output before.json
+#   python benchmark.py --output after.json --compare before.json
+#
+# Packages are generated from a fixed seed and cached in --workdir, so runs
+# on the same machine measure the same bytes.
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import api_helpers
+import config
+import dependency_graph
+import flow_converter
+import metrics
+import mock_backend
+import package_index
+
+BENCHMARKS = ("validate", "hash", "index", "graph", "convert", "upload")
+DEFAULT_SIZES_MB = [1, 10, 50, config.MAX_UPLOAD_SIZE_MB]
+DEFAULT_CONCURRENCY = [1, 4, 8]
+
+NODE_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<Values version="2.0">
+  <value name="node_type">service</value>
+  <value name="svc_type">flow</value>
+  <value name="svc_subtype">default</value>
+  <value name="node_nsName">{name}</value>
+</Values>
+"""
+
+FLOW_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<FLOW VERSION="3.0" CLEANUP="true">
+  <SEQUENCE>
+    <MAP MODE="STANDALONE"><MAPCOPY FROM="/in;1;0" TO="/out;1;0"/></MAP>
+    <INVOKE SERVICE="{callee}" VALIDATE-IN="$none" VALIDATE-OUT="$none"/>
+    <BRANCH SWITCH="/status"><SEQUENCE NAME="error"><EXIT FROM="$parent"/></SEQUENCE></BRANCH>
+  </SEQUENCE>
+</FLOW>
+"""
+
+def build_package(path, size_mb, seed=0):
+    """
+    Write a synthetic Web Methods package of about the given size
+
+    The package has one flow service per 20 KB (up to 5000) and is filled up
+    with an incompressible JAR so that its size on disk matches size_mb.
+
+    Args:
+        path: Output path of the ZIP
+        size_mb: Target size in MB
+        seed: Seed for the generated content
+    """
+    rng = random.Random(seed + size_mb)
+    target = int(size_mb * 1024 * 1024)
+    service_count = max(10, min(5000, target // (20 * 1024)))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(f"Bench/{package_index.MANIFEST_NAME}", '<Values version="2.0"><value name="enabled">yes</value></Values>')
+        for index in range(service_count):
+            folder = f"bench/folder{index % 50}"
+            name = f"{folder.replace('/', '.')}:service{index}"
+            callee = f"bench.folder{rng.randrange(50)}:service{rng.randrange(service_count)}"
+            archive.writestr(f"Bench/ns/{folder}/service{index}/{package_index.NODE_FILE_NAME}", NODE_TEMPLATE.format(name=name))
+            archive.writestr(f"Bench/ns/{folder}/service{index}/{package_index.FLOW_FILE_NAME}", FLOW_TEMPLATE.format(callee=callee))
+        # Leave room for the central directory: one record per entry plus the filler's
+        directory_size = sum(46 + len(info.filename) for info in archive.infolist()) + 46 + 64 + 128
+        archive.fp.flush()
+        filler = max(0, target - archive.fp.tell() - directory_size - 30 - 64)
+        # Stored rather than deflated: random bytes do not compress and deflating them is slow
+        filler_info = zipfile.ZipInfo("Bench/code/jars/filler.jar", date_time=(2024, 1, 1, 0, 0, 0))
+        filler_info.compress_type = zipfile.ZIP_STORED
+        with archive.open(filler_info, "w", force_zip64=True) as f:
+            while filler > 0:
+                block = min(filler, 1024 * 1024)
+                f.write(rng.randbytes(block))
+                filler -= block
+
+def get_package(workdir, size_mb, seed=0):
+    path = os.path.join(workdir, f"bench-{size_mb}mb-{seed}.zip")
+    if not os.path.exists(path):
+        build_package(path, size_mb, seed)
+    return path
+
+class RssSampler:
+    """
+    Track the peak resident set size of the process while a case runs
+
+    Reads /proc/self/statm every few milliseconds; on platforms without it the
+    peak falls back to the lifetime maximum reported by the resource module.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = get_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, get_rss())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, get_rss())
+
+def get_rss():
+    """
+    Get the current resident set size of the process
+
+    Returns:
+        int: RSS in bytes, or the peak RSS where the current value is unavailable
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers
+
+    Args:
+        values: Measured values
+        pct: Percentile between 0 and 100
+
+    Returns:
+        float: Percentile value, or None for an empty list
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def run_case(name, operation, package_path, concurrency, iterations):
+    """
+    Run one operation repeatedly on a package and summarize the timings
+
+    Args:
+        name: Benchmark name
+        operation: Callable(package_file) returning True on success
+        package_path: Path of the package ZIP
+        concurrency: Number of threads running the operation at the same time
+        iterations: Number of operations per thread
+
+    Returns:
+        dict: Result row of the case
+    """
+    size = os.path.getsize(package_path)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def timed():
+        with api_helpers.PackageFile(package_path) as package:
+            started = time.perf_counter()
+            try:
+                error = None if operation(package) else "operation failed"
+            except Exception as e:
+                error = str(e)
+            elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if error:
+                errors.append(error)
+
+    total = concurrency * iterations
+    metrics.reset()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        for future in [executor.submit(timed) for _ in range(total)]:
+            future.result()
+        wall = time.perf_counter() - started
+
+    return {
+        "benchmark": name,
+        "size_mb": round(size / (1024 * 1024), 2),
+        "concurrency": concurrency,
+        "operations": total,
+        "errors": len(errors),
+        "wall_s": round(wall, 3),
+        "ops_per_s": round(total / wall, 3),
+        "throughput_mb_s": round(total * size / (1024 * 1024) / wall, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_rss_mb": round(rss.peak / (1024 * 1024), 1),
+        "spans": summarize_spans(),
+    }
+
+def summarize_spans():
+    """
+    Summarize the timing spans recorded since the last metrics.reset()
+
+    Returns:
+        dict: Span name to count, total, p50 and p95 in milliseconds
+    """
+    return {
+        name: {key: histogram[key] for key in ("count", "errors", "total_ms", "p50_ms", "p95_ms")}
+        for name, histogram in metrics.get_metrics().items()
+    }
+
+OPERATIONS = {
+    "validate": lambda package: api_helpers.validate_file(package)[0],
+    "hash": lambda package: bool(api_helpers.hash_upload(package)),
+    "index": lambda package: bool(package_index.index_package(package)["nodes"]),
+    "graph": lambda package: bool(dependency_graph.build_graph(package_index.index_package(package)).topological_order()),
+    "convert": lambda package: bool(flow_converter.convert_package(package)["pipelines"]),
+    "upload": lambda package: api_helpers.send_to_api(package, api_helpers.get_migration_options())["success"],
+}
+
+def run_benchmarks(sizes_mb, concurrency_levels, iterations, benchmarks, workdir, backend_options, seed=0, endpoint=None):
+    """
+    Run every selected benchmark for every package size and concurrency level
+
+    Args:
+        sizes_mb: Package sizes in MB
+        concurrency_levels: Numbers of concurrent operations
+        iterations: Operations per thread and case
+        benchmarks: Names from BENCHMARKS to run
+        workdir: Directory holding the generated packages
+        backend_options: Settings for the mock backend
+        seed: Seed for the generated packages
+        endpoint: API endpoint to upload to instead of starting the mock backend
+            in-process (whose memory otherwise counts towards peak RSS)
+
+    Returns:
+        list: One result row per case
+    """
+    server = None if endpoint else mock_backend.start(**backend_options)
+    config.API_ENDPOINT = endpoint or server.url
+    config.API_BEARER_TOKEN = config.API_BEARER_TOKEN or "Bearer benchmark"
+    # The generated flows all convert locally; "upload" measures the backend path and "convert" the local one
+    config.ENABLE_LOCAL_CONVERSION = False
+    # Spans are summarized per case in the report instead of being logged
+    config.METRICS_LOG_PATH = ""
+    results = []
+    try:
+        for size_mb in sizes_mb:
+            package_path = get_package(workdir, size_mb, seed)
+            for name in benchmarks:
+                for concurrency in concurrency_levels:
+                    # Failed requests print their error, which would interleave with the report
+                    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                        row = run_case(name, OPERATIONS[name], package_path, concurrency, iterations)
+                    print(format_row(row), file=sys.stderr)
+                    results.append(row)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return results
+
+def format_row(row):
+    return (
+        f"{row['benchmark']:<9} {row['size_mb']:>8.1f} MB  x{row['concurrency']:<3} "
+        f"{row['throughput_mb_s']:>9.1f} MB/s  p50 {row['p50_ms']:>9.1f} ms  "
+        f"p95 {row['p95_ms']:>9.1f} ms  p99 {row['p99_ms']:>9.1f} ms  "
+        f"rss {row['peak_rss_mb']:>7.1f} MB  errors {row['errors']}"
+    )
+
+def compare_reports(baseline, current):
+    """
+    Compare the cases of two benchmark reports
+
+    Args:
+        baseline: Earlier report as written by this script
+        current: New report
+
+    Returns:
+        list: One row per case present in both, with the relative change of
+            p50 latency, throughput and peak RSS (positive means slower/bigger)
+    """
+    def key(row):
+        return row["benchmark"], row["size_mb"], row["concurrency"]
+
+    previous = {key(row): row for row in baseline["results"]}
+    rows = []
+    for row in current["results"]:
+        old = previous.get(key(row))
+        if old is None:
+            continue
+        rows.append({
+            "benchmark": row["benchmark"],
+            "size_mb": row["size_mb"],
+            "concurrency": row["concurrency"],
+            "p50_change": _relative_change(old["p50_ms"], row["p50_ms"]),
+            "throughput_change": _relative_change(old["throughput_mb_s"], row["throughput_mb_s"]),
+            "peak_rss_change": _relative_change(old["peak_rss_mb"], row["peak_rss_mb"]),
+        })
+    return rows
+
+def _relative_change(old, new):
+    if not old:
+        return None
+    return round((new - old) / old, 3)
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _int_list(value):
+    return [int(item) for item in value.split(",") if item]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark validation, hashing, indexing and upload of packages.")
+    parser.add_argument("--sizes", type=_int_list, default=DEFAULT_SIZES_MB, help="Package sizes in MB, e.g. 1,10,100")
+    parser.add_argument("--concurrency", type=_int_list, default=DEFAULT_CONCURRENCY, help="Concurrency levels, e.g. 1,4,8")
+    parser.add_argument("--iterations", type=int, default=3, help="Operations per thread and case")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help=f"Comma-separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "wmtosl-bench"), help="Directory for generated packages")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated packages")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock backend latency per request in seconds")
+    parser.add_argument("--bandwidth", type=float, help="Mock backend speed per connection in MB/s")
+    parser.add_argument("--processing-time", type=float, default=0.0, help="Mock backend processing time per migration in seconds")
+    parser.add_argument("--endpoint", help="Upload to an already running backend, e.g. mock_backend.py in another process")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", help="Earlier JSON report to compare the results with")
+    args = parser.parse_args(argv)
+
+    benchmarks = [name for name in args.benchmarks.split(",") if name]
+    unknown = [name for name in benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    os.makedirs(args.workdir, exist_ok=True)
+
+    backend_options = {
+        "latency": args.latency,
+        "bandwidth": args.bandwidth * 1024 * 1024 if args.bandwidth else None,
+        "processing_time": args.processing_time,
+    }
+    report = {
+        "revision": _git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            "sizes_mb": args.sizes,
+            "concurrency": args.concurrency,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "backend": args.endpoint or backend_options,
+            "chunked_uploads": config.CHUNKED_UPLOADS,
+            "stream_uploads": config.STREAM_UPLOADS,
+            "upload_path": "backend upload, local conversion off",
+        },
+        "results": run_benchmarks(
+            args.sizes, args.concurrency, args.iterations, benchmarks, args.workdir, backend_options,
+            seed=args.seed, endpoint=args.endpoint
+        ),
+    }
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["comparison"] = {"baseline": args.compare, "cases": compare_reports(json.load(f), report)}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
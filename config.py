@@ -1,14 +1,136 @@
 # Configuration settings for the Web Methods to SnapLogic Migration Accelerator
-import streamlit as st
+import os
+import sys
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+# Settings file with KEY=VALUE lines; values already in the environment win
+CONFIG_FILE = os.environ.get("WMTOSL_CONFIG", ".env")
+if load_dotenv is not None and os.path.isfile(CONFIG_FILE):
+    load_dotenv(CONFIG_FILE)
+
+def get_setting(name):
+    """
+    Read a setting from the environment, falling back to Streamlit secrets
+
+    Streamlit is only consulted when the app is running under it, so scripts
+    and the command line do not pay for importing it.
+
+    Args:
+        name: Name of the setting
+
+    Returns:
+        str: Value of the setting, or None if it is not set outside Streamlit
+    """
+    value = os.environ.get(name)
+    if value is None and "streamlit" in sys.modules:
+        import streamlit as st
+        value = st.secrets[name]
+    return value
 
 # Backend API endpoint
-API_ENDPOINT = st.secrets["SNAPLOGIC_API_ENDPOINT"]
-API_BEARER_TOKEN = st.secrets["SNAPLOGIC_API_TOKEN"]
+API_ENDPOINT = get_setting("SNAPLOGIC_API_ENDPOINT")
+API_BEARER_TOKEN = get_setting("SNAPLOGIC_API_TOKEN")
 
 # Application settings
 MAX_UPLOAD_SIZE_MB = 100
 SUPPORTED_FILE_TYPES = ["zip"]
 
+# Package preflight limits (checked from the ZIP central directory before upload)
+MAX_ZIP_ENTRIES = 100000  # Maximum number of entries in a package
+MAX_UNCOMPRESSED_SIZE_MB = 2048  # Maximum total size of the package once extracted
+MAX_COMPRESSION_RATIO = 100  # Maximum uncompressed/compressed ratio of a single entry
+MIN_RATIO_CHECK_SIZE = 1024 * 1024  # Entries smaller than this skip the ratio check
+NESTED_ARCHIVE_EXTENSIONS = ["zip", "tar", "gz", "tgz", "bz2", "xz", "7z", "rar"]  # JARs are allowed
+REQUIRE_MANIFEST = True  # Reject ZIPs without a Web Methods manifest.v3
+
+# UI settings
+INJECT_STYLES_ONCE = True  # Send styles.css once per session instead of on every rerun
+
+# Upload settings
+STREAM_UPLOADS = True  # Stream the package as multipart instead of buffering it in memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes read from the package per chunk (1MB)
+UPLOAD_SPOOL_DIR = ".cache/uploads"  # Uploaded packages are copied here and released from session memory
+MMAP_UPLOADS = True  # Read spooled packages through a memory map
+UPLOAD_IDLE_TIMEOUT_SECONDS = 1800  # Spooled packages of sessions idle this long are deleted
+UPLOAD_REAPER_INTERVAL_SECONDS = 60  # Seconds between checks for idle sessions
+
+# Chunked upload settings (used when the backend exposes <API_ENDPOINT>/uploads)
+CHUNKED_UPLOADS = True  # Upload large packages as resumable chunks
+CHUNKED_UPLOAD_PATH = "uploads"  # Upload sessions live below the API endpoint
+CHUNKED_UPLOAD_THRESHOLD_MB = 16  # Smaller packages are sent in a single request
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Bytes per chunk (8MB)
+CHUNKED_UPLOAD_PARALLELISM = 4  # Chunks uploaded at the same time per package
+
+# HTTP client settings
+HTTP_CONNECT_TIMEOUT = 10  # Seconds to wait for a connection to the backend
+HTTP_READ_TIMEOUT = 900  # Seconds to wait for the backend between received bytes
+HTTP_POOL_SIZE = 10  # Keep-alive connections kept open to the backend
+
+# Response settings
+RESPONSE_CHUNK_SIZE = 64 * 1024  # Bytes of a migration result read and parsed at a time
+RESPONSE_MAX_MEMBER_MB = 16  # Result fields larger than this are written to RESPONSE_SPOOL_DIR instead of kept in memory
+RESPONSE_SPOOL_DIR = ".cache/responses"  # Large result fields; removed after RESULT_CACHE_TTL_SECONDS
+
+# Retry settings (applied to every backend request)
+API_MAX_RETRIES = 4  # Retries after the first attempt of a request
+API_RETRY_STATUS_CODES = [429, 500, 502, 503, 504]  # Responses that are retried
+API_RETRY_BASE_DELAY = 1  # Seconds before the first retry; doubles per retry, with full jitter
+API_RETRY_MAX_DELAY = 60  # Longest wait between two attempts, including Retry-After
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failed requests that open the circuit to a backend host
+CIRCUIT_RESET_SECONDS = 30  # How long an open circuit fails fast before a trial request is let through
+
+# Background job settings
+JOB_WORKERS = 4  # Migrations processed at the same time by this app instance
+JOB_SCHEDULING = "round_robin"  # "round_robin" serves each session or batch in turn; "fifo" runs jobs in submission order
+JOB_POLL_INTERVAL = 1  # Seconds between UI status checks while a job is running
+JOB_RETENTION_SECONDS = 3600  # How long finished job results are kept
+BACKEND_JOB_TIMEOUT = 3600  # Seconds to wait for an asynchronous backend migration to finish
+BACKEND_MAX_CONCURRENCY = 4  # Migrations sent to the same backend host at the same time
+
+# Result cache settings
+RESULT_CACHE_DIR = ".cache/results"  # Directory holding cached migration results
+RESULT_CACHE_TTL_SECONDS = 7 * 24 * 3600  # Cached results expire after a week
+RESULT_CACHE_MAX_MB = 256  # Least recently used results are evicted above this size
+
+# Artifact settings
+ARTIFACT_STORE_DIR = ".cache/artifacts"  # Generated .slp pipelines, stored once per distinct content
+ARTIFACT_DOWNLOAD_URL = ""  # Public base URL routed to the pipeline download server, e.g. by a reverse proxy; empty to download through Streamlit
+ARTIFACT_SERVER_HOST = "127.0.0.1"  # Interface of the pipeline download server, only started when ARTIFACT_DOWNLOAD_URL is set
+ARTIFACT_SERVER_PORT = 8502  # Port of the pipeline download server
+ARTIFACT_LINK_TTL_SECONDS = 3600  # Download links are only valid this long
+ARTIFACT_INLINE_MAX_MB = 100  # Largest set of pipelines zipped in memory for download through Streamlit
+
+# Metrics settings
+METRICS_ENABLED = True  # Record timing spans for validation, hashing, connections, upload, server wait and download
+METRICS_LOG_PATH = ""  # JSON lines file receiving every span, e.g. ".cache/metrics.jsonl"; empty to keep only the in-process histograms
+METRICS_LOG_MAX_MB = 64  # The log is rotated once it reaches this size
+METRICS_LOG_BACKUPS = 3  # Rotated logs kept next to it (metrics.jsonl.1, .2, ...)
+
+# Delta migration settings
+ENABLE_DELTA_MIGRATION = True  # Re-migrations of a package upload only the changed services
+DELTA_STATE_DIR = ".cache/manifests"  # Entry manifests and results of previous migrations
+DELTA_MAX_CHANGED_RATIO = 0.5  # Upload the full package when more than this share of it changed
+DELTA_MERGE_KEYS = ["services", "pipelines", "warnings"]  # Per-service result fields merged by name
+
+# Dependency analysis settings (used when ENABLE_DEPENDENCY_ANALYSIS is on)
+DEPENDENCY_GRAPH_CACHE_SIZE = 32  # Service call graphs kept in memory, one per package hash
+
+# Sharding settings (large packages are split along the service call graph)
+ENABLE_SHARDING = True  # Migrate large packages as shards on several backend workers at once
+SHARD_SERVICES = 1000  # Services per shard aimed for; smaller packages are sent whole
+SHARD_PARALLELISM = 4  # Most shards per package, all uploaded at the same time within BACKEND_MAX_CONCURRENCY
+
+# Local conversion settings (simple flow services are converted without the backend)
+ENABLE_LOCAL_CONVERSION = True  # Convert SEQUENCE/MAP/INVOKE/BRANCH/LOOP/EXIT flows locally; other services go to the backend
+LOCAL_CONVERSION_CACHE_SIZE = 20000  # Converted flows kept in memory, one per flow.xml content hash
+
+# Field mapping settings (used when ENABLE_FIELD_MAPPINGS is on)
+FIELD_MAPPING_CACHE_SIZE = 32  # Compiled document types kept in memory, one set per package hash
+
 # Feature flags
 ENABLE_DOCUMENTATION = True
 ENABLE_FIELD_MAPPINGS = True
@@ -0,0 +1,472 @@
+# Delta migrations for the Web Methods to SnapLogic Migration Accelerator
+#
+# After every successful migration the CRC32 and size of each ZIP entry, read
+# from the central directory, are saved per package name together with the
+# result. When a package with the same name is migrated again, only the
+# services whose entries changed are zipped up and sent, and the backend result
+# for them is merged into the previous result for the unchanged services.
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+
+import api_helpers
+import config
+import field_mappings
+import flow_converter
+import json_stream
+import package_index
+import sharding
+
+# Counters of the result and the merged collection they count
+COUNTED_FIELDS = {"convertedServices": "services", "convertedFlows": "pipelines", "warningCount": "warnings"}
+
+_lock = threading.Lock()
+
+def send_package(uploaded_file, migration_options, progress_callback=None, force=False):
+    """
+    Migrate a package, sending only the services changed since its last migration
+
+    Falls back to a full upload the first time a package is seen, when force is
+    set, or when changes outside ns/ (Java code, resources) or too many changes
+    make a delta unsafe or pointless. Full uploads convert the simple flow
+    services locally (see flow_converter.send_package) and split the rest of
+    large packages into shards migrated in parallel (see sharding.send_package).
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        migration_options: Dictionary with migration settings
+        progress_callback: Optional callable(stage, stage_progress, message)
+        force: Ignore the previous migration and upload the full package
+
+    Returns:
+        dict: API response or error message
+    """
+    if not config.ENABLE_DELTA_MIGRATION:
+        return flow_converter.send_package(uploaded_file, migration_options, progress_callback=progress_callback)
+
+    plan = plan_migration(uploaded_file, migration_options, force=force)
+
+    if plan["mode"] == "unchanged":
+        # Handed out like a fresh download, so the saved state keeps its own files
+        result = dict(plan["previous"]["result"])
+        result["data"] = _link_spooled(result.get("data"), config.RESPONSE_SPOOL_DIR)
+        result["delta"] = {"mode": "unchanged", "changed_services": 0, "removed_services": 0, "uploaded_bytes": 0}
+        return result
+
+    if plan["mode"] == "delta":
+        mapping_fields = {}
+        if config.ENABLE_FIELD_MAPPINGS and migration_options.get("generate_mappings"):
+            # Resolved against the full package, as changed services may use unchanged document types
+            changed_services = [package_index.namespace_name(f"{path}/{package_index.NODE_FILE_NAME}") for path in plan["changed_dirs"]]
+            mapping_fields = field_mappings.form_fields(field_mappings.map_package(
+                uploaded_file, api_helpers.hash_upload(uploaded_file), services=set(changed_services)
+            ))
+        delta_path = write_delta_package(uploaded_file, plan)
+        try:
+            with api_helpers.PackageFile(delta_path, uploaded_file.name) as delta_file:
+                uploaded_bytes = delta_file.size
+                result = api_helpers.send_to_api(
+                    delta_file,
+                    migration_options,
+                    progress_callback=progress_callback,
+                    extra_fields={
+                        "deltaBase": plan["previous"].get("migration_id") or "",
+                        "removedServices": json.dumps(plan["removed_services"]),
+                        **mapping_fields,
+                    }
+                )
+        finally:
+            os.remove(delta_path)
+        if result.get("success"):
+            try:
+                result = merge_results(plan["previous"]["result"], result, plan["removed_services"], plan["service_counts"])
+            except FileNotFoundError:
+                # The saved state was replaced by a concurrent migration of the same package
+                plan["mode"] = "full"
+            else:
+                result["delta"] = {
+                    "mode": "delta",
+                    "changed_services": len(plan["changed_dirs"]),
+                    "removed_services": len(plan["removed_services"]),
+                    "uploaded_bytes": uploaded_bytes,
+                }
+    if plan["mode"] != "delta":
+        result = flow_converter.send_package(uploaded_file, migration_options, progress_callback=progress_callback)
+
+    if result.get("success"):
+        save_state(plan, result)
+    return result
+
+def build_manifest(infos, root):
+    """
+    Build the entry manifest of a package from its central directory
+
+    Args:
+        infos: List of zipfile.ZipInfo entries
+        root: Package root prefix inside the ZIP
+
+    Returns:
+        dict: Entry name relative to the root mapped to [crc32, size]
+    """
+    return {
+        info.filename[len(root):]: [info.CRC, info.file_size]
+        for info in infos
+        if not info.is_dir() and info.filename.startswith(root)
+    }
+
+def plan_migration(uploaded_file, migration_options, force=False):
+    """
+    Compare a package with its last successful migration
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        migration_options: Dictionary with migration settings
+        force: Ignore the previous migration
+
+    Returns:
+        dict: Plan with a "mode" of "full", "delta" or "unchanged", the current
+            entry manifest and, for deltas, the changed service directories,
+            removed service names and the service counts merge_results needs
+    """
+    uploaded_file.seek(0)
+    with zipfile.ZipFile(uploaded_file) as archive:
+        infos = archive.infolist()
+    uploaded_file.seek(0)
+
+    root = package_index.find_package_root(infos)
+    package_name = posixpath.basename(root.rstrip("/")) or uploaded_file.name.rsplit(".", 1)[0]
+    entries = build_manifest(infos, root)
+    plan = {
+        "mode": "full",
+        "state_key": _state_key(package_name, migration_options),
+        "package_name": package_name,
+        "root": root,
+        "entries": entries,
+        "previous": None,
+        "changed_dirs": [],
+        "removed_services": [],
+        "service_counts": None,
+    }
+
+    previous = None if force else load_state(plan["state_key"])
+    if previous is None:
+        return plan
+    plan["previous"] = previous
+
+    old_entries = previous["entries"]
+    changed = [name for name, entry in entries.items() if old_entries.get(name) != entry]
+    removed = [name for name in old_entries if name not in entries]
+
+    if not changed and not removed:
+        plan["mode"] = "unchanged"
+        return plan
+
+    # Anything outside ns/ (Java code, resources, config) can affect every service
+    if any(not name.startswith("ns/") and name != package_index.MANIFEST_NAME for name in changed + removed):
+        return plan
+
+    # A service is a directory under ns/; a removed file in a surviving directory changes it too
+    current_dirs = {posixpath.dirname(name) for name in entries}
+    changed_dirs = {posixpath.dirname(name) for name in changed if name.startswith("ns/")}
+    changed_dirs.update(
+        posixpath.dirname(name) for name in removed
+        if name.startswith("ns/") and posixpath.dirname(name) in current_dirs
+    )
+    changed_bytes = sum(size for name, (_, size) in entries.items() if posixpath.dirname(name) in changed_dirs)
+    total_bytes = sum(size for _, size in entries.values()) or 1
+    if changed_bytes / total_bytes > config.DELTA_MAX_CHANGED_RATIO:
+        return plan
+
+    removed_services = sorted({
+        package_index.namespace_name(name)
+        for name in removed
+        if posixpath.basename(name) == package_index.NODE_FILE_NAME
+        and posixpath.dirname(name) not in current_dirs
+    })
+
+    # Services are the ns/ directories with a node.ndf; the previous result covers the old ones
+    old_dirs = {
+        posixpath.dirname(name) for name in old_entries
+        if name.startswith("ns/") and posixpath.basename(name) == package_index.NODE_FILE_NAME
+    }
+    replaced_dirs = old_dirs & changed_dirs
+    removed_dirs = old_dirs - current_dirs
+
+    plan["mode"] = "delta"
+    plan["changed_dirs"] = sorted(changed_dirs)
+    plan["removed_services"] = [name for name in removed_services if name]
+    plan["service_counts"] = {
+        "previous": len(old_dirs),
+        "kept": len(old_dirs - replaced_dirs - removed_dirs),
+        "changed": len(changed_dirs),
+    }
+    return plan
+
+def write_delta_package(uploaded_file, plan):
+    """
+    Write a ZIP with the manifest and the changed service directories to a temp file
+
+    Entries are copied one at a time without loading the package into memory.
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        plan: Delta plan returned by plan_migration
+
+    Returns:
+        str: Path of the delta ZIP; the caller removes it
+    """
+    changed_dirs = set(plan["changed_dirs"])
+    fd, path = tempfile.mkstemp(suffix=".zip", prefix="wmtosl-delta-")
+    os.close(fd)
+
+    uploaded_file.seek(0)
+    with zipfile.ZipFile(uploaded_file) as source, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as delta:
+        for info in source.infolist():
+            if info.is_dir() or not info.filename.startswith(plan["root"]):
+                continue
+            relative_name = info.filename[len(plan["root"]):]
+            if relative_name != package_index.MANIFEST_NAME and posixpath.dirname(relative_name) not in changed_dirs:
+                continue
+            with source.open(info) as src, delta.open(info.filename, "w") as dst:
+                shutil.copyfileobj(src, dst, config.UPLOAD_CHUNK_SIZE)
+    uploaded_file.seek(0)
+    return path
+
+def merge_results(previous_result, delta_result, removed_services, service_counts):
+    """
+    Merge the backend result for changed services into the previous full result
+
+    Per-service collections listed in config.DELTA_MERGE_KEYS are merged by
+    service name and removed services are dropped. Collections written to disk
+    while the previous result downloaded are merged into a new file without
+    loading them.
+
+    Numeric fields describe the whole package, so they are not copied from the
+    delta result. A counter in COUNTED_FIELDS is recounted from its merged
+    collection when both results counted that collection exactly. Other
+    counters keep the previous value's share of the unchanged services and add
+    the delta's; averages such as conversionRate are weighted by services.
+    Every other field is taken from the delta result.
+
+    Args:
+        previous_result: API response of the last full or merged migration
+        delta_result: API response for the delta package
+        removed_services: Namespace names of services no longer in the package
+        service_counts: Services of the previous migration, those of them
+            that are unchanged, and the changed services in the delta
+            ("previous", "kept", "changed"), as in the plan of plan_migration
+
+    Returns:
+        dict: Merged API response
+    """
+    previous_data = previous_result.get("data") or {}
+    delta_data = delta_result.get("data") or {}
+    merged = dict(previous_data)
+
+    for key, value in delta_data.items():
+        old_value = previous_data.get(key)
+        if key in config.DELTA_MERGE_KEYS and json_stream.is_spooled(old_value) and isinstance(value, (dict, list)):
+            merged[key] = _merge_spooled(key, old_value, value, removed_services)
+        elif key in config.DELTA_MERGE_KEYS and json_stream.is_spooled(value):
+            merged[key] = value
+        elif key in config.DELTA_MERGE_KEYS and isinstance(value, dict) and isinstance(old_value, dict):
+            merged_value = dict(old_value)
+            merged_value.update(value)
+            for name in removed_services:
+                merged_value.pop(name, None)
+            merged[key] = merged_value
+        elif key in config.DELTA_MERGE_KEYS and isinstance(value, list) and isinstance(old_value, list):
+            by_name = {_item_name(item): item for item in old_value}
+            by_name.update((_item_name(item), item) for item in value)
+            merged[key] = [item for name, item in by_name.items() if name not in removed_services]
+        else:
+            merged[key] = value
+
+    for key, value in delta_data.items():
+        old_value = previous_data.get(key)
+        if key in config.DELTA_MERGE_KEYS or not _is_number(value) or not _is_number(old_value):
+            continue
+        collection = COUNTED_FIELDS.get(key)
+        if (
+            collection in merged
+            and _count_members(previous_data.get(collection)) == old_value
+            and _count_members(delta_data.get(collection)) == value
+        ):
+            merged[key] = _count_members(merged[collection])
+        else:
+            merged[key] = _merge_counter(key, old_value, value, service_counts)
+
+    return {"success": True, "data": merged}
+
+def load_state(state_key):
+    """
+    Load the manifest and result saved for a package
+
+    Args:
+        state_key: Key built from the package name and migration options
+
+    Returns:
+        dict: Saved state, or None if the package was never migrated or a
+            result field saved on disk has gone missing
+    """
+    try:
+        with open(_state_path(state_key), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    data = state.get("result", {}).get("data")
+    if isinstance(data, dict) and any(
+        json_stream.is_spooled(value) and not os.path.isfile(value[json_stream.SPOOLED_KEY])
+        for value in data.values()
+    ):
+        return None
+    return state
+
+def save_state(plan, result):
+    """
+    Save the manifest and result of a successful migration for the next delta
+
+    Result fields written to RESPONSE_SPOOL_DIR, which is purged after
+    RESULT_CACHE_TTL_SECONDS, are linked (or copied) into a directory of the
+    state, so the state never refers to files that expire before it does.
+
+    Args:
+        plan: Plan returned by plan_migration
+        result: Successful (possibly merged) API response
+    """
+    data = result.get("data") or {}
+    files_dir = os.path.join(config.DELTA_STATE_DIR, plan["state_key"])
+    state_result = {key: value for key, value in result.items() if key not in ("delta", "cached")}
+    state_result["data"] = _link_spooled(result.get("data"), files_dir)
+    state = {
+        "package_name": plan["package_name"],
+        "migration_id": data.get("migrationId") if isinstance(data, dict) else None,
+        "entries": plan["entries"],
+        "result": state_result,
+        "updated_at": time.time(),
+    }
+    os.makedirs(config.DELTA_STATE_DIR, exist_ok=True)
+    path = _state_path(plan["state_key"])
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with _lock:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_path, path)
+        # Files of the state this one replaced
+        kept = {
+            os.path.basename(value[json_stream.SPOOLED_KEY])
+            for value in (state_result["data"].values() if isinstance(state_result["data"], dict) else [])
+            if json_stream.is_spooled(value)
+        }
+        try:
+            entries = list(os.scandir(files_dir))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.name not in kept:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+def _state_key(package_name, migration_options):
+    options = json.dumps(migration_options, sort_keys=True)
+    return hashlib.sha256(f"{package_name}:{options}".encode("utf-8")).hexdigest()
+
+def _state_path(state_key):
+    return os.path.join(config.DELTA_STATE_DIR, f"{state_key}.json")
+
+def _link_spooled(data, directory):
+    # Copy of the result data whose fields on disk are hard links (or copies) in directory
+    if not isinstance(data, dict) or not any(json_stream.is_spooled(value) for value in data.values()):
+        return data
+    os.makedirs(directory, exist_ok=True)
+    linked = dict(data)
+    for key, value in data.items():
+        if not json_stream.is_spooled(value):
+            continue
+        source = value[json_stream.SPOOLED_KEY]
+        name = os.path.basename(source)
+        if directory == config.RESPONSE_SPOOL_DIR:
+            name = f"{uuid.uuid4().hex}-{name.split('-', 1)[-1]}"
+        path = os.path.join(directory, name)
+        if os.path.abspath(path) != os.path.abspath(source):
+            try:
+                os.link(source, path)
+            except FileExistsError:
+                pass
+            except OSError:
+                shutil.copyfile(source, path)
+            # The spool is purged by modification time, which a hard link shares with its source
+            os.utime(path)
+        linked[key] = dict(value, **{json_stream.SPOOLED_KEY: path})
+    return linked
+
+def _merge_spooled(key, old_value, value, removed_services):
+    # Merge into a field the previous result kept on disk, writing a new file
+    # item by item instead of loading the old one
+    is_object = isinstance(value, dict)
+    updates = dict(value) if is_object else {_item_name(item): item for item in value}
+    with api_helpers.open_response_spool(key) as f:
+        f.write("{" if is_object else "[")
+        first = True
+
+        def write(name, item):
+            nonlocal first
+            if name in removed_services:
+                return
+            f.write("" if first else ",")
+            first = False
+            if is_object:
+                f.write(json.dumps(name) + ":")
+            f.write(json.dumps(item))
+
+        for name, item in json_stream.iter_members(old_value):
+            if not is_object:
+                name = _item_name(item)
+            write(name, updates.pop(name, item))
+        for name, item in updates.items():
+            write(name, item)
+        f.write("}" if is_object else "]")
+    return {json_stream.SPOOLED_KEY: f.name, "size": os.path.getsize(f.name)}
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _count_members(value):
+    # Items of a list; for a dictionary of per-service lists, the items of every list
+    if json_stream.is_spooled(value):
+        members = json_stream.iter_members(value)
+    elif isinstance(value, dict):
+        members = value.items()
+    elif isinstance(value, list):
+        return len(value)
+    else:
+        return None
+    count = 0
+    for key, item in members:
+        # Array items are yielded with their index, object members with their name
+        count += len(item) if isinstance(key, str) and isinstance(item, list) else 1
+    return count
+
+def _merge_counter(key, old_value, value, service_counts):
+    previous, kept, changed = service_counts["previous"], service_counts["kept"], service_counts["changed"]
+    if key in sharding.AVERAGED_FIELDS:
+        total = kept + changed
+        return round((old_value * kept + value * changed) / total, 2) if total else value
+    merged = (old_value * kept / previous if previous else 0) + value
+    if isinstance(old_value, int) and isinstance(value, int):
+        return round(merged)
+    return round(merged, 2)
+
+def _item_name(item):
+    if isinstance(item, dict):
+        return item.get("name") or item.get("service") or json.dumps(item, sort_keys=True)
+    return item
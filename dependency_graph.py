@@ -0,0 +1,283 @@
+# Service dependency analysis for the Web Methods to SnapLogic Migration Accelerator
+#
+# Every INVOKE step in a flow.xml is a call from the flow service to another
+# service. The calls of a package form a directed graph, stored as adjacency
+# arrays (CSR): service i calls targets[offsets[i]:offsets[i + 1]]. Building
+# it, finding its strongly connected components and ordering it are all
+# linear in services plus calls, so packages with 50k services take well
+# under a second once indexed. Graphs are cached per package hash.
+import threading
+from array import array
+from collections import OrderedDict
+
+import config
+import package_index
+
+# Node kinds from package_index that are callable services
+SERVICE_KINDS = ("flow", "java", "adapter", "service")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+class DependencyGraph:
+    """
+    Call graph of the services of a package
+
+    Node ids are positions in names. Services called by the package but not
+    part of it (e.g. pub.* built-ins or other packages) are included as
+    external nodes, which never call anything.
+    """
+
+    def __init__(self, names, external, offsets, targets):
+        self.names = names
+        self.external = external
+        self.offsets = offsets
+        self.targets = targets
+        self._ids = None
+        self._fan_in = None
+        self._components = None
+
+    @property
+    def node_count(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def node_id(self, name):
+        """
+        Get the id of a service
+
+        Args:
+            name: Namespace name, e.g. "orders.util:getOrder"
+
+        Returns:
+            int: Node id, or None if the service is not in the graph
+        """
+        if self._ids is None:
+            self._ids = {name: node for node, name in enumerate(self.names)}
+        return self._ids.get(name)
+
+    def callees(self, node):
+        """
+        Get the services a service invokes
+
+        Args:
+            node: Node id
+
+        Returns:
+            array: Node ids of the called services
+        """
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def fan_out(self, node):
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def fan_in(self, node):
+        if self._fan_in is None:
+            counts = array("l", bytes(array("l").itemsize * self.node_count))
+            for target in self.targets:
+                counts[target] += 1
+            self._fan_in = counts
+        return self._fan_in[node]
+
+    def strongly_connected_components(self):
+        """
+        Group services that call each other directly or indirectly
+
+        Uses an iterative Tarjan's algorithm, so deep call chains do not hit
+        the recursion limit.
+
+        Returns:
+            list: Components as lists of node ids, in dependency order: every
+                component comes after all components it calls
+        """
+        if self._components is not None:
+            return self._components
+
+        offsets, targets = self.offsets, self.targets
+        count = self.node_count
+        index = [-1] * count
+        low = [0] * count
+        on_stack = bytearray(count)
+        stack = []
+        components = []
+        counter = 0
+
+        for root in range(count):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [[root, offsets[root]]]
+            while work:
+                frame = work[-1]
+                node, edge = frame
+                if edge < offsets[node + 1]:
+                    frame[1] = edge + 1
+                    target = targets[edge]
+                    if index[target] == -1:
+                        index[target] = low[target] = counter
+                        counter += 1
+                        stack.append(target)
+                        on_stack[target] = 1
+                        work.append([target, offsets[target]])
+                    elif on_stack[target] and index[target] < low[node]:
+                        low[node] = index[target]
+                    continue
+
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+        self._components = components
+        return components
+
+    def topological_order(self):
+        """
+        Order the services so that every service comes after the services it calls
+
+        Services in a cycle cannot be ordered among themselves and are kept
+        next to each other.
+
+        Returns:
+            list: Node ids, dependencies first
+        """
+        return [node for component in self.strongly_connected_components() for node in component]
+
+    def cycles(self):
+        """
+        Find groups of services that call each other, including recursive services
+
+        Returns:
+            list: Components with more than one service or a self-call, as lists of node ids
+        """
+        return [
+            component for component in self.strongly_connected_components()
+            if len(component) > 1 or component[0] in self.callees(component[0])
+        ]
+
+    def levels(self):
+        """
+        Get the depth of every service in the call graph
+
+        Services that call nothing inside the package are level 0; every other
+        service is one level above the highest service it calls. Services of
+        the same level do not depend on each other. A cycle shares one level.
+
+        Returns:
+            list: Level per node id
+        """
+        level = [0] * self.node_count
+        for component in self.strongly_connected_components():
+            members = set(component) if len(component) > 1 else None
+            component_level = 0
+            for node in component:
+                for target in self.callees(node):
+                    if self.external[target] or target == node or (members is not None and target in members):
+                        continue
+                    component_level = max(component_level, level[target] + 1)
+            for node in component:
+                level[node] = component_level
+        return level
+
+def build_graph(index):
+    """
+    Build the call graph of a package from its index
+
+    Args:
+        index: Package index returned by package_index.index_package
+
+    Returns:
+        DependencyGraph: Services of the package followed by the external
+            services they invoke
+    """
+    names = sorted(
+        name for name, node in index["nodes"].items()
+        if node.get("kind") in SERVICE_KINDS
+    )
+    ids = {name: node for node, name in enumerate(names)}
+    internal_count = len(names)
+    flows = index["flows"]
+
+    offsets = array("l", [0])
+    targets = array("l")
+    for name in names[:internal_count]:
+        for callee in flows.get(name, {}).get("invokes", ()):
+            target = ids.get(callee)
+            if target is None:
+                target = ids[callee] = len(names)
+                names.append(callee)
+            targets.append(target)
+        offsets.append(len(targets))
+    # External services call nothing
+    offsets.extend([len(targets)] * (len(names) - internal_count))
+
+    external = bytearray(internal_count) + b"\x01" * (len(names) - internal_count)
+    return DependencyGraph(names, external, offsets, targets)
+
+def get_graph(source, package_hash, index=None):
+    """
+    Get the call graph of a package, building it once per package hash
+
+    Args:
+        source: Path or readable, seekable file-like object with the package ZIP
+        package_hash: SHA-256 of the package, e.g. from api_helpers.hash_upload
+        index: Package index of the source if it was already built
+
+    Returns:
+        DependencyGraph: Call graph of the package
+    """
+    with _cache_lock:
+        graph = _cache.get(package_hash)
+        if graph is not None:
+            _cache.move_to_end(package_hash)
+            return graph
+
+    graph = build_graph(index or package_index.index_package(source))
+    with _cache_lock:
+        _cache[package_hash] = graph
+        while len(_cache) > config.DEPENDENCY_GRAPH_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return graph
+
+def summarize_graph(graph, top=5):
+    """
+    Summarize a call graph for display and reports
+
+    Args:
+        graph: DependencyGraph of a package
+        top: Number of most called services listed
+
+    Returns:
+        dict: Service, external service and call counts, cycles, call depth
+            and the most called services of the package
+    """
+    cycles = graph.cycles()
+    levels = graph.levels()
+    internal = [node for node in range(graph.node_count) if not graph.external[node]]
+    most_called = sorted(internal, key=lambda node: (-graph.fan_in(node), graph.names[node]))[:top]
+    return {
+        "services": len(internal),
+        "external_services": graph.node_count - len(internal),
+        "calls": graph.edge_count,
+        "cycles": [[graph.names[node] for node in sorted(component)] for component in cycles],
+        "max_depth": max((levels[node] for node in internal), default=0),
+        "max_fan_out": max((graph.fan_out(node) for node in internal), default=0),
+        "most_called": [
+            {"service": graph.names[node], "callers": graph.fan_in(node)}
+            for node in most_called if graph.fan_in(node)
+        ],
+    }
@@ -0,0 +1,493 @@
+# Field mappings for the Web Methods to SnapLogic Migration Accelerator
+#
+# MAP steps copy, set and delete pipeline fields addressed by paths such as
+# "/order;4;0;orders.docs:Order/items;2;1/sku;1;0": every segment is a field
+# name, a type code, a dimension (0 scalar, 1 list, 2 table) and, for
+# document references, the referenced document type. Each path is resolved
+# against the document types (record node.ndf files) and the signature of
+# its service, and turned into a SnapLogic mapper expression and target path.
+#
+# Document types are compiled once per package into nested dictionaries of
+# fields; a document reference points at the compiled dictionary of its
+# document type, so references, including recursive ones, cost nothing to
+# follow. The compiled schemas are cached per package hash, and all maps of a
+# package are resolved in one pass over its ZIP.
+import functools
+import json
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from xml.parsers import expat
+
+import config
+import package_index
+
+# Type codes of flow field paths
+PATH_TYPES = {"1": "string", "2": "record", "3": "object", "4": "recref"}
+
+# Map elements that produce a mapping
+MAP_ELEMENTS = ("MAPCOPY", "MAPSET", "MAPDELETE")
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+class Field:
+    """
+    Compiled field of a document type or service signature
+
+    fields holds the compiled fields of a record, or of the referenced
+    document type for document references; it is None for other types and
+    for references to document types that are not in the package.
+    """
+
+    __slots__ = ("type", "dim", "fields", "ref")
+
+    def __init__(self, type, dim, fields=None, ref=None):
+        self.type = type
+        self.dim = dim
+        self.fields = fields
+        self.ref = ref
+
+@functools.lru_cache(maxsize=65536)
+def parse_path(path):
+    """
+    Split a flow field path into its segments
+
+    Args:
+        path: Path such as "/order;4;0;orders.docs:Order/items;2;1/sku;1;0"
+
+    Returns:
+        tuple: (name, type, dim, ref) per segment; type is a PATH_TYPES value
+            and ref the referenced document type or None. Paths repeat across
+            the maps of a package, so results are memoized.
+    """
+    segments = []
+    for part in (path or "").split("/"):
+        if not part:
+            continue
+        name, _, rest = part.partition(";")
+        codes = rest.split(";", 2) if rest else []
+        segment_type = PATH_TYPES.get(codes[0] if codes else "", "string")
+        dim = int(codes[1]) if len(codes) > 1 and codes[1].isdigit() else 0
+        ref = codes[2] if len(codes) > 2 and codes[2] else None
+        segments.append((name, segment_type, dim, ref))
+    return tuple(segments)
+
+def field_path(path):
+    """
+    Convert a flow field path into a SnapLogic field reference
+
+    Args:
+        path: Flow field path, e.g. "/order;2;0/id;1;0"
+
+    Returns:
+        str: Reference such as "$order.id", or None for an empty path
+    """
+    expression = "$"
+    for name, _, _, _ in parse_path(path):
+        expression = _append(expression, name)
+    return expression if expression != "$" else None
+
+def source_expression(path, target_dim=None):
+    """
+    Build the mapper expression that reads a flow field path
+
+    Lists along the path are mapped over, so copying /items;2;1/sku;1;0
+    yields $items.map(item => item.sku).
+
+    Args:
+        path: Flow field path of the source
+        target_dim: Dimension of the target field; a list copied into a
+            scalar takes its first item, a scalar copied into a list is wrapped
+
+    Returns:
+        str: SnapLogic expression, or None for an empty path
+    """
+    segments = parse_path(path)
+    if not segments:
+        return None
+    expression = _accessor("$", segments, 0)
+    source_dim = max(dim for _, _, dim, _ in segments)
+    if target_dim is not None:
+        if source_dim and not target_dim:
+            expression = f"{expression}[0]"
+        elif target_dim and not source_dim:
+            expression = f"[{expression}]"
+    return expression
+
+def string_literal(value):
+    """
+    Quote a text as a SnapLogic expression string
+
+    Args:
+        value: Text, e.g. the value of a MAPSET
+
+    Returns:
+        str: Single-quoted expression string
+    """
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def compile_schemas(source):
+    """
+    Compile the document types of a package
+
+    Args:
+        source: Path or readable, seekable file-like object with the package ZIP
+
+    Returns:
+        dict: Namespace name of every document type mapped to its compiled
+            fields (name -> Field)
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with zipfile.ZipFile(source) as archive:
+        root = package_index.find_package_root(archive.infolist())
+        return _compile_schemas(archive, root)
+
+def get_schemas(source, package_hash):
+    """
+    Get the compiled document types of a package, compiling them once per package hash
+
+    Args:
+        source: Path or readable, seekable file-like object with the package ZIP
+        package_hash: SHA-256 of the package, e.g. from api_helpers.hash_upload
+
+    Returns:
+        dict: Compiled document types, as returned by compile_schemas
+    """
+    schemas = _cached_schemas(package_hash)
+    if schemas is None:
+        schemas = compile_schemas(source)
+        _cache_schemas(package_hash, schemas)
+    return schemas
+
+def map_package(source, package_hash=None, services=None):
+    """
+    Resolve the MAP steps of every flow service of a package in one pass
+
+    Args:
+        source: Path or readable, seekable file-like object with the package ZIP
+        package_hash: SHA-256 of the package to reuse its compiled document
+            types, or None to compile them for this call only
+        services: Optional collection of service names to map; all flow services if None
+
+    Returns:
+        dict: "services" maps each service with field mappings to its maps,
+            each a list of mappings with the expression, target path, types
+            and whether both fields were found in their document types;
+            the other fields count maps, mappings and unresolved fields
+    """
+    started = time.perf_counter()
+    schemas = _cached_schemas(package_hash) if package_hash else None
+    node_values = {}
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with zipfile.ZipFile(source) as archive:
+        root = package_index.find_package_root(archive.infolist())
+        if schemas is None:
+            # The signatures read while compiling are kept, so no node.ndf is parsed twice
+            schemas = _compile_schemas(archive, root, node_values)
+            if package_hash:
+                _cache_schemas(package_hash, schemas)
+        flows = {}
+        signatures = {}
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.startswith(f"{root}ns/"):
+                continue
+            file_name = info.filename.rsplit("/", 1)[-1]
+            if file_name not in (package_index.FLOW_FILE_NAME, package_index.NODE_FILE_NAME):
+                continue
+            name = package_index.namespace_name(info.filename[len(root):])
+            if name is None or (services is not None and name not in services):
+                continue
+            if file_name == package_index.FLOW_FILE_NAME:
+                flows[name] = info
+            else:
+                signatures[name] = info
+
+        result = {"services": {}, "maps": 0, "mappings": 0, "unresolved": 0}
+        for name in sorted(flows):
+            try:
+                with archive.open(flows[name]) as f:
+                    maps = _read_maps(f)
+                if not maps:
+                    continue
+                values = node_values.get(name)
+                if values is None and name in signatures:
+                    with archive.open(signatures[name]) as f:
+                        values = _parse_idata(f)
+                scope = _signature_scope(values, schemas) if values else {}
+            except expat.ExpatError:
+                continue
+            resolved_maps = []
+            for elements in maps:
+                mappings = [_resolve(element, attrs, value, scope, schemas) for element, attrs, value in elements]
+                result["mappings"] += len(mappings)
+                result["unresolved"] += sum(1 for mapping in mappings if not mapping["resolved"])
+                resolved_maps.append(mappings)
+            result["maps"] += len(resolved_maps)
+            result["services"][name] = resolved_maps
+    if hasattr(source, "seek"):
+        source.seek(0)
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+def form_fields(mappings, services=None):
+    """
+    Build the form field that sends resolved mappings with a package
+
+    Args:
+        mappings: Result of map_package
+        services: Optional collection of the service names in the uploaded package
+
+    Returns:
+        dict: {"fieldMappings": JSON} or an empty dict if there is nothing to send
+    """
+    if not mappings:
+        return {}
+    selected = mappings["services"]
+    if services is not None:
+        selected = {name: selected[name] for name in services if name in selected}
+    if not selected:
+        return {}
+    return {"fieldMappings": json.dumps(selected, separators=(",", ":"))}
+
+def select_services(mappings, services):
+    """
+    Restrict a map_package result to some services
+
+    Args:
+        mappings: Result of map_package, or None
+        services: Collection of service names
+
+    Returns:
+        dict: The mappings of those services, or None if mappings is None
+    """
+    if mappings is None:
+        return None
+    return dict(mappings, services={
+        name: mappings["services"][name] for name in services if name in mappings["services"]
+    })
+
+def summarize_mappings(mappings):
+    """
+    Summarize a map_package result for display and reports
+
+    Args:
+        mappings: Result of map_package
+
+    Returns:
+        dict: Services, maps, mappings, unresolved fields and time taken
+    """
+    return {
+        "services": len(mappings["services"]),
+        "maps": mappings["maps"],
+        "mappings": mappings["mappings"],
+        "unresolved": mappings["unresolved"],
+        "elapsed_ms": mappings["elapsed_ms"],
+    }
+
+def _append(expression, name):
+    # "$" + "order" is "$order"; names that are not identifiers are quoted: $order["ship-to"]
+    if _IDENTIFIER_RE.match(name):
+        return f"{expression}{name}" if expression == "$" else f"{expression}.{name}"
+    return f"{expression}[{json.dumps(name)}]"
+
+def _accessor(base, segments, depth):
+    expression = base
+    for position, (name, _, dim, _) in enumerate(segments):
+        expression = _append(expression, name)
+        if dim and position < len(segments) - 1:
+            item = f"item{depth or ''}"
+            return f"{expression}.map({item} => {_accessor(item, segments[position + 1:], depth + 1)})"
+    return expression
+
+def _resolve(element, attrs, value, scope, schemas):
+    if element == "MAPCOPY":
+        source, source_found = _lookup(attrs.get("FROM"), scope, schemas)
+        target, target_found = _lookup(attrs.get("TO"), scope, schemas)
+        return {
+            "expression": source_expression(attrs.get("FROM"), target_dim=target[1]),
+            "targetPath": field_path(attrs.get("TO")),
+            "sourceType": source[0],
+            "targetType": target[0],
+            "resolved": source_found and target_found,
+        }
+    target, target_found = _lookup(attrs.get("FIELD"), scope, schemas)
+    if element == "MAPDELETE":
+        return {"expression": None, "targetPath": field_path(attrs.get("FIELD")), "delete": True,
+                "targetType": target[0], "resolved": target_found}
+    return {
+        "expression": string_literal(value),
+        "targetPath": field_path(attrs.get("FIELD")),
+        "targetType": target[0],
+        "resolved": target_found,
+    }
+
+def _lookup(path, scope, schemas):
+    # Type and dimension of the last segment, and whether every segment was found
+    segments = parse_path(path)
+    if not segments:
+        return (None, 0), False
+    fields = scope
+    found = True
+    field = None
+    for name, segment_type, dim, ref in segments:
+        field = fields.get(name) if fields is not None else None
+        if field is None:
+            found = False
+            # Fall back on what the path itself says about the field
+            field = Field(segment_type, dim, schemas.get(ref) if ref else None, ref)
+        fields = field.fields
+    return (field.type, field.dim), found
+
+def _signature_scope(values, schemas):
+    # Fields of the pipeline of a service: its inputs and outputs
+    signature = values.get("svc_sig") if isinstance(values.get("svc_sig"), dict) else {}
+    scope = {}
+    for key in ("sig_in", "sig_out"):
+        record = signature.get(key)
+        if isinstance(record, dict):
+            scope.update(_compile_fields(record.get("rec_fields"), schemas))
+    return scope
+
+def _cached_schemas(package_hash):
+    with _cache_lock:
+        schemas = _cache.get(package_hash)
+        if schemas is not None:
+            _cache.move_to_end(package_hash)
+        return schemas
+
+def _cache_schemas(package_hash, schemas):
+    with _cache_lock:
+        _cache[package_hash] = schemas
+        while len(_cache) > config.FIELD_MAPPING_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def _compile_schemas(archive, root, node_values=None):
+    # node_values, if given, receives the parsed node.ndf of every node that is not a document type
+    records = {}
+    ns_prefix = f"{root}ns/"
+    for info in archive.infolist():
+        if info.is_dir() or not info.filename.startswith(ns_prefix) or not info.filename.endswith(f"/{package_index.NODE_FILE_NAME}"):
+            continue
+        name = package_index.namespace_name(info.filename[len(root):])
+        if name is None:
+            continue
+        try:
+            with archive.open(info) as f:
+                values = _parse_idata(f)
+        except expat.ExpatError:
+            continue
+        if values.get("node_type") == "record":
+            records[name] = values
+        elif node_values is not None:
+            node_values[name] = values
+
+    # Every document type gets its dictionary first, so references can point at it before it is filled
+    schemas = {name: {} for name in records}
+    for name, values in records.items():
+        schemas[name].update(_compile_fields(values.get("rec_fields"), schemas))
+    return schemas
+
+def _compile_fields(rec_fields, schemas):
+    fields = {}
+    for item in rec_fields if isinstance(rec_fields, list) else ():
+        if not isinstance(item, dict) or not item.get("field_name"):
+            continue
+        field_type = item.get("field_type") or "string"
+        dim = int(item["field_dim"]) if str(item.get("field_dim", "")).isdigit() else 0
+        ref = item.get("rec_ref") or None
+        if field_type == "recref":
+            children = schemas.get(ref)
+        elif field_type == "record":
+            children = _compile_fields(item.get("rec_fields"), schemas)
+        else:
+            children = None
+        fields[item["field_name"]] = Field(field_type, dim, children, ref)
+    return fields
+
+def _read_maps(f):
+    # Mapping elements of every MAP step, one list per MAP, in document order
+    maps = []
+    stack = []
+    state = {"element": None, "text": []}
+
+    def start(tag, attrs):
+        if tag == "MAP":
+            stack.append([])
+        elif tag in MAP_ELEMENTS and stack:
+            state["element"] = (tag, attrs)
+            state["text"] = []
+            if tag != "MAPSET":
+                stack[-1].append((tag, attrs, None))
+                state["element"] = None
+
+    def end(tag):
+        if tag == "MAPSET" and state["element"] is not None and stack:
+            element, attrs = state["element"]
+            stack[-1].append((element, attrs, "".join(state["text"]).strip()))
+            state["element"] = None
+        elif tag == "MAP" and stack:
+            elements = stack.pop()
+            if elements:
+                maps.append(elements)
+
+    def characters(data):
+        if state["element"] is not None:
+            state["text"].append(data)
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    parser.ParseFile(f)
+    return maps
+
+def _parse_idata(f):
+    """
+    Read an IData XML document into dictionaries, lists and strings
+
+    <record> becomes a dict, <array> a list and <value> a string; entries
+    inside a record or the document are keyed by their name attribute.
+    """
+    stack = []
+    result = {}
+    text = []
+
+    def start(tag, attrs):
+        if tag == "Values" and not stack:
+            stack.append((result, None))
+            return
+        if not stack:
+            return
+        container = {} if tag == "record" else [] if tag == "array" else None
+        stack.append((container, attrs.get("name")))
+        text.clear()
+
+    def end(tag):
+        if len(stack) < 2:
+            stack.clear()
+            return
+        container, name = stack.pop()
+        value = "".join(text).strip() if container is None else container
+        parent = stack[-1][0]
+        if isinstance(parent, list):
+            parent.append(value)
+        elif name is not None:
+            parent[name] = value
+        text.clear()
+
+    def characters(data):
+        text.append(data)
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    parser.ParseFile(f)
+    return result
@@ -0,0 +1,515 @@
+# Local flow.xml conversion for the Web Methods to SnapLogic Migration Accelerator
+#
+# Flow services built only from SEQUENCE, MAP, INVOKE, BRANCH, LOOP and EXIT
+# steps are converted to SnapLogic pipelines here instead of by the backend:
+#
+#   MAP      -> Mapper            INVOKE   -> Pipeline Execute
+#   BRANCH   -> Router + Union    LOOP     -> JSON Splitter, body, Group By N
+#   SEQUENCE -> the steps in a chain        EXIT     -> Exit
+#
+# Anything else (try/catch sequences, REPEAT, RETRY, label expressions,
+# transformers inside maps) makes the service unsupported, and it is sent to
+# the backend with the rest of the package. Conversions are memoized by the
+# SHA-256 of the flow.xml, so an unchanged service converts again with one
+# hash and one dictionary lookup.
+#
+# Of the migration options, include_documentation carries the flow and step
+# comments into the pipeline notes, and field mappings are only filled in
+# with generate_mappings on. The other two cannot change a service converted
+# here: convert_transformations only concerns maps with transformers, which
+# are always left to the backend, and analyze_dependencies does not change
+# pipelines.
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from xml.parsers import expat
+
+import api_helpers
+import config
+import field_mappings
+import package_index
+import sharding
+
+SNAP_CLASSES = {
+    "MAP": "com-snaplogic-snaps-transform-datatransform",
+    "INVOKE": "com-snaplogic-snaps-flow-pipeexec",
+    "ROUTER": "com-snaplogic-snaps-flow-router",
+    "UNION": "com-snaplogic-snaps-flow-union",
+    "SPLIT": "com-snaplogic-snaps-transform-jsonsplitter",
+    "GROUP": "com-snaplogic-snaps-transform-groupbyn",
+    "EXIT": "com-snaplogic-snaps-flow-exit",
+}
+
+# Elements that only describe signatures or hold data and are not steps
+_PASSIVE_TAGS = {"COMMENT", "MAPTARGET", "MAPSOURCE", "DATA"}
+
+_ID_NAMESPACE = uuid.UUID("6f1c8a52-3b0e-4d7e-9a55-5f2c1d0b7e11")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "unsupported": 0}
+
+class UnsupportedFlow(Exception):
+    """Raised for flow constructs that only the backend can convert"""
+
+def convert_service(service_name, flow_xml, migration_options=None):
+    """
+    Convert one flow service to a SnapLogic pipeline
+
+    Args:
+        service_name: Namespace name of the service, e.g. "orders.util:getOrder"
+        flow_xml: Contents of the service's flow.xml as bytes
+        migration_options: Dictionary with migration settings, defaults to
+            api_helpers.get_migration_options()
+
+    Returns:
+        dict: SnapLogic pipeline, or None if the flow uses constructs that
+            have to be converted by the backend
+    """
+    if migration_options is None:
+        migration_options = api_helpers.get_migration_options()
+    documentation = bool(migration_options.get("include_documentation"))
+    mappings = bool(migration_options.get("generate_mappings"))
+    digest = hashlib.sha256(flow_xml).hexdigest()
+    key = (digest, documentation, mappings)
+    with _cache_lock:
+        body = _cache.get(key)
+        if body is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+    if body is None:
+        try:
+            body = _convert_flow(flow_xml, digest, documentation, mappings)
+        except (UnsupportedFlow, expat.ExpatError):
+            # Unsupported flows are memoized too, so they are not parsed again
+            body = False
+        with _cache_lock:
+            _stats["misses"] += 1
+            _cache[key] = body
+            while len(_cache) > config.LOCAL_CONVERSION_CACHE_SIZE:
+                _cache.popitem(last=False)
+    if body is False:
+        with _cache_lock:
+            _stats["unsupported"] += 1
+        return None
+
+    # The cached body is shared by every service with the same flow; only the label differs
+    pipeline = dict(body)
+    info = {"label": {"value": service_name.replace(":", "_").replace(".", "_")}}
+    if documentation:
+        notes = f"Converted from the Web Methods flow service {service_name}"
+        if body["description"]:
+            notes = f"{notes}\n\n{body['description']}"
+        info["notes"] = {"value": notes}
+    pipeline["property_map"] = {"info": info, "settings": body["property_map"]["settings"]}
+    del pipeline["description"]
+    return pipeline
+
+def get_stats():
+    """
+    Get the memoization statistics of this process
+
+    Returns:
+        dict: Cache hits, misses, unsupported services and cached flows
+    """
+    with _cache_lock:
+        return dict(_stats, entries=len(_cache))
+
+def convert_package(uploaded_file, migration_options=None):
+    """
+    Convert every supported flow service of a package locally
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        migration_options: Dictionary with migration settings, defaults to
+            api_helpers.get_migration_options()
+
+    Returns:
+        dict: Package root, "pipelines" as items for the migration result,
+            the directories of the converted services, and the names of the
+            services that still need the backend
+    """
+    uploaded_file.seek(0)
+    index = package_index.index_package(uploaded_file)
+    pipelines = []
+    converted_dirs = []
+    remaining = []
+    uploaded_file.seek(0)
+    with zipfile.ZipFile(uploaded_file) as archive:
+        for name, node in sorted(index["nodes"].items()):
+            if node.get("kind") not in ("flow", "java", "adapter", "service"):
+                continue
+            pipeline = None
+            if node.get("kind") == "flow" and name in index["flows"]:
+                flow_path = f"{node['path']}/{package_index.FLOW_FILE_NAME}"
+                pipeline = convert_service(name, archive.read(flow_path), migration_options)
+            if pipeline is None:
+                remaining.append(name)
+                continue
+            pipelines.append({
+                "name": pipeline["property_map"]["info"]["label"]["value"],
+                "service": name,
+                "converter": "local",
+                "slp": pipeline,
+            })
+            converted_dirs.append(node["path"])
+    uploaded_file.seek(0)
+    return {
+        "root": index["root"],
+        "pipelines": pipelines,
+        "converted_dirs": converted_dirs,
+        "remaining_services": remaining,
+    }
+
+def send_package(uploaded_file, migration_options, progress_callback=None):
+    """
+    Migrate a package, converting supported flow services locally
+
+    Only the services that could not be converted are uploaded, together with
+    the folders, document types and files they may depend on; the backend
+    result is merged with the local pipelines. If every service converted
+    locally, the backend is not called at all. With ENABLE_LOCAL_CONVERSION
+    off, the whole package goes to the backend.
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        migration_options: Dictionary with migration settings
+        progress_callback: Optional callable(stage, stage_progress, message)
+
+    Returns:
+        dict: API response or error message; the "local_conversion" field
+            counts the services converted locally and the time it took, and
+            "field_mappings" summarizes the mappings resolved for the package
+    """
+    # Field mappings are resolved for the whole package in one pass and sent with the services that need them
+    mappings = None
+    if config.ENABLE_FIELD_MAPPINGS and migration_options.get("generate_mappings"):
+        mappings = field_mappings.map_package(uploaded_file, api_helpers.hash_upload(uploaded_file))
+
+    def finish(result):
+        if mappings is not None and result.get("success"):
+            result["field_mappings"] = field_mappings.summarize_mappings(mappings)
+        return result
+
+    if not config.ENABLE_LOCAL_CONVERSION:
+        return finish(sharding.send_package(
+            uploaded_file, migration_options, progress_callback=progress_callback, mappings=mappings
+        ))
+
+    started = time.perf_counter()
+    converted = convert_package(uploaded_file, migration_options)
+    local_count = len(converted["pipelines"])
+    remaining_count = len(converted["remaining_services"])
+    local_info = {
+        "services": local_count,
+        "remaining_services": remaining_count,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    if not local_count:
+        return finish(sharding.send_package(
+            uploaded_file, migration_options, progress_callback=progress_callback, mappings=mappings
+        ))
+    if progress_callback:
+        progress_callback(
+            "processing", None,
+            f"Converted {local_count} flow services locally; {remaining_count} need SnapLogic..."
+        )
+
+    local_result = {
+        "success": True,
+        "data": {
+            "convertedServices": local_count,
+            "convertedFlows": local_count,
+            "conversionRate": 100,
+            "warningCount": 0,
+            "pipelines": converted["pipelines"],
+        },
+    }
+    if not remaining_count:
+        return finish(dict(local_result, local_conversion=local_info))
+
+    remainder_path = write_remainder_package(uploaded_file, converted["root"], converted["converted_dirs"])
+    try:
+        with api_helpers.PackageFile(remainder_path, uploaded_file.name) as remainder_file:
+            result = sharding.send_package(
+                remainder_file, migration_options,
+                progress_callback=progress_callback,
+                mappings=field_mappings.select_services(mappings, converted["remaining_services"])
+            )
+    finally:
+        os.remove(remainder_path)
+    if not result.get("success"):
+        return result
+
+    merged = sharding.merge_shard_results([result, local_result], [remaining_count, local_count])
+    for key in ("shards",):
+        if key in result:
+            merged[key] = result[key]
+    merged["local_conversion"] = local_info
+    return finish(merged)
+
+def write_remainder_package(uploaded_file, root, converted_dirs):
+    """
+    Write a ZIP of the package without the locally converted services to a temp file
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        root: Package root prefix inside the ZIP
+        converted_dirs: Directories of the services converted locally
+
+    Returns:
+        str: Path of the ZIP; the caller removes it
+    """
+    fd, path = tempfile.mkstemp(suffix=".zip", prefix="wmtosl-remainder-")
+    os.close(fd)
+    uploaded_file.seek(0)
+    sharding.copy_entries(uploaded_file, path, root, set(converted_dirs))
+    uploaded_file.seek(0)
+    return path
+
+def _convert_flow(flow_xml, digest, documentation, mappings):
+    root = _parse_tree(flow_xml)
+    if root is None or root[0] != "FLOW":
+        raise UnsupportedFlow("The document is not a flow")
+
+    builder = _PipelineBuilder(digest, documentation, mappings)
+    builder.chain(root[2])
+    return {
+        "class_id": "com-snaplogic-pipeline",
+        "class_version": 8,
+        "property_map": {"settings": {"param_table": {"value": []}}},
+        "snap_map": builder.snaps,
+        "link_map": builder.links,
+        # Comment of the flow itself, for the pipeline notes; removed by convert_service
+        "description": _comment(root[2]) if documentation else None,
+    }
+
+def _parse_tree(flow_xml):
+    # (tag, attributes, children) for every step element; passive elements keep no children
+    stack = [("", {}, [])]
+    skipped = [0]
+    texts = []
+
+    def start(tag, attrs):
+        if skipped[0]:
+            skipped[0] += 1
+            if tag == "value":
+                texts.clear()
+            return
+        node = (tag, attrs, [])
+        stack[-1][2].append(node)
+        stack.append(node)
+        if tag in _PASSIVE_TAGS:
+            skipped[0] = 1
+            texts.clear()
+
+    def end(tag):
+        if skipped[0] > 1:
+            skipped[0] -= 1
+            return
+        node = stack.pop()
+        if skipped[0]:
+            skipped[0] = 0
+            node[1]["_text"] = "".join(texts).strip()
+
+    def characters(data):
+        if skipped[0]:
+            texts.append(data)
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    parser.Parse(flow_xml, True)
+    return stack[0][2][0] if stack[0][2] else None
+
+def _comment(children):
+    return "\n".join(child[1].get("_text", "") for child in children if child[0] == "COMMENT").strip()
+
+def _field(path):
+    # "/order;2;0/items;2;1" -> "$order.items"
+    reference = field_mappings.field_path(path)
+    if reference is None:
+        raise UnsupportedFlow(f"Unsupported field path {path!r}")
+    return reference
+
+class _PipelineBuilder:
+    def __init__(self, digest, documentation=True, mappings=True):
+        self.digest = digest
+        self.documentation = documentation
+        self.field_mappings = mappings
+        self.snaps = {}
+        self.links = {}
+
+    def _id(self, kind):
+        # Ids derive from the flow content, so the same flow always gives the same pipeline
+        return str(uuid.uuid5(_ID_NAMESPACE, f"{self.digest}:{kind}:{len(self.snaps) + len(self.links)}"))
+
+    def snap(self, step, label, settings, outputs=("output0",), children=()):
+        snap_id = self._id("snap")
+        info = {"label": {"value": label}}
+        notes = _comment(children) if self.documentation else ""
+        if notes:
+            info["notes"] = {"value": notes}
+        self.snaps[snap_id] = {
+            "class_id": SNAP_CLASSES[step],
+            "instance_id": snap_id,
+            "property_map": {
+                "info": info,
+                "settings": settings,
+                "output": {view: {"label": {"value": view}} for view in outputs},
+                "input": {"input0": {"label": {"value": "input0"}}},
+            },
+        }
+        return snap_id
+
+    def link(self, source, target, view="output0"):
+        self.links[self._id("link")] = {
+            "src_id": source,
+            "src_view_id": view,
+            "dst_id": target,
+            "dst_view_id": "input0",
+        }
+
+    def connect(self, ends, target):
+        for source, view in ends:
+            self.link(source, target, view)
+
+    def chain(self, steps, ends=()):
+        """
+        Append steps one after the other
+
+        Returns:
+            tuple: The first snap id of the chain and the (snap id, output view)
+                pairs its last steps end in
+        """
+        first = None
+        ends = list(ends)
+        for step in steps:
+            tag, attrs = step[0], step[1]
+            if tag == "COMMENT":
+                continue
+            if attrs.get("DISABLED") == "true":
+                continue
+            entry, ends = self.step(step, ends)
+            first = first or entry
+        return first, ends
+
+    def step(self, step, ends):
+        tag, attrs, children = step
+        if tag == "SEQUENCE":
+            if attrs.get("FORM") or attrs.get("EXIT-ON", "FAILURE") != "FAILURE":
+                raise UnsupportedFlow("Try/catch sequences are not supported")
+            first, new_ends = self.chain(children, ends)
+            return first, new_ends
+        if tag == "MAP":
+            snap_id = self.snap("MAP", attrs.get("NAME") or "Map", {"transformations": {"value": self.mappings(children)}}, children=children)
+        elif tag == "INVOKE":
+            service = attrs.get("SERVICE")
+            if not service:
+                raise UnsupportedFlow("INVOKE without a service")
+            mappings = []
+            for child in children:
+                if child[0] == "MAP":
+                    mappings.extend(self.mappings(child[2]))
+                elif child[0] != "COMMENT":
+                    raise UnsupportedFlow(f"Unsupported element {child[0]} in INVOKE")
+            snap_id = self.snap("INVOKE", service.rsplit(":", 1)[-1], {
+                "pipeline": {"value": service.replace(":", "_").replace(".", "_")},
+                "service": {"value": service},
+                "mappings": {"value": mappings},
+            }, children=children)
+        elif tag == "EXIT":
+            snap_id = self.snap("EXIT", "Exit", {
+                "from": {"value": attrs.get("FROM") or "$parent"},
+                "signal": {"value": attrs.get("SIGNAL") or "SUCCESS"},
+                "errorMessage": {"value": attrs.get("FAILURE-MESSAGE") or ""},
+            }, outputs=(), children=children)
+            self.connect(ends, snap_id)
+            return snap_id, []
+        elif tag == "BRANCH":
+            return self.branch(attrs, children, ends)
+        elif tag == "LOOP":
+            return self.loop(attrs, children, ends)
+        else:
+            raise UnsupportedFlow(f"Unsupported step {tag}")
+        self.connect(ends, snap_id)
+        return snap_id, [(snap_id, "output0")]
+
+    def mappings(self, children):
+        mappings = []
+        for child in children:
+            tag, attrs = child[0], child[1]
+            if tag in _PASSIVE_TAGS:
+                continue
+            if tag == "MAPCOPY":
+                target = _field(attrs.get("TO"))
+                # Lists along the source path are mapped over; see field_mappings.source_expression
+                target_dim = max(dim for _, _, dim, _ in field_mappings.parse_path(attrs.get("TO")))
+                source = field_mappings.source_expression(attrs.get("FROM"), target_dim=target_dim)
+                if source is None:
+                    raise UnsupportedFlow(f"Unsupported field path {attrs.get('FROM')!r}")
+                mappings.append({"expression": source, "targetPath": target})
+            elif tag == "MAPSET":
+                value = child[2][0][1].get("_text", "") if child[2] else ""
+                mappings.append({"expression": field_mappings.string_literal(value), "targetPath": _field(attrs.get("FIELD"))})
+            elif tag == "MAPDELETE":
+                mappings.append({"expression": None, "targetPath": _field(attrs.get("FIELD")), "delete": True})
+            else:
+                raise UnsupportedFlow(f"Unsupported map element {tag}")
+        # Checked either way, so the same flows are converted locally whatever the options
+        return mappings if self.field_mappings else []
+
+    def branch(self, attrs, children, ends):
+        if attrs.get("LABELEXPRESSIONS") == "true":
+            raise UnsupportedFlow("Branches on label expressions are not supported")
+        switch = _field(attrs.get("SWITCH"))
+        cases = [child for child in children if child[0] != "COMMENT" and child[1].get("DISABLED") != "true"]
+        routes = []
+        for position, case in enumerate(cases):
+            label = case[1].get("NAME") or ""
+            if label == "$default":
+                expression = "true"
+            elif label == "$null":
+                expression = f"{switch} == null"
+            else:
+                expression = f"{switch} == {field_mappings.string_literal(label)}"
+            routes.append({"expression": expression, "outputViewName": f"output{position}"})
+
+        router = self.snap(
+            "ROUTER", "Branch",
+            {"routes": {"value": routes}, "firstMatch": {"value": True}},
+            outputs=[route["outputViewName"] for route in routes] or ["output0"],
+            children=children
+        )
+        self.connect(ends, router)
+        branch_ends = []
+        for position, case in enumerate(cases):
+            view = f"output{position}"
+            first, case_ends = self.chain([case], [(router, view)])
+            branch_ends.extend(case_ends if first else [(router, view)])
+        if not cases:
+            return router, [(router, "output0")]
+        if len(branch_ends) == 1:
+            return router, branch_ends
+        union = self.snap("UNION", "Join branches", {})
+        self.connect(branch_ends, union)
+        return router, [(union, "output0")]
+
+    def loop(self, attrs, children, ends):
+        splitter = self.snap("SPLIT", "Loop", {"jsonPath": {"value": _field(attrs.get("IN-ARRAY"))}}, children=children)
+        self.connect(ends, splitter)
+        _, body_ends = self.chain(children, [(splitter, "output0")])
+        if not attrs.get("OUT-ARRAY"):
+            return splitter, body_ends
+        group = self.snap("GROUP", "Collect results", {
+            "groupSize": {"value": 0},
+            "targetField": {"value": _field(attrs.get("OUT-ARRAY"))},
+        })
+        self.connect(body_ends, group)
+        return splitter, [(group, "output0")]
@@ -0,0 +1,409 @@
+# Background migration jobs for the Web Methods to SnapLogic Migration Accelerator
+#
+# Migrations run on a process-wide pool of JOB_WORKERS threads instead of the
+# Streamlit script thread. The UI submits a job, keeps only its id in session
+# state and polls get_job() on each rerun, so reruns and closed tabs neither
+# block on nor restart the backend call.
+#
+# Jobs wait in one queue per owner (a browser session or a batch), and the
+# workers take the next job from each owner in turn, so a user who submits
+# fifty packages does not hold up a user who submits one. With JOB_SCHEDULING
+# set to "fifo" all jobs share one queue in submission order. Queued jobs
+# report their position and an expected start time, estimated from the
+# duration of recent migrations of similar size.
+import heapq
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+
+import api_helpers
+import artifacts
+import config
+import delta
+import result_cache
+
+_workers = []
+_jobs = {}
+_active_jobs = {}
+# Owner -> deque of queued job ids, in the order the owners are served
+_queues = OrderedDict()
+# (package MB, seconds) of recently finished migrations
+_durations = deque(maxlen=50)
+# Fitted (intercept, slope) of _durations, None until needed
+_fit = None
+# Bumped whenever the queue or the running jobs change; _schedule is (version, computed at, schedule)
+_schedule_version = 0
+_schedule = None
+_lock = threading.Lock()
+_job_finished = threading.Condition(_lock)
+_job_queued = threading.Condition(_lock)
+
+# Share of the overall progress bar covered by the upload; the rest is server-side work
+UPLOAD_PROGRESS_SHARE = 40
+
+# Duration estimate before any migration has finished
+DEFAULT_SECONDS_PER_MB = 2.0
+DEFAULT_SECONDS_PER_JOB = 5.0
+# Seconds a queue schedule is reused while the queue does not change
+SCHEDULE_REFRESH_SECONDS = 1.0
+
+def submit_job(uploaded_file, migration_options, force=False, owner=None, reopen=None):
+    """
+    Submit a migration to run in the background
+
+    Submitting the same package with the same options while an earlier job for
+    it is still queued or running returns the existing job instead of starting
+    a second migration. If a result for the same package and options is cached,
+    the job completes immediately with that result.
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        migration_options: Dictionary with migration settings
+        force: Skip the result cache and always migrate again
+        owner: Session or batch the job belongs to; owners take turns for the
+            free workers. Jobs without an owner share one turn.
+        reopen: Callable returning the package again once the job starts, so a
+            package on disk can be closed while the job is queued; the job
+            closes the package it returns when it finishes
+
+    Returns:
+        str: Id of the job processing the package
+    """
+    package_hash = api_helpers.hash_upload(uploaded_file)
+    # Later stages (delta, local conversion, sharding) take the digest from the package instead of reading it again
+    try:
+        uploaded_file.sha256 = package_hash
+    except AttributeError:
+        pass
+    dedupe_key = (package_hash, tuple(sorted(migration_options.items())))
+    cache_key = result_cache.make_key(package_hash, migration_options)
+    cached_result = None if force else result_cache.get(cache_key)
+
+    with _lock:
+        _purge_expired_jobs()
+        existing_id = _active_jobs.get(dedupe_key)
+        if existing_id is not None and cached_result is None:
+            return existing_id
+
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            "id": job_id,
+            "file_name": uploaded_file.name,
+            "package_hash": package_hash,
+            "size": api_helpers.get_upload_size(uploaded_file),
+            "owner": owner,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0,
+            "stage_progress": None,
+            "stage_started_at": None,
+            "message": "Waiting for a free migration worker...",
+            "result": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+
+        if cached_result is not None:
+            now = time.time()
+            _jobs[job_id].update(
+                status="completed",
+                stage="done",
+                progress=100,
+                message="Loaded result from cache",
+                result=dict(cached_result, cached=True),
+                started_at=now,
+                finished_at=now
+            )
+            return job_id
+
+        _active_jobs[dedupe_key] = job_id
+        _jobs[job_id]["task"] = (dedupe_key, cache_key, uploaded_file, migration_options, force, reopen)
+        queue_owner = owner if config.JOB_SCHEDULING == "round_robin" else None
+        _queues.setdefault(queue_owner, deque()).append(job_id)
+        _queue_changed()
+        _start_workers()
+        _job_queued.notify()
+    return job_id
+
+def get_job(job_id):
+    """
+    Get the current state of a job
+
+    Args:
+        job_id: Id returned by submit_job
+
+    Returns:
+        dict: Copy of the job state, or None if the job is unknown or expired.
+            Queued jobs also have their 0-based "queue_position" and
+            "expected_start_at" (epoch seconds), which the message mentions.
+    """
+    return get_jobs([job_id])[0]
+
+def get_jobs(job_ids):
+    """
+    Get the current state of several jobs at once
+
+    The queue schedule is estimated once for all of them, so a batch of
+    hundreds of packages costs about as much as a single job.
+
+    Args:
+        job_ids: Ids returned by submit_job
+
+    Returns:
+        list: Copy of each job state as returned by get_job, None for unknown
+            or expired jobs, in the order of job_ids
+    """
+    with _lock:
+        schedule = None
+        snapshots = []
+        for job_id in job_ids:
+            job = _jobs.get(job_id)
+            if job is None:
+                snapshots.append(None)
+                continue
+            job = {key: value for key, value in job.items() if key != "task"}
+            if job["status"] == "queued":
+                if schedule is None:
+                    schedule = _estimate_schedule()
+                if job_id in schedule:
+                    _describe_position(job, *schedule[job_id])
+            snapshots.append(job)
+        return snapshots
+
+def get_queue_stats():
+    """
+    Get the state of the job queue
+
+    Returns:
+        dict: Running and queued jobs, queued jobs per owner and the worker count
+    """
+    with _lock:
+        return {
+            "workers": config.JOB_WORKERS,
+            "running": sum(1 for job in _jobs.values() if job["status"] == "running"),
+            "queued": sum(len(queue) for queue in _queues.values()),
+            "owners": {str(owner): len(queue) for owner, queue in _queues.items()},
+        }
+
+def wait_for_job(job_id, timeout):
+    """
+    Block until a job finishes or the timeout expires
+
+    Args:
+        job_id: Id returned by submit_job
+        timeout: Maximum number of seconds to wait
+
+    Returns:
+        dict: Copy of the job state, or None if the job is unknown or expired
+    """
+    deadline = time.time() + timeout
+    with _job_finished:
+        while True:
+            job = _jobs.get(job_id)
+            remaining = deadline - time.time()
+            if job is None or job["finished_at"] is not None or remaining <= 0:
+                return dict(job) if job is not None else None
+            _job_finished.wait(remaining)
+
+def _update_job(job_id, **fields):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+
+def _report_progress(job_id, stage, stage_progress, message):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        if job["stage"] != stage:
+            job["stage_started_at"] = time.time()
+        if stage == "uploading":
+            progress = (stage_progress or 0) * UPLOAD_PROGRESS_SHARE // 100
+        else:
+            progress = UPLOAD_PROGRESS_SHARE + (stage_progress or 0) * (100 - UPLOAD_PROGRESS_SHARE) // 100
+        job.update(
+            stage=stage,
+            stage_progress=stage_progress,
+            progress=max(job["progress"], min(int(progress), 99)),
+            message=message
+        )
+
+def _start_workers():
+    # Called with _lock held; workers are started on first use, up to JOB_WORKERS
+    while len(_workers) < config.JOB_WORKERS:
+        worker = threading.Thread(target=_work, name=f"migration-job-{len(_workers)}", daemon=True)
+        _workers.append(worker)
+        worker.start()
+
+def _work():
+    while True:
+        with _lock:
+            while not _queues:
+                _job_queued.wait()
+            job_id = _next_job_id()
+            job = _jobs.get(job_id)
+            task = job.pop("task") if job is not None else None
+            if task is not None:
+                job.update(status="running", started_at=time.time(), message="Waiting for a free SnapLogic backend slot...")
+        if task is not None:
+            _run_job(job_id, *task)
+            # Release the package before waiting for the next job, so a pinned upload can be reaped
+            del task
+
+def _next_job_id():
+    # Take the first job of the owner whose turn it is; that owner goes to the back of the line
+    owner, queue = next(iter(_queues.items()))
+    job_id = queue.popleft()
+    del _queues[owner]
+    if queue:
+        _queues[owner] = queue
+    _queue_changed()
+    return job_id
+
+def _dispatch_order():
+    # Queued job ids in the order _next_job_id will hand them out
+    order = []
+    queues = [list(queue) for queue in _queues.values()]
+    for turn in range(max((len(queue) for queue in queues), default=0)):
+        order.extend(queue[turn] for queue in queues if turn < len(queue))
+    return order
+
+def _describe_position(job, position, start_at):
+    wait = max(0, int(start_at - time.time()))
+    job.update(
+        queue_position=position,
+        expected_start_at=start_at,
+        message=(
+            f"Queued: {position} migration{'s' if position != 1 else ''} ahead, "
+            f"expected to start in about {wait // 60}m {wait % 60}s"
+            if position else
+            f"Queued: next in line, expected to start in about {wait // 60}m {wait % 60}s"
+        )
+    )
+
+def _record_duration(size, seconds):
+    # Called with _lock held; the fit and the schedule are estimated again on next use
+    global _fit
+    _durations.append((size / (1024 * 1024), seconds))
+    _fit = None
+    _queue_changed()
+
+def _queue_changed():
+    # Called with _lock held whenever jobs are queued, started or finished
+    global _schedule_version
+    _schedule_version += 1
+
+def _estimate_duration(size):
+    # Least-squares fit of seconds = a + b * MB over recent migrations, refitted only after a migration finishes
+    global _fit
+    size_mb = size / (1024 * 1024)
+    if not _durations:
+        return DEFAULT_SECONDS_PER_JOB + DEFAULT_SECONDS_PER_MB * size_mb
+    if _fit is None:
+        _fit = _fit_durations(list(_durations))
+    intercept, slope = _fit
+    return intercept + slope * size_mb
+
+def _fit_durations(samples):
+    # (intercept, slope) of seconds over package MB
+    count = len(samples)
+    mean_mb = sum(mb for mb, _ in samples) / count
+    mean_seconds = sum(seconds for _, seconds in samples) / count
+    variance = sum((mb - mean_mb) ** 2 for mb, _ in samples)
+    if variance <= 1e-9:
+        # All packages about the same size; scale the mean by size
+        return (0.0, mean_seconds / mean_mb) if mean_mb > 0 else (mean_seconds, 0.0)
+    slope = max(0.0, sum((mb - mean_mb) * (seconds - mean_seconds) for mb, seconds in samples) / variance)
+    intercept = max(0.0, mean_seconds - slope * mean_mb)
+    return intercept, slope
+
+def _estimate_schedule():
+    # Reuse the last schedule until the queue changes, refreshing it now and then as running jobs progress
+    global _schedule
+    now = time.time()
+    if _schedule is not None:
+        version, computed_at, schedule = _schedule
+        if version == _schedule_version and now - computed_at < SCHEDULE_REFRESH_SECONDS:
+            return schedule
+    schedule = _compute_schedule(now)
+    _schedule = (_schedule_version, now, schedule)
+    return schedule
+
+def _compute_schedule(now):
+    # Expected start of every queued job: each starts when the first worker frees up
+    free_at = [
+        now + max(0.0, _estimate_duration(job["size"]) - (now - job["started_at"]))
+        for job in _jobs.values() if job["status"] == "running"
+    ]
+    free_at.extend([now] * max(0, config.JOB_WORKERS - len(free_at)))
+    heapq.heapify(free_at)
+    schedule = {}
+    for position, job_id in enumerate(_dispatch_order()):
+        start_at = heapq.heappop(free_at)
+        schedule[job_id] = (position, start_at)
+        heapq.heappush(free_at, start_at + _estimate_duration(_jobs[job_id]["size"]))
+    return schedule
+
+def _run_job(job_id, dedupe_key, cache_key, uploaded_file, migration_options, force, reopen=None):
+    package = uploaded_file
+    try:
+        if reopen is not None:
+            package = reopen()
+        with api_helpers.backend_slot():
+            result = delta.send_package(
+                package,
+                migration_options,
+                progress_callback=lambda stage, stage_progress, message: _report_progress(job_id, stage, stage_progress, message),
+                force=force
+            )
+    except Exception as e:
+        print(f"Migration job {job_id} crashed: {traceback.format_exc()}")
+        result = {"success": False, "error": f"Unexpected error: {str(e)}"}
+
+    if result.get("success"):
+        try:
+            stored = artifacts.store_result(result.get("data"), uploaded_file.name)
+            if stored is not None:
+                result = dict(result, artifacts=stored)
+        except OSError as e:
+            print(f"Could not store pipelines of job {job_id}: {str(e)}")
+
+    if package is not uploaded_file:
+        package.close()
+
+    try:
+        result_cache.put(cache_key, result)
+    except OSError as e:
+        print(f"Could not cache result of job {job_id}: {str(e)}")
+
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            # Failures are often fast (e.g. an open circuit) and would skew the estimates
+            if result.get("success") and job["started_at"] is not None:
+                _record_duration(job["size"], time.time() - job["started_at"])
+            job.update(
+                status="completed" if result.get("success") else "failed",
+                stage="done",
+                progress=100,
+                message="Migration completed" if result.get("success") else "Migration failed",
+                result=result,
+                finished_at=time.time()
+            )
+            _queue_changed()
+        if _active_jobs.get(dedupe_key) == job_id:
+            del _active_jobs[dedupe_key]
+        _job_finished.notify_all()
+
+def _purge_expired_jobs():
+    cutoff = time.time() - config.JOB_RETENTION_SECONDS
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job["finished_at"] is not None and job["finished_at"] < cutoff
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
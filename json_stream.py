@@ -0,0 +1,296 @@
+# Incremental JSON parsing for the Web Methods to SnapLogic Migration Accelerator
+#
+# Migration results can be tens of MB. JsonStreamParser is fed the response
+# body chunk by chunk and returns every top-level member of the document as
+# soon as it is complete, so small summary fields are known long before a
+# large "pipelines" array has arrived. Members larger than a limit are never
+# held in memory: their raw JSON is written to a file while it streams in and
+# the member is replaced by a reference to that file.
+import codecs
+import json
+import re
+
+# Key of the reference that replaces a member written to disk
+SPOOLED_KEY = "$spooled"
+
+_WHITESPACE_RE = re.compile(r"\s*")
+# Everything up to the next bracket or unterminated string, complete strings included
+_SKIP_RE = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*', re.DOTALL)
+_STRING_END_RE = re.compile(r'["\\]')
+_SCALAR_END_RE = re.compile(r"[,\]}\s]")
+_DECODER = json.JSONDecoder()
+
+class JsonStreamParser:
+    """
+    Parser for the members of a top-level JSON object or array, fed in chunks
+
+    Object members are returned as (key, value) and array items as
+    (index, value), in document order. Values are only decoded once their
+    closing bracket has arrived. Finding it costs one regular expression match
+    per bracket, which skips complete strings and everything else in C, so a
+    document is scanned in linear time.
+    """
+
+    def __init__(self, max_member_size=None, spill=None):
+        """
+        Args:
+            max_member_size: Characters of raw JSON above which a member is
+                written to disk instead of being decoded, or None for no limit
+            spill: Callable(key) returning a writable text file for a member
+                that is too large; required when max_member_size is set.
+                The file is closed by the parser.
+        """
+        self.max_member_size = max_member_size
+        self.spill = spill
+        self.kind = None
+        self.done = False
+        self.characters = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+        self._index = 0
+        self._value_start = 0
+        self._scan = 0
+        self._depth = 0
+        self._in_string = False
+        self._value_open = False
+        # Scanned text of the current value that is no longer in the buffer
+        self._parts = []
+        self._parts_size = 0
+        self._spill_file = None
+
+    def feed(self, data):
+        """
+        Add the next chunk of the document
+
+        Args:
+            data: bytes or str
+
+        Returns:
+            list: Members completed by this chunk, as (key, value) tuples
+
+        Raises:
+            ValueError: If the document is not a JSON object or array, or is malformed
+        """
+        if isinstance(data, bytes):
+            data = self._decoder.decode(data)
+        self.characters += len(data)
+        self._buffer += data
+        members = []
+        while not self.done:
+            member = self._next_member()
+            if member is None:
+                break
+            members.append(member)
+        # Drop what has been consumed once per chunk rather than once per member
+        consumed = min(self._pos, self._value_start) if self._state == "value" else self._pos
+        if consumed:
+            self._buffer = self._buffer[consumed:]
+            self._pos -= consumed
+            self._value_start -= consumed
+            self._scan -= consumed
+        self._move_scanned_value()
+        return members
+
+    def close(self):
+        """
+        Check that the whole document has been fed
+
+        Raises:
+            ValueError: If the document ended early or has trailing content
+        """
+        self._buffer += self._decoder.decode(b"", final=True)
+        if not self.done:
+            if self._spill_file is not None:
+                self._spill_file.close()
+            raise ValueError("Incomplete JSON document")
+        if self._buffer[self._pos:].strip():
+            raise ValueError("Extra data after the JSON document")
+
+    def _next_member(self):
+        buffer = self._buffer
+        while True:
+            self._pos = _WHITESPACE_RE.match(buffer, self._pos).end()
+            if self._pos >= len(buffer):
+                return None
+            char = buffer[self._pos]
+
+            if self._state == "start":
+                if char not in "{[":
+                    raise ValueError("The JSON document is not an object or an array")
+                self.kind = "object" if char == "{" else "array"
+                self._pos += 1
+                self._state = "first"
+            elif self._state in ("first", "after"):
+                closing = "}" if self.kind == "object" else "]"
+                if char == closing:
+                    self._pos += 1
+                    self.done = True
+                    return None
+                if self._state == "after":
+                    if char != ",":
+                        raise ValueError(f"Expected ',' or '{closing}' at character {self.characters - len(buffer) + self._pos}")
+                    self._pos += 1
+                self._state = "key" if self.kind == "object" else "value_start"
+            elif self._state == "key":
+                if char != '"':
+                    raise ValueError("Expected a member name")
+                try:
+                    self._key, end = json.decoder.scanstring(buffer, self._pos + 1)
+                except json.JSONDecodeError:
+                    # The name continues in the next chunk
+                    return None
+                self._pos = end
+                self._state = "colon"
+            elif self._state == "colon":
+                if char != ":":
+                    raise ValueError("Expected ':' after a member name")
+                self._pos += 1
+                self._state = "value_start"
+            elif self._state == "value_start":
+                if self.kind == "array":
+                    self._key = self._index
+                    self._index += 1
+                self._value_start = self._scan = self._pos
+                self._depth = 0
+                self._in_string = False
+                self._value_open = False
+                self._state = "value"
+            elif self._state == "value":
+                end = self._find_value_end()
+                if end is None:
+                    return None
+                member = (self._key, self._finish_value(end))
+                self._pos = end
+                self._state = "after"
+                return member
+
+    def _find_value_end(self):
+        buffer = self._buffer
+        position = self._scan
+        if not self._value_open:
+            first = buffer[position]
+            if first == '"':
+                self._in_string = True
+            elif first in "{[":
+                self._depth = 1
+            else:
+                # Numbers, true, false and null end at the next delimiter
+                match = _SCALAR_END_RE.search(buffer, position)
+                return match.start() if match else None
+            self._value_open = True
+            position += 1
+        while True:
+            if self._in_string:
+                match = _STRING_END_RE.search(buffer, position)
+                if match is None:
+                    position = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        # Resume at the backslash once the escaped character has arrived
+                        position = match.start()
+                        break
+                    position = match.end() + 1
+                    continue
+                self._in_string = False
+                position = match.end()
+                if self._depth == 0:
+                    return position
+                continue
+            position = _SKIP_RE.match(buffer, position).end()
+            if position >= len(buffer):
+                break
+            char = buffer[position]
+            position += 1
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return position
+        self._scan = position
+        return None
+
+    def _finish_value(self, end):
+        raw = self._buffer[self._value_start:end]
+        self._value_start = end
+        size = self._parts_size + len(raw)
+        parts = self._parts
+        self._parts = []
+        self._parts_size = 0
+
+        if self._spill_file is None:
+            raw = "".join(parts) + raw if parts else raw
+            value, consumed = _DECODER.raw_decode(raw)
+            if consumed != len(raw):
+                raise ValueError(f"Invalid JSON value for member {self._key!r}")
+            return value
+
+        self._spill_file.write(raw)
+        self._spill_file.close()
+        reference = {SPOOLED_KEY: self._spill_file.name, "size": size}
+        self._spill_file = None
+        return reference
+
+    def _move_scanned_value(self):
+        # Move the scanned part of an unfinished value out of the buffer, so a
+        # large value is not copied again with every chunk that is appended
+        if self._state != "value" or self._scan <= self._value_start:
+            return
+        # Everything before the scan position is final, the rest may be a partial escape
+        piece = self._buffer[self._value_start:self._scan]
+        if self._spill_file is not None:
+            self._spill_file.write(piece)
+        else:
+            self._parts.append(piece)
+        self._parts_size += len(piece)
+        if self._spill_file is None and self.max_member_size is not None and self._parts_size > self.max_member_size:
+            self._spill_file = self.spill(self._key)
+            self._spill_file.write("".join(self._parts))
+            self._parts = []
+        self._buffer = self._buffer[self._scan:]
+        self._pos = self._value_start = self._scan = 0
+
+def iter_members(source, chunk_size=64 * 1024):
+    """
+    Iterate over the members of a JSON object or array in a file without loading it
+
+    Args:
+        source: Path or binary file object holding the document, e.g. a
+            member written to disk by JsonStreamParser
+        chunk_size: Bytes read per chunk
+
+    Yields:
+        tuple: (key, value) for objects, (index, value) for arrays
+    """
+    if isinstance(source, dict):
+        source = source[SPOOLED_KEY]
+    f = open(source, "rb") if isinstance(source, str) else source
+    try:
+        parser = JsonStreamParser()
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield from parser.feed(chunk)
+        parser.close()
+    finally:
+        if f is not source:
+            f.close()
+
+def is_spooled(value):
+    """
+    Check whether a member was written to disk by JsonStreamParser
+
+    Args:
+        value: Member value
+
+    Returns:
+        bool: True if the value is a reference to a file
+    """
+    return isinstance(value, dict) and SPOOLED_KEY in value
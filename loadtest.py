@@ -0,0 +1,361 @@
+# Multi-session load test for the Web Methods to SnapLogic Migration Accelerator
+#
+# Runs the Streamlit app itself for N simulated users at once. Every user is
+# its own AppTest session: it uploads a package, ticks "Force re-migration",
+# clicks START MIGRATION and follows the job until the result is shown, once
+# per package. The backend is the local mock backend started in-process.
+#
+# For every concurrency level the report holds script-run latency, end-to-end
+# migration time, memory growth and error rate:
+#
+#   python loadtest.py --users 1,5,10,20 --output loadtest.json
+#
+# AppTest has no file upload support, so st.file_uploader is replaced with a
+# stub that returns the package assigned to the session.
+import argparse
+import contextlib
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.scriptrunner.script_run_context import ScriptRunContext
+from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+import benchmark
+import config
+import metrics
+import mock_backend
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+DEFAULT_USERS = [1, 5, 10, 20]
+PACKAGE_STATE_KEY = "loadtest_package"
+
+_script_runs = []
+_script_runs_lock = threading.Lock()
+_script_thread_state = threading.local()
+_uploads = {}
+_uploads_lock = threading.Lock()
+
+def install_hooks():
+    """
+    Patch Streamlit so simulated users can upload packages and script runs are timed
+
+    The uploader stub returns the package whose path is stored under
+    PACKAGE_STATE_KEY in the session state, once. Script runs are timed from the
+    start of the script until it finishes or reruns, so every st.rerun()
+    counts as a run of its own, as it does for a browser session.
+
+    AppTest is meant for one session at a time. It clears its mock Runtime
+    after every run while the other sessions' scripts may still need it, so a
+    shared mock Runtime stands in whenever none is set. It also compiles the
+    app once per run, which fails at random when several threads compile at
+    once on Python 3.11, so all runners share one script cache as the
+    sessions of a real server do.
+    """
+    shared_runtime = MagicMock(spec=Runtime)
+    shared_runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared_runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance if cls._instance is not None else shared_runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    original_file_uploader = st.file_uploader
+
+    def file_uploader(label, *args, **kwargs):
+        if not str(kwargs.get("key")).startswith("file_uploader_"):
+            return original_file_uploader(label, *args, **kwargs)
+        # Delivered once, like a browser upload; the app spools it and resets the uploader
+        path = st.session_state.pop(PACKAGE_STATE_KEY, None)
+        return UploadedFile(_get_upload_record(path), None) if path else None
+
+    st.file_uploader = file_uploader
+
+    shared_script_cache = ScriptCache()
+    original_runner_init = LocalScriptRunner.__init__
+    original_on_script_start = ScriptRunContext.on_script_start
+    original_on_script_finished = LocalScriptRunner._on_script_finished
+
+    def runner_init(self, *args, **kwargs):
+        original_runner_init(self, *args, **kwargs)
+        self._script_cache = shared_script_cache
+
+    def on_script_start(self):
+        _script_thread_state.started_at = time.perf_counter()
+        original_on_script_start(self)
+
+    def on_script_finished(self, ctx, event, premature_stop):
+        started_at = getattr(_script_thread_state, "started_at", None)
+        if started_at is not None:
+            with _script_runs_lock:
+                _script_runs.append(time.perf_counter() - started_at)
+            _script_thread_state.started_at = None
+        original_on_script_finished(self, ctx, event, premature_stop)
+
+    LocalScriptRunner.__init__ = runner_init
+    ScriptRunContext.on_script_start = on_script_start
+    LocalScriptRunner._on_script_finished = on_script_finished
+
+def _get_upload_record(path):
+    # Streamlit keeps every uploaded file in memory and wraps it in a new
+    # UploadedFile on each run, so the bytes are read once per package
+    with _uploads_lock:
+        record = _uploads.get(path)
+        if record is None:
+            with open(path, "rb") as f:
+                record = UploadedFileRec(file_id=path, name=os.path.basename(path), type="application/zip", data=f.read())
+            _uploads[path] = record
+        return record
+
+def run_user(package_paths, timeout):
+    """
+    Migrate packages one after another in a single simulated session
+
+    Args:
+        package_paths: Packages the user uploads, in order
+        timeout: Seconds a single script run may take, including the
+            reruns that follow the migration job
+
+    Returns:
+        list: One dict per package with success, duration and error
+    """
+    migrations = []
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    for path in package_paths:
+        started_at = time.perf_counter()
+        try:
+            at.session_state[PACKAGE_STATE_KEY] = path
+            at.run()
+            if not at.exception:
+                at.checkbox(key="force_remigration").check()
+                at.session_state["migration_status"] = "not_started"
+                at.button(key="start_migration").click().run()
+
+            if at.exception:
+                error = at.exception[0].message
+            elif at.session_state["migration_status"] != "completed":
+                error = at.error[0].value if at.error else f"Migration ended as {at.session_state['migration_status']}"
+            else:
+                error = None
+        except Exception as e:
+            # Timeouts and missing widgets end this user's session
+            migrations.append({"success": False, "duration": time.perf_counter() - started_at, "error": str(e)})
+            break
+        migrations.append({"success": error is None, "duration": time.perf_counter() - started_at, "error": error})
+    return migrations
+
+def run_level(users, packages_per_user, package_paths, timeout):
+    """
+    Run one concurrency level and summarize it
+
+    Args:
+        users: Number of simultaneous sessions
+        packages_per_user: Packages migrated by every session
+        package_paths: At least users * packages_per_user distinct packages
+        timeout: Seconds a single script run may take
+
+    Returns:
+        dict: Result row for the level
+    """
+    with _script_runs_lock:
+        _script_runs.clear()
+    metrics.reset()
+    gc.collect()
+    rss_start = benchmark.get_rss()
+
+    assignments = [
+        package_paths[user * packages_per_user:(user + 1) * packages_per_user]
+        for user in range(users)
+    ]
+    started_at = time.perf_counter()
+    with benchmark.RssSampler(interval=0.05) as sampler:
+        with ThreadPoolExecutor(max_workers=users) as executor:
+            sessions = list(executor.map(lambda paths: run_user(paths, timeout), assignments))
+    elapsed = time.perf_counter() - started_at
+
+    # The sessions have ended, so their uploads are gone; what remains is held by the app
+    with _uploads_lock:
+        _uploads.clear()
+    gc.collect()
+    rss_end = benchmark.get_rss()
+    with _script_runs_lock:
+        script_runs = list(_script_runs)
+
+    migrations = [migration for session in sessions for migration in session]
+    durations = [migration["duration"] for migration in migrations if migration["success"]]
+    errors = [migration["error"] for migration in migrations if not migration["success"]]
+    # Sessions that stopped early never attempted their remaining packages
+    failed = users * packages_per_user - len(durations)
+    return {
+        "users": users,
+        "packages": users * packages_per_user,
+        "completed": len(durations),
+        "failed": failed,
+        "error_rate": round(failed / (users * packages_per_user), 4),
+        "errors": sorted(set(errors))[:10],
+        "elapsed_s": round(elapsed, 3),
+        "migrations_per_minute": round(len(durations) * 60 / elapsed, 2) if elapsed else None,
+        "script_runs": len(script_runs),
+        "script_run_p50_ms": _ms(benchmark.percentile(script_runs, 50)),
+        "script_run_p95_ms": _ms(benchmark.percentile(script_runs, 95)),
+        "script_run_p99_ms": _ms(benchmark.percentile(script_runs, 99)),
+        "script_run_max_ms": _ms(max(script_runs) if script_runs else None),
+        "migration_p50_s": _round(benchmark.percentile(durations, 50)),
+        "migration_p95_s": _round(benchmark.percentile(durations, 95)),
+        "migration_max_s": _round(max(durations) if durations else None),
+        "rss_start_mb": round(rss_start / (1024 * 1024), 1),
+        "rss_end_mb": round(rss_end / (1024 * 1024), 1),
+        "rss_growth_mb": round((rss_end - rss_start) / (1024 * 1024), 1),
+        "peak_rss_mb": round(sampler.peak / (1024 * 1024), 1),
+        "spans": benchmark.summarize_spans(),
+    }
+
+def run_load_test(user_levels, packages_per_user, size_mb, workdir, backend_options, timeout, seed=0, endpoint=None,
+                  local_conversion=False):
+    """
+    Run every concurrency level against the mock backend
+
+    Every package is migrated once per run, so neither the result cache nor
+    delta uploads shorten later levels. The generated flows only use steps
+    the local converter supports, so local conversion is off unless asked
+    for; otherwise no package would reach the backend.
+
+    Args:
+        user_levels: Numbers of simultaneous sessions
+        packages_per_user: Packages migrated by every session
+        size_mb: Package size in MB
+        workdir: Directory holding the generated packages and, during the run, the app state
+        backend_options: Settings for the mock backend
+        timeout: Seconds a single script run may take
+        seed: Seed for the generated packages
+        endpoint: API endpoint to use instead of starting the mock backend in-process
+        local_conversion: Convert the flows locally instead of uploading the packages
+
+    Returns:
+        list: One result row per concurrency level
+    """
+    install_hooks()
+    config.ENABLE_LOCAL_CONVERSION = local_conversion
+    # Keep everything the app writes out of its own caches, and remove it once the run is over
+    state_dir = os.path.join(workdir, "state")
+    shutil.rmtree(state_dir, ignore_errors=True)
+    config.UPLOAD_SPOOL_DIR = os.path.join(state_dir, "uploads")
+    config.RESPONSE_SPOOL_DIR = os.path.join(state_dir, "responses")
+    config.RESULT_CACHE_DIR = os.path.join(state_dir, "results")
+    config.ARTIFACT_STORE_DIR = os.path.join(state_dir, "artifacts")
+    config.DELTA_STATE_DIR = os.path.join(state_dir, "delta")
+    config.METRICS_LOG_PATH = ""
+
+    server = None if endpoint else mock_backend.start(**backend_options)
+    config.API_ENDPOINT = endpoint or server.url
+    config.API_BEARER_TOKEN = config.API_BEARER_TOKEN or "Bearer loadtest"
+    results = []
+    try:
+        next_seed = seed
+        for users in user_levels:
+            count = users * packages_per_user
+            package_paths = [benchmark.get_package(workdir, size_mb, next_seed + index) for index in range(count)]
+            next_seed += count
+            # The app prints debug output for every request
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                row = run_level(users, packages_per_user, package_paths, timeout)
+            print(format_row(row), file=sys.stderr)
+            results.append(row)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        shutil.rmtree(state_dir, ignore_errors=True)
+    return results
+
+def format_row(row):
+    return (
+        f"{row['users']:>4} users  {row['completed']}/{row['packages']} ok  "
+        f"run p50 {row['script_run_p50_ms']} ms p95 {row['script_run_p95_ms']} ms  "
+        f"migration p50 {row['migration_p50_s']} s p95 {row['migration_p95_s']} s  "
+        f"rss +{row['rss_growth_mb']} MB (peak {row['peak_rss_mb']} MB)"
+    )
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+def _round(seconds):
+    return round(seconds, 3) if seconds is not None else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Streamlit app with many simultaneous sessions.")
+    parser.add_argument("--users", type=benchmark._int_list, default=DEFAULT_USERS, help="Concurrency levels, e.g. 1,5,10,20")
+    parser.add_argument("--packages", type=int, default=2, help="Packages migrated by every user")
+    parser.add_argument("--size", type=int, default=1, help="Package size in MB")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "wmtosl-loadtest"), help="Directory for generated packages and app state")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated packages")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock backend latency per request in seconds")
+    parser.add_argument("--bandwidth", type=float, help="Mock backend speed per connection in MB/s")
+    parser.add_argument("--processing-time", type=float, default=1.0, help="Mock backend processing time per migration in seconds")
+    parser.add_argument("--status-codes", type=mock_backend.parse_status_codes, help="Status codes of migration requests with weights, e.g. 200:90,500:5,503:5")
+    parser.add_argument("--chunk-failure-rate", type=float, default=0.0, help="Share of chunk uploads the mock backend fails")
+    parser.add_argument("--poll-interval", type=float, default=config.JOB_POLL_INTERVAL, help="Seconds between UI status checks while a job is running")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds a single script run may take")
+    parser.add_argument("--endpoint", help="Use an already running backend, e.g. mock_backend.py in another process")
+    parser.add_argument("--local-conversion", action="store_true", help="Convert the generated flows locally instead of uploading them to the backend")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    # Reading session state from the user threads warns on every access
+    logging.getLogger("streamlit.runtime.scriptrunner.script_run_context").disabled = True
+    config.JOB_POLL_INTERVAL = args.poll_interval
+    backend_options = {
+        "latency": args.latency,
+        "bandwidth": args.bandwidth * 1024 * 1024 if args.bandwidth else None,
+        "processing_time": args.processing_time,
+        "status_codes": args.status_codes,
+        "chunk_failure_rate": args.chunk_failure_rate,
+    }
+    report = {
+        "revision": benchmark._git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            "users": args.users,
+            "packages_per_user": args.packages,
+            "size_mb": args.size,
+            "seed": args.seed,
+            "backend": args.endpoint or backend_options,
+            "job_workers": config.JOB_WORKERS,
+            "poll_interval": config.JOB_POLL_INTERVAL,
+            "migration_path": "local conversion" if args.local_conversion else "backend upload",
+        },
+        "results": run_load_test(
+            args.users, args.packages, args.size, args.workdir, backend_options, args.timeout,
+            seed=args.seed, endpoint=args.endpoint, local_conversion=args.local_conversion
+        ),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
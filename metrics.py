@@ -0,0 +1,255 @@
+# Timing spans for the Web Methods to SnapLogic Migration Accelerator
+#
+# Hot paths wrap their stages in span(): validate, hash, connect, tls, upload,
+# server_wait, download and parse. Events without a duration, such as the
+# circuit breaker opening, are recorded as spans of 0 ms, so their histogram
+# counts them. Every finished span is added to an in-process histogram per
+# span name and, if METRICS_LOG_PATH is set, appended to a JSON lines file,
+# which is rotated once it reaches METRICS_LOG_MAX_MB so a long-running server
+# keeps at most METRICS_LOG_BACKUPS old files next to it. Spans opened while a
+# trace is active carry its id, so all stages of one migration can be grouped.
+# With METRICS_ENABLED off a span only costs a settings lookup.
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import config
+
+# Upper bounds of the histogram buckets in milliseconds; the last bucket is unbounded
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+_lock = threading.Lock()
+_histograms = {}
+_log_file = None
+_log_path = None
+_log_size = 0
+_local = threading.local()
+
+class Histogram:
+    """
+    Bucketed distribution of span durations in milliseconds
+
+    Percentiles are estimated from the buckets, so they are exact to within
+    one bucket while memory stays constant however many spans are recorded.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.errors = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def observe(self, duration_ms, error=False):
+        self.count += 1
+        self.total += duration_ms
+        self.min = duration_ms if self.min is None else min(self.min, duration_ms)
+        self.max = duration_ms if self.max is None else max(self.max, duration_ms)
+        if error:
+            self.errors += 1
+        for index, bound in enumerate(BUCKET_BOUNDS_MS):
+            if duration_ms <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, pct):
+        """
+        Estimate a percentile by interpolating inside its bucket
+
+        Args:
+            pct: Percentile between 0 and 100
+
+        Returns:
+            float: Duration in milliseconds, or None if nothing was recorded
+        """
+        if not self.count:
+            return None
+        rank = self.count * pct / 100
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKET_BOUNDS_MS[index - 1] if index > 0 else 0
+                upper = BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "min_ms": _round(self.min),
+            "p50_ms": _round(self.percentile(50)),
+            "p95_ms": _round(self.percentile(95)),
+            "p99_ms": _round(self.percentile(99)),
+            "max_ms": _round(self.max),
+            "buckets": {
+                ("inf" if index == len(BUCKET_BOUNDS_MS) else str(BUCKET_BOUNDS_MS[index])): bucket_count
+                for index, bucket_count in enumerate(self.buckets) if bucket_count
+            },
+        }
+
+@contextmanager
+def trace(trace_id=None):
+    """
+    Group the spans opened in this thread under one trace id
+
+    Args:
+        trace_id: Id to use, e.g. the idempotency key of a migration; a new
+            one is generated if omitted
+
+    Yields:
+        str: The trace id
+    """
+    trace_id = trace_id or uuid.uuid4().hex
+    previous = getattr(_local, "trace_id", None)
+    _local.trace_id = trace_id
+    try:
+        yield trace_id
+    finally:
+        _local.trace_id = previous
+
+def current_trace():
+    """
+    Get the trace id active in this thread
+
+    Worker threads do not inherit it; pass it to trace() inside the worker.
+
+    Returns:
+        str: Trace id, or None outside of a trace
+    """
+    return getattr(_local, "trace_id", None)
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block of code as a named span
+
+    Attributes can be added while the span is open through the yielded
+    dictionary, e.g. the status code of a response. An exception marks the
+    span as failed and is re-raised.
+
+    Args:
+        name: Span name, which is also the histogram name
+        **attributes: JSON-serializable values stored with the span
+
+    Yields:
+        dict: The span attributes
+    """
+    if not config.METRICS_ENABLED:
+        yield attributes
+        return
+
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = e.__class__.__name__
+        raise
+    finally:
+        record(name, time.perf_counter() - started, started=started, error=error, **attributes)
+
+def record(name, seconds, started=None, error=None, **attributes):
+    """
+    Record a span whose duration was measured elsewhere
+
+    Args:
+        name: Span name
+        seconds: Duration in seconds
+        started: time.perf_counter() value at the start of the span, defaults
+            to now minus the duration
+        error: Name of the error that ended the span, if any
+        **attributes: JSON-serializable values stored with the span
+    """
+    if not config.METRICS_ENABLED:
+        return
+
+    now = time.perf_counter()
+    started = now - seconds if started is None else started
+    duration_ms = seconds * 1000
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(duration_ms, error=error is not None)
+
+    if config.METRICS_LOG_PATH:
+        entry = {
+            "ts": round(time.time() - (now - started), 6),
+            "span": name,
+            "duration_ms": round(duration_ms, 3),
+            "trace": current_trace(),
+            "thread": threading.current_thread().name,
+            "status": "error" if error else "ok",
+        }
+        if error:
+            entry["error"] = error
+        entry.update(attributes)
+        _write_line(json.dumps(entry, default=str))
+
+def get_metrics():
+    """
+    Get a snapshot of the span histograms of this process
+
+    Returns:
+        dict: Span name to count, error count, total/mean/min/max and
+            p50/p95/p99 in milliseconds, plus the non-empty buckets
+    """
+    with _lock:
+        return {name: histogram.to_dict() for name, histogram in sorted(_histograms.items())}
+
+def reset():
+    """
+    Clear all histograms, e.g. between benchmark cases
+    """
+    with _lock:
+        _histograms.clear()
+
+def _write_line(line):
+    global _log_file, _log_path, _log_size
+    data = line + "\n"
+    with _lock:
+        try:
+            if _log_file is None or _log_path != config.METRICS_LOG_PATH:
+                if _log_file is not None:
+                    _log_file.close()
+                directory = os.path.dirname(config.METRICS_LOG_PATH)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                _log_path = config.METRICS_LOG_PATH
+                _log_file = open(_log_path, "a", encoding="utf-8", buffering=1)
+                _log_size = os.path.getsize(_log_path)
+            if _log_size and _log_size + len(data) > config.METRICS_LOG_MAX_MB * 1024 * 1024:
+                _log_file.close()
+                _rotate_log(_log_path)
+                _log_file = open(_log_path, "a", encoding="utf-8", buffering=1)
+                _log_size = 0
+            _log_file.write(data)
+            _log_size += len(data.encode("utf-8"))
+        except OSError as e:
+            # Metrics must never break a migration
+            print(f"Could not write metrics to {config.METRICS_LOG_PATH}: {str(e)}")
+            _log_file = None
+
+def _rotate_log(path):
+    # metrics.jsonl -> metrics.jsonl.1 -> ... -> metrics.jsonl.<backups>, dropping the oldest
+    backups = config.METRICS_LOG_BACKUPS
+    if backups < 1:
+        os.remove(path)
+        return
+    for number in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{number}"):
+            os.replace(f"{path}.{number}", f"{path}.{number + 1}")
+    os.replace(path, f"{path}.1")
+
+def _round(value):
+    return round(value, 3) if value is not None else None
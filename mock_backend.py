@@ -0,0 +1,455 @@
+# Local stand-in for the SnapLogic migration backend
+#
+# Speaks the same contract as config.API_ENDPOINT so uploads can be exercised,
+# benchmarked and load-tested offline:
+#
+#   POST /migrate                                multipart package upload
+#   POST /migrate/uploads                        open a chunked upload
+#   GET  /migrate/uploads/<id>                   acknowledged chunks of an upload
+#   PUT  /migrate/uploads/<id>/chunks/<index>    store one chunk
+#   POST /migrate/uploads/<id>/complete          verify the checksum and migrate
+#   GET  /migrate/jobs/<id>                      status of an asynchronous migration
+#
+# POST requests carrying an Idempotency-Key header are answered from the first
+# response given for that key, so a retried request never migrates twice.
+# Migration payloads come from api_helpers.simulate_processing.
+#
+#   python mock_backend.py --port 8765 --latency 0.1 --bandwidth 2 \
+#       --status-codes 200:90,500:5,503:5 --throttle-every 50 --throttle-burst 5 \
+#       --response-kb 256 --processing-time 5 --async-jobs
+#
+# Then point SNAPLOGIC_API_ENDPOINT at http://127.0.0.1:8765/migrate.
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import api_helpers
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+
+_UPLOAD_RE = re.compile(r"^/uploads/(?P<upload_id>[0-9a-f]+)(?:/(?P<action>complete|chunks/(?P<index>\d+)))?$")
+_JOB_RE = re.compile(r"^/jobs/(?P<job_id>[0-9a-f]+)$")
+
+class MockBackend(ThreadingHTTPServer):
+    """
+    HTTP server holding the settings and state of the mock backend
+
+    Chunks are written to a temporary directory and removed once an upload is
+    completed or the server is closed.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, base_path="/migrate", latency=0.0, latency_jitter=0.0, bandwidth=None,
+                 chunk_failure_rate=0.0, status_codes=None, throttle_every=0, throttle_burst=0,
+                 retry_after=1, response_kb=0, processing_time=0.0, processing_per_mb=0.0, async_jobs=False):
+        """
+        Args:
+            address: (host, port) to listen on
+            base_path: Path of the migration endpoint
+            latency: Seconds added to every request
+            latency_jitter: Up to this many seconds added at random on top of latency
+            bandwidth: Bytes per second of each connection in both directions, None for unlimited
+            chunk_failure_rate: Share of chunk uploads answered with 503
+            status_codes: Dictionary of status code to weight for migration requests
+            throttle_every: After this many requests, answer the next throttle_burst with 429
+            throttle_burst: Number of requests answered with 429 per burst
+            retry_after: Retry-After seconds sent with 429 and 503 responses
+            response_kb: Pad migration results to about this many KB
+            processing_time: Seconds a migration takes once the package is received
+            processing_per_mb: Seconds added to processing_time per MB of package
+            async_jobs: Answer migrations with 202 and a status URL instead of waiting
+        """
+        super().__init__(address, MockRequestHandler)
+        self.base_path = "/" + base_path.strip("/")
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.bandwidth = bandwidth
+        self.chunk_failure_rate = chunk_failure_rate
+        self.status_codes = status_codes or {200: 1}
+        self.throttle_every = throttle_every
+        self.throttle_burst = throttle_burst
+        self.retry_after = retry_after
+        self.response_kb = response_kb
+        self.processing_time = processing_time
+        self.processing_per_mb = processing_per_mb
+        self.async_jobs = async_jobs
+
+        self.storage_dir = tempfile.mkdtemp(prefix="wmtosl-mock-")
+        self.uploads = {}
+        self.jobs = {}
+        self.idempotent_responses = {}
+        self.lock = threading.Lock()
+        self.stats = {
+            "requests": 0, "chunks": 0, "failed_chunks": 0, "migrations": 0,
+            "replayed": 0, "throttled": 0, "injected_errors": 0,
+        }
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{self.base_path}"
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+            return self.stats[name]
+
+    def is_throttled(self, request_number):
+        # Requests are accepted in runs of throttle_every followed by throttle_burst 429s
+        if not self.throttle_every or not self.throttle_burst:
+            return False
+        return (request_number - 1) % (self.throttle_every + self.throttle_burst) >= self.throttle_every
+
+    def pick_status(self):
+        codes = list(self.status_codes)
+        return random.choices(codes, weights=[self.status_codes[code] for code in codes])[0]
+
+    def server_close(self):
+        super().server_close()
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    server_version = "WmToSlMock/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        path = self._route()
+        if path is None:
+            return
+        if self.idempotency_key in self.server.idempotent_responses:
+            self._read_body()
+            self.server.count("replayed")
+            return self._send_json(*self.server.idempotent_responses[self.idempotency_key])
+        if path == "":
+            size = len(self._read_body())
+            return self._migrate(size)
+        if path == "/uploads":
+            return self._open_upload()
+        match = _UPLOAD_RE.match(path)
+        if match and match.group("action") == "complete":
+            return self._complete_upload(match.group("upload_id"))
+        self._read_body()
+        self._send_json(404, {"error": "Not found"})
+
+    def do_GET(self):
+        path = self._route()
+        if path is None:
+            return
+        match = _JOB_RE.match(path)
+        if match:
+            return self._job_status(match.group("job_id"))
+        match = _UPLOAD_RE.match(path)
+        if not match or match.group("action"):
+            return self._send_json(404, {"error": "Not found"})
+        upload = self.server.uploads.get(match.group("upload_id"))
+        if upload is None:
+            return self._send_json(404, {"error": "Unknown upload"})
+        self._send_json(200, _upload_state(upload))
+
+    def do_PUT(self):
+        path = self._route()
+        if path is None:
+            return
+        match = _UPLOAD_RE.match(path)
+        if not match or match.group("index") is None:
+            self._read_body()
+            return self._send_json(404, {"error": "Not found"})
+        self._store_chunk(match.group("upload_id"), int(match.group("index")))
+
+    def _route(self):
+        # Common handling: latency, throttling, authorization and stripping the base path
+        request_number = self.server.count("requests")
+        self.idempotency_key = self.headers.get("Idempotency-Key") if self.command == "POST" else None
+        delay = self.server.latency + random.uniform(0, self.server.latency_jitter)
+        if delay:
+            time.sleep(delay)
+        if self.server.is_throttled(request_number):
+            self._read_body()
+            self.server.count("throttled")
+            self._send_json(429, {"error": "Too many requests"}, {"Retry-After": str(self.server.retry_after)})
+            return None
+        if not self.headers.get("Authorization"):
+            self._read_body()
+            self._send_json(401, {"error": "Missing Authorization header"})
+            return None
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if not path.startswith(self.server.base_path):
+            self._read_body()
+            self._send_json(404, {"error": "Not found"})
+            return None
+        return path[len(self.server.base_path):]
+
+    def _migrate(self, package_size):
+        # The package has been received; answer like the backend would
+        status = self.server.pick_status()
+        if status >= 300:
+            self.server.count("injected_errors")
+            headers = {"Retry-After": str(self.server.retry_after)} if status in (429, 503) else None
+            return self._send_json(status, {"error": f"Injected {status} response"}, headers)
+
+        result = migration_result(package_size, self.server.response_kb)
+        self.server.count("migrations")
+        duration = self.server.processing_time + self.server.processing_per_mb * package_size / (1024 * 1024)
+        if self.server.async_jobs:
+            job_id = uuid.uuid4().hex
+            with self.server.lock:
+                self.server.jobs[job_id] = {"started_at": time.time(), "duration": duration, "result": result}
+            status_url = f"{self.server.base_path}/jobs/{job_id}"
+            return self._send_json(202, {"statusUrl": status_url}, {"Location": status_url})
+
+        if duration:
+            time.sleep(duration)
+        self._send_json(200, result)
+
+    def _job_status(self, job_id):
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            return self._send_json(404, {"error": "Unknown job"})
+        elapsed = time.time() - job["started_at"]
+        if elapsed >= job["duration"]:
+            return self._send_json(200, {"status": "completed", "progress": 100, "result": job["result"]})
+        self._send_json(200, {
+            "status": "running",
+            "progress": int(elapsed * 100 / job["duration"]),
+            "message": "Converting services...",
+        })
+
+    def _open_upload(self):
+        request = json.loads(self._read_body() or b"{}")
+        upload_id = uuid.uuid4().hex
+        upload = {
+            "id": upload_id,
+            "file_name": request.get("fileName") or "package.zip",
+            "size": int(request.get("size") or 0),
+            "sha256": request.get("sha256") or "",
+            "chunk_size": int(request.get("chunkSize") or DEFAULT_CHUNK_SIZE),
+            "received": set(),
+            "dir": os.path.join(self.server.storage_dir, upload_id),
+        }
+        os.makedirs(upload["dir"])
+        with self.server.lock:
+            self.server.uploads[upload_id] = upload
+        self._send_json(201, _upload_state(upload))
+
+    def _store_chunk(self, upload_id, index):
+        data = self._read_body()
+        upload = self.server.uploads.get(upload_id)
+        if upload is None:
+            return self._send_json(404, {"error": "Unknown upload"})
+        if random.random() < self.server.chunk_failure_rate:
+            self.server.count("failed_chunks")
+            return self._send_json(503, {"error": "Injected chunk failure"})
+        expected_hash = self.headers.get("X-Chunk-Sha256")
+        if expected_hash and hashlib.sha256(data).hexdigest() != expected_hash:
+            return self._send_json(400, {"error": f"Checksum mismatch for chunk {index}"})
+
+        temp_path = os.path.join(upload["dir"], f"{index}.{threading.get_ident()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, os.path.join(upload["dir"], f"{index}.part"))
+        with self.server.lock:
+            upload["received"].add(index)
+        self.server.count("chunks")
+        self._send_json(200, {"index": index, "size": len(data)})
+
+    def _complete_upload(self, upload_id):
+        request = json.loads(self._read_body() or b"{}")
+        upload = self.server.uploads.get(upload_id)
+        if upload is None:
+            return self._send_json(404, {"error": "Unknown upload"})
+
+        chunk_count = max(1, -(-upload["size"] // upload["chunk_size"]))
+        missing = [index for index in range(chunk_count) if index not in upload["received"]]
+        if missing:
+            return self._send_json(409, {"error": "Upload is incomplete", "missingChunks": missing})
+
+        digest = hashlib.sha256()
+        size = 0
+        for index in range(chunk_count):
+            with open(os.path.join(upload["dir"], f"{index}.part"), "rb") as f:
+                while True:
+                    data = f.read(COPY_BUFFER_SIZE)
+                    if not data:
+                        break
+                    digest.update(data)
+                    size += len(data)
+        if digest.hexdigest() != (request.get("sha256") or upload["sha256"]) or size != upload["size"]:
+            return self._send_json(422, {"error": "Package checksum does not match the uploaded chunks"})
+
+        with self.server.lock:
+            self.server.uploads.pop(upload_id, None)
+        shutil.rmtree(upload["dir"], ignore_errors=True)
+        self._migrate(size)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not self.server.bandwidth:
+            return self.rfile.read(length) if length else b""
+
+        # Throttle each connection like a link whose round trip limits throughput
+        parts = []
+        started = time.time()
+        received = 0
+        while received < length:
+            data = self.rfile.read(min(COPY_BUFFER_SIZE, length - received))
+            if not data:
+                break
+            parts.append(data)
+            received += len(data)
+            self._wait_for_bandwidth(started, received)
+        return b"".join(parts)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        started = time.time()
+        for offset in range(0, len(data), COPY_BUFFER_SIZE):
+            self.wfile.write(data[offset:offset + COPY_BUFFER_SIZE])
+            if self.server.bandwidth:
+                self._wait_for_bandwidth(started, min(offset + COPY_BUFFER_SIZE, len(data)))
+
+        if self.idempotency_key and 200 <= status < 300:
+            with self.server.lock:
+                self.server.idempotent_responses.setdefault(self.idempotency_key, (status, body, headers))
+
+    def _wait_for_bandwidth(self, started, transferred):
+        delay = started + transferred / self.server.bandwidth - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+def _upload_state(upload):
+    return {
+        "uploadId": upload["id"],
+        "chunkSize": upload["chunk_size"],
+        "receivedChunks": sorted(upload["received"]),
+    }
+
+def migration_result(package_size, response_kb=0):
+    """
+    Build the response returned for a migrated package
+
+    The payload is the one produced by api_helpers.simulate_processing, padded
+    with generated pipelines when a larger response is requested.
+
+    Args:
+        package_size: Size of the received package in bytes
+        response_kb: Approximate size of the response in KB, 0 for no padding
+
+    Returns:
+        dict: Migration result
+    """
+    result = dict(api_helpers.simulate_processing(api_helpers.get_migration_options())["data"])
+    result["migrationId"] = uuid.uuid4().hex[:12]
+    result["packageSize"] = package_size
+
+    pipelines = []
+    size = len(json.dumps(result))
+    while size < response_kb * 1024:
+        pipeline = {
+            "name": f"pipeline_{len(pipelines):05d}",
+            "service": f"mock.services:service_{len(pipelines):05d}",
+            "snaps": random.randint(3, 40),
+            "warnings": [],
+        }
+        pipelines.append(pipeline)
+        size += len(json.dumps(pipeline)) + 2
+    if pipelines:
+        result["pipelines"] = pipelines
+    return result
+
+def parse_status_codes(value):
+    """
+    Parse a status code distribution such as "200:90,500:5,503:5"
+
+    Args:
+        value: Comma-separated code:weight pairs
+
+    Returns:
+        dict: Status code mapped to its weight
+    """
+    codes = {}
+    for item in value.split(","):
+        code, _, weight = item.partition(":")
+        codes[int(code)] = float(weight or 1)
+    return codes
+
+def start(host="127.0.0.1", port=0, **options):
+    """
+    Start the mock backend on a background thread
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on, 0 picks a free one
+        **options: Settings passed to MockBackend
+
+    Returns:
+        MockBackend: Running server; its url property is the API endpoint
+    """
+    server = MockBackend((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, name="mock-backend", daemon=True)
+    thread.start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the SnapLogic migration backend.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Up to this many random seconds added on top of --latency")
+    parser.add_argument("--bandwidth", type=float, help="Speed of each connection in MB/s (unlimited by default)")
+    parser.add_argument("--chunk-failure-rate", type=float, default=0.0, help="Share of chunk uploads answered with 503")
+    parser.add_argument("--status-codes", type=parse_status_codes, help="Status codes of migration requests with weights, e.g. 200:90,500:5,503:5")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Requests accepted between bursts of 429 responses")
+    parser.add_argument("--throttle-burst", type=int, default=0, help="Requests answered with 429 per burst")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429 and 503 responses")
+    parser.add_argument("--response-kb", type=int, default=0, help="Pad migration results to about this many KB")
+    parser.add_argument("--processing-time", type=float, default=0.0, help="Seconds a migration takes once the package is received")
+    parser.add_argument("--processing-per-mb", type=float, default=0.0, help="Seconds added to --processing-time per MB of package")
+    parser.add_argument("--async-jobs", action="store_true", help="Answer migrations with 202 and a status URL")
+    args = parser.parse_args(argv)
+
+    server = MockBackend(
+        (args.host, args.port),
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        bandwidth=args.bandwidth * 1024 * 1024 if args.bandwidth else None,
+        chunk_failure_rate=args.chunk_failure_rate,
+        status_codes=args.status_codes,
+        throttle_every=args.throttle_every,
+        throttle_burst=args.throttle_burst,
+        retry_after=args.retry_after,
+        response_kb=args.response_kb,
+        processing_time=args.processing_time,
+        processing_per_mb=args.processing_per_mb,
+        async_jobs=args.async_jobs
+    )
+    print(f"Mock backend listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# Offline indexer for Web Methods packages
+#
+# Reads the package ZIP in place: the central directory gives the list of
+# entries, and manifest.v3, ns/**/node.ndf and ns/**/flow.xml are stream-parsed
+# straight from the archive one entry at a time, so nothing is extracted to
+# disk and memory stays proportional to the index rather than the package.
+import posixpath
+import zipfile
+from xml.parsers import expat
+
+MANIFEST_NAME = "manifest.v3"
+NODE_FILE_NAME = "node.ndf"
+FLOW_FILE_NAME = "flow.xml"
+
+# Flow steps counted per flow service
+FLOW_STEP_TAGS = ("INVOKE", "MAP", "BRANCH", "LOOP", "SEQUENCE", "REPEAT", "EXIT", "RETRY")
+
+def index_package(source):
+    """
+    Build an in-memory index of a Web Methods package ZIP
+
+    Args:
+        source: Path or readable, seekable file-like object with the ZIP bytes
+
+    Returns:
+        dict: Package index with the manifest, every namespace node keyed by its
+            namespace name, the flow step counts and invoked services of each
+            flow service, and a summary with counts per node kind
+
+    Raises:
+        zipfile.BadZipFile: If the source is not a ZIP archive
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+    with zipfile.ZipFile(source) as archive:
+        infos = archive.infolist()
+        root = find_package_root(infos)
+
+        index = {
+            "package_name": posixpath.basename(root.rstrip("/")) or None,
+            "root": root,
+            "manifest": {},
+            "nodes": {},
+            "flows": {},
+            "unreadable_entries": [],
+            "entry_count": len(infos),
+            "uncompressed_size": sum(info.file_size for info in infos),
+        }
+
+        for info in infos:
+            if info.is_dir() or not info.filename.startswith(root):
+                continue
+            relative_name = info.filename[len(root):]
+
+            try:
+                _index_entry(archive, info, relative_name, index)
+            except expat.ExpatError:
+                # A malformed node should not hide the rest of the package
+                index["unreadable_entries"].append(info.filename)
+
+    index["summary"] = summarize(index)
+    return index
+
+def _index_entry(archive, info, relative_name, index):
+    if relative_name == MANIFEST_NAME:
+        with archive.open(info) as f:
+            index["manifest"] = _parse_values(f)
+        return
+
+    if not relative_name.startswith("ns/"):
+        return
+
+    file_name = posixpath.basename(relative_name)
+    node_name = namespace_name(relative_name)
+    if node_name is None:
+        return
+
+    if file_name == NODE_FILE_NAME:
+        with archive.open(info) as f:
+            values = _parse_values(f)
+        node = index["nodes"].setdefault(node_name, {})
+        node.update(
+            path=posixpath.dirname(info.filename),
+            node_type=values.get("node_type"),
+            svc_type=values.get("svc_type"),
+            svc_subtype=values.get("svc_subtype"),
+        )
+        node["kind"] = _classify_node(values)
+    elif file_name == FLOW_FILE_NAME:
+        with archive.open(info) as f:
+            index["flows"][node_name] = _parse_flow(f)
+        index["nodes"].setdefault(node_name, {"kind": "flow", "path": posixpath.dirname(info.filename)})
+
+def find_package_root(infos):
+    """
+    Find the directory inside the ZIP that holds the package
+
+    Packages are zipped either with manifest.v3 at the top level or inside a
+    single folder named after the package.
+
+    Args:
+        infos: List of zipfile.ZipInfo entries
+
+    Returns:
+        str: Prefix of the package root ("" or "<folder>/")
+    """
+    best = None
+    for info in infos:
+        name = info.filename
+        if posixpath.basename(name) == MANIFEST_NAME and name.count("/") <= 1:
+            root = name[:-len(MANIFEST_NAME)]
+            if best is None or len(root) < len(best):
+                best = root
+    return best or ""
+
+def namespace_name(relative_name):
+    """
+    Convert a path below the package root into a namespace name
+
+    "ns/orders/util/getOrder/flow.xml" becomes "orders.util:getOrder".
+
+    Args:
+        relative_name: Entry name relative to the package root
+
+    Returns:
+        str: Namespace name, or None for entries directly under ns/
+    """
+    parts = relative_name.split("/")[1:-1]
+    if len(parts) < 2:
+        return None
+    return f"{'.'.join(parts[:-1])}:{parts[-1]}"
+
+def summarize(index):
+    """
+    Count the nodes of an index by kind
+
+    Args:
+        index: Package index returned by index_package
+
+    Returns:
+        dict: Number of services, flows, document types and adapters
+    """
+    kinds = [node.get("kind") for node in index["nodes"].values()]
+    return {
+        "services": sum(1 for kind in kinds if kind in ("flow", "java", "adapter", "service")),
+        "flows": sum(1 for kind in kinds if kind == "flow"),
+        "java_services": sum(1 for kind in kinds if kind == "java"),
+        "document_types": sum(1 for kind in kinds if kind == "document"),
+        "adapters": sum(1 for kind in kinds if kind == "adapter"),
+        "other": sum(1 for kind in kinds if kind == "other"),
+        "flow_steps": sum(sum(flow["steps"].values()) for flow in index["flows"].values()),
+    }
+
+def _classify_node(values):
+    node_type = (values.get("node_type") or "").lower()
+    svc_type = (values.get("svc_type") or "").lower()
+    svc_subtype = (values.get("svc_subtype") or "").lower()
+
+    if node_type == "record":
+        return "document"
+    if "adapter" in svc_type or "adapter" in svc_subtype:
+        return "adapter"
+    if svc_type == "flow":
+        return "flow"
+    if svc_type == "java":
+        return "java"
+    if node_type == "service" or svc_type:
+        return "service"
+    return "other"
+
+def _parse_values(f):
+    """
+    Read the top-level <value name="..."> entries of an IData XML document
+
+    Nested records are skipped and nothing but the collected values is kept.
+    """
+    values = {}
+    state = {"depth": 0, "name": None, "text": []}
+
+    def start(tag, attrs):
+        state["depth"] += 1
+        if state["depth"] == 2 and tag == "value":
+            state["name"] = attrs.get("name")
+            state["text"] = []
+
+    def end(tag):
+        if state["depth"] == 2 and state["name"]:
+            values[state["name"]] = "".join(state["text"]).strip()
+            state["name"] = None
+        state["depth"] -= 1
+
+    def characters(data):
+        if state["name"] is not None and state["depth"] == 2:
+            state["text"].append(data)
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    parser.ParseFile(f)
+    return values
+
+def _parse_flow(f):
+    """
+    Count the steps of a flow.xml document and collect the services it invokes
+    """
+    steps = {}
+    invokes = {}
+
+    def start(tag, attrs):
+        if tag in FLOW_STEP_TAGS:
+            steps[tag] = steps.get(tag, 0) + 1
+            if tag == "INVOKE" and attrs.get("SERVICE"):
+                # A dict keeps the first-call order without duplicates
+                invokes[attrs["SERVICE"].strip()] = None
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.ParseFile(f)
+    return {"steps": steps, "invokes": list(invokes)}
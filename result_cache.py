@@ -0,0 +1,137 @@
+# Disk-backed cache of migration results for the Web Methods to SnapLogic Migration Accelerator
+#
+# Results are content-addressed: the key is the SHA-256 of the package bytes
+# plus the migration options, so re-submitting an identical package returns
+# the stored result instead of paying the backend round trip again. Entries
+# expire after RESULT_CACHE_TTL_SECONDS and the least recently used ones are
+# evicted once the cache grows past RESULT_CACHE_MAX_MB.
+import hashlib
+import json
+import os
+import threading
+import time
+
+import config
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+def make_key(package_hash, migration_options):
+    """
+    Build the cache key for a package and its migration options
+
+    Args:
+        package_hash: SHA-256 hex digest of the package bytes
+        migration_options: Dictionary with migration settings
+
+    Returns:
+        str: Cache key
+    """
+    options = json.dumps(migration_options, sort_keys=True)
+    return hashlib.sha256(f"{package_hash}:{options}".encode("utf-8")).hexdigest()
+
+def get(key):
+    """
+    Look up a cached migration result
+
+    Args:
+        key: Key returned by make_key
+
+    Returns:
+        dict: The cached API response, or None on a miss or expired entry
+    """
+    path = _entry_path(key)
+    with _lock:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            _stats["misses"] += 1
+            return None
+
+        if time.time() - entry["created_at"] > config.RESULT_CACHE_TTL_SECONDS:
+            _remove(path)
+            _stats["misses"] += 1
+            return None
+
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path)
+        _stats["hits"] += 1
+        return entry["result"]
+
+def put(key, result):
+    """
+    Store a successful migration result
+
+    Args:
+        key: Key returned by make_key
+        result: API response dictionary to cache
+    """
+    if not result.get("success"):
+        return
+
+    os.makedirs(config.RESULT_CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with _lock:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.time(), "result": result}, f)
+        os.replace(temp_path, path)
+        _stats["stores"] += 1
+        _evict()
+
+def get_stats():
+    """
+    Get cache hit/miss counters for this process
+
+    Returns:
+        dict: Counters plus the current number of entries and size in bytes
+    """
+    with _lock:
+        entries = _list_entries()
+        stats = dict(_stats)
+    stats["entries"] = len(entries)
+    stats["size_bytes"] = sum(size for _, size, _ in entries)
+    return stats
+
+def _entry_path(key):
+    return os.path.join(config.RESULT_CACHE_DIR, f"{key}.json")
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _list_entries():
+    entries = []
+    try:
+        names = os.listdir(config.RESULT_CACHE_DIR)
+    except OSError:
+        return entries
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(config.RESULT_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((path, stat.st_size, stat.st_mtime))
+    return entries
+
+def _evict():
+    entries = _list_entries()
+    now = time.time()
+    max_bytes = config.RESULT_CACHE_MAX_MB * 1024 * 1024
+    total = sum(size for _, size, _ in entries)
+
+    # Drop expired entries first, then the least recently used ones until under the size limit
+    entries.sort(key=lambda entry: entry[2])
+    for path, size, mtime in entries:
+        expired = now - mtime > config.RESULT_CACHE_TTL_SECONDS
+        if not expired and total <= max_bytes:
+            continue
+        _remove(path)
+        total -= size
+        _stats["evictions"] += 1
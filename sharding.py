@@ -0,0 +1,394 @@
+# Sharded migrations for the Web Methods to SnapLogic Migration Accelerator
+#
+# A large package is split into shards that the backend can migrate on
+# separate workers. Services that never call each other, directly or through
+# other services, are independent; such groups (the weakly connected
+# components of the call graph) are packed into shards of similar size. A
+# group larger than one shard is cut along its dependency order, only between
+# strongly connected components, so each piece only calls into earlier
+# pieces, which the backend treats like calls into another package. Services
+# that call each other in a cycle always stay in one piece, however large.
+# Folders and document types are copied into every
+# shard; files outside ns/ (Java code, resources) go with the first shard only.
+#
+# Shards are uploaded concurrently and their results merged into one, so a
+# migration takes about as long as its largest shard.
+import heapq
+import io
+import json
+import os
+import posixpath
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+
+import api_helpers
+import config
+import dependency_graph
+import field_mappings
+import json_stream
+import package_index
+
+# Result fields that are averages rather than totals; merged weighted by shard services
+AVERAGED_FIELDS = ("conversionRate",)
+
+def send_package(uploaded_file, migration_options, progress_callback=None, mappings=None):
+    """
+    Migrate a package, split into shards that are migrated in parallel if it is large
+
+    Packages with at most SHARD_SERVICES services, and every package while
+    ENABLE_SHARDING is off, are sent in one request.
+
+    The caller is expected to hold one api_helpers.backend_slot(); further
+    shards only run in parallel while more slots are free.
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        migration_options: Dictionary with migration settings
+        progress_callback: Optional callable(stage, stage_progress, message)
+        mappings: Optional result of field_mappings.map_package; every
+            upload carries the mappings of the services it contains
+
+    Returns:
+        dict: API response or error message; sharded migrations carry a
+            "shards" list with the size and duration of every shard
+    """
+    plan = plan_shards(uploaded_file) if config.ENABLE_SHARDING else None
+    if plan is None or len(plan["shards"]) < 2:
+        return api_helpers.send_to_api(
+            uploaded_file, migration_options,
+            progress_callback=progress_callback,
+            extra_fields=field_mappings.form_fields(mappings)
+        )
+    return send_shards(uploaded_file, plan, migration_options, progress_callback=progress_callback, mappings=mappings)
+
+def plan_shards(uploaded_file):
+    """
+    Split the services of a package into shards of similar size
+
+    Args:
+        uploaded_file: The file uploaded by the user
+
+    Returns:
+        dict: Package root, the directories of all services and those of
+            each shard, or None if the package is too small to be worth splitting
+    """
+    uploaded_file.seek(0)
+    index = package_index.index_package(uploaded_file)
+    graph = dependency_graph.get_graph(uploaded_file, api_helpers.hash_upload(uploaded_file), index=index)
+    services = [node for node in range(graph.node_count) if not graph.external[node]]
+    if len(services) <= config.SHARD_SERVICES:
+        return None
+
+    uploaded_file.seek(0)
+    with zipfile.ZipFile(uploaded_file) as archive:
+        infos = archive.infolist()
+    uploaded_file.seek(0)
+    root = index["root"]
+    dir_sizes = {}
+    for info in infos:
+        if not info.is_dir() and info.filename.startswith(root):
+            directory = posixpath.dirname(info.filename)
+            dir_sizes[directory] = dir_sizes.get(directory, 0) + info.file_size
+
+    service_dirs = {node: index["nodes"][graph.names[node]].get("path") for node in services}
+    weights = {node: 1 + dir_sizes.get(service_dirs[node], 0) for node in services}
+    # More shards than can run at once would only make the slowest lane longer
+    shard_count = min(config.SHARD_PARALLELISM, -(-len(services) // config.SHARD_SERVICES))
+    target = sum(weights.values()) / shard_count
+
+    # Groups of services that are independent of each other, cut into pieces no larger than a
+    # shard between the components of their dependency order; a cycle is never cut
+    pieces = []
+    for group in _independent_groups(graph, services):
+        piece, piece_weight = [], 0
+        for component in group:
+            piece.extend(component)
+            piece_weight += sum(weights[node] for node in component)
+            if piece_weight >= target:
+                pieces.append((piece_weight, piece))
+                piece, piece_weight = [], 0
+        if piece:
+            pieces.append((piece_weight, piece))
+
+    # Largest piece first onto the lightest shard
+    heap = [(0, shard) for shard in range(shard_count)]
+    assignments = [[] for _ in range(shard_count)]
+    for piece_weight, piece in sorted(pieces, key=lambda item: -item[0]):
+        weight, shard = heapq.heappop(heap)
+        assignments[shard].extend(piece)
+        heapq.heappush(heap, (weight + piece_weight, shard))
+
+    return {
+        "root": root,
+        "service_dirs": sorted(set(service_dirs.values())),
+        "shards": [
+            {
+                "services": len(nodes),
+                "names": [graph.names[node] for node in nodes],
+                "dirs": sorted({service_dirs[node] for node in nodes}),
+                "weight": sum(weights[node] for node in nodes),
+            }
+            for nodes in assignments if nodes
+        ],
+    }
+
+def write_shard_package(uploaded_file, plan, shard_index):
+    """
+    Write the ZIP of one shard to a temp file
+
+    Entries are copied one at a time without loading the package into memory.
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        plan: Shard plan returned by plan_shards
+        shard_index: Position of the shard in plan["shards"]
+
+    Returns:
+        str: Path of the shard ZIP; the caller removes it
+    """
+    # Directories of services in other shards are left out; folders and document types are copied
+    skipped_dirs = set(plan["service_dirs"]).difference(plan["shards"][shard_index]["dirs"])
+    fd, path = tempfile.mkstemp(suffix=".zip", prefix=f"wmtosl-shard{shard_index}-")
+    os.close(fd)
+    copy_entries(uploaded_file, path, plan["root"], skipped_dirs, other_files=shard_index == 0)
+    return path
+
+def copy_entries(uploaded_file, path, root, skipped_dirs, other_files=True):
+    """
+    Write a ZIP with the entries of a package except some service directories
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        path: Path of the ZIP to write
+        root: Package root prefix inside the ZIP
+        skipped_dirs: Directories under ns/ whose files are left out
+        other_files: Whether files outside ns/ other than the manifest are copied
+    """
+    ns_prefix = f"{root}ns/"
+    with zipfile.ZipFile(uploaded_file) as source, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            if info.is_dir() or not info.filename.startswith(root):
+                continue
+            relative_name = info.filename[len(root):]
+            if info.filename.startswith(ns_prefix):
+                if posixpath.dirname(info.filename) in skipped_dirs:
+                    continue
+            elif relative_name != package_index.MANIFEST_NAME and not other_files:
+                continue
+            with source.open(info) as src, target.open(info.filename, "w") as dst:
+                shutil.copyfileobj(src, dst, config.UPLOAD_CHUNK_SIZE)
+
+def send_shards(uploaded_file, plan, migration_options, progress_callback=None, mappings=None):
+    """
+    Upload the shards of a package concurrently and merge their results
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        plan: Shard plan returned by plan_shards
+        migration_options: Dictionary with migration settings
+        progress_callback: Optional callable(stage, stage_progress, message)
+        mappings: Optional result of field_mappings.map_package
+
+    Returns:
+        dict: Merged API response, or the error of the first failed shard
+    """
+    shard_count = len(plan["shards"])
+    group_id = uuid.uuid4().hex
+    pending = queue.Queue()
+    for shard_index in range(shard_count):
+        pending.put(shard_index)
+    results = [None] * shard_count
+    progress = [0] * shard_count
+    lock = threading.Lock()
+    # Lanes read the package concurrently, so each shard gets its own reader of the already open package
+    package_bytes = None if isinstance(uploaded_file, api_helpers.PackageFile) else uploaded_file.getvalue()
+
+    def report(message):
+        if progress_callback:
+            with lock:
+                overall = sum(progress) // shard_count
+            progress_callback("processing", overall, message)
+
+    def run_shard(shard_index):
+        def on_progress(stage, stage_progress, message):
+            with lock:
+                # Uploading counts for the first half of a shard, the backend for the rest
+                if stage == "uploading":
+                    progress[shard_index] = (stage_progress or 0) // 2
+                else:
+                    progress[shard_index] = max(progress[shard_index], 50 + (stage_progress or 0) // 2)
+            report(f"Migrating {shard_count} shards in parallel... shard {shard_index + 1}: {message}")
+
+        started = time.time()
+        source = uploaded_file.open_reader() if package_bytes is None else io.BytesIO(package_bytes)
+        with source:
+            path = write_shard_package(source, plan, shard_index)
+        try:
+            with api_helpers.PackageFile(path, f"shard{shard_index + 1}-{uploaded_file.name}") as shard_file:
+                shard_bytes = shard_file.size
+                result = api_helpers.send_to_api(
+                    shard_file,
+                    migration_options,
+                    progress_callback=on_progress,
+                    extra_fields={
+                        "shardGroup": group_id,
+                        "shardIndex": str(shard_index),
+                        "shardCount": str(shard_count),
+                        **field_mappings.form_fields(mappings, plan["shards"][shard_index]["names"]),
+                    }
+                )
+        finally:
+            os.remove(path)
+        with lock:
+            progress[shard_index] = 100
+            results[shard_index] = result
+            plan["shards"][shard_index].update(bytes=shard_bytes, elapsed_s=round(time.time() - started, 3))
+        report(f"{sum(1 for item in results if item is not None)} of {shard_count} shards migrated")
+
+    def lane(extra_slot):
+        try:
+            while True:
+                try:
+                    shard_index = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    run_shard(shard_index)
+                except Exception as e:
+                    with lock:
+                        results[shard_index] = {"success": False, "error": f"Unexpected error: {str(e)}"}
+        finally:
+            if extra_slot is not None:
+                extra_slot.release()
+
+    # The caller's backend slot runs the first lane; every further lane needs a free slot of its own
+    report(f"Uploading {shard_count} shards...")
+    slot = api_helpers.backend_slot()
+    threads = []
+    for _ in range(min(config.SHARD_PARALLELISM, shard_count) - 1):
+        if not slot.acquire(blocking=False):
+            break
+        thread = threading.Thread(target=lane, args=(slot,), name="migration-shard", daemon=True)
+        thread.start()
+        threads.append(thread)
+    lane(None)
+    for thread in threads:
+        thread.join()
+
+    for shard_index, result in enumerate(results):
+        if not result.get("success"):
+            return {"success": False, "error": f"Shard {shard_index + 1} of {shard_count} failed: {result.get('error')}"}
+
+    merged = merge_shard_results(results, [shard["services"] for shard in plan["shards"]])
+    merged["shards"] = [
+        {key: shard[key] for key in ("services", "bytes", "elapsed_s")}
+        for shard in plan["shards"]
+    ]
+    return merged
+
+def merge_shard_results(results, service_counts):
+    """
+    Combine the API responses of the shards of a package into one
+
+    Lists are concatenated, dictionaries combined, counts added up and
+    flags only kept if every shard set them; fields in AVERAGED_FIELDS are
+    averaged weighted by the services of each shard. Lists that were written to disk while downloading are
+    concatenated into a new file. Other fields are taken from the first shard.
+
+    Args:
+        results: Successful API responses in shard order
+        service_counts: Number of services in each shard
+
+    Returns:
+        dict: Merged API response
+    """
+    datas = [result.get("data") if isinstance(result.get("data"), dict) else {} for result in results]
+    merged = {}
+    for key in dict.fromkeys(key for data in datas for key in data):
+        values = [(data[key], count) for data, count in zip(datas, service_counts) if key in data]
+        first = values[0][0]
+        if any(json_stream.is_spooled(value) for value, _ in values):
+            merged[key] = _concatenate_spooled(key, [value for value, _ in values])
+        elif all(isinstance(value, list) for value, _ in values):
+            merged[key] = [item for value, _ in values for item in value]
+        elif all(isinstance(value, dict) for value, _ in values):
+            merged[key] = {}
+            for value, _ in values:
+                merged[key].update(value)
+        elif all(isinstance(value, bool) for value, _ in values):
+            merged[key] = all(value for value, _ in values)
+        elif all(isinstance(value, (int, float)) and not isinstance(value, bool) for value, _ in values):
+            if key in AVERAGED_FIELDS:
+                total = sum(count for _, count in values) or 1
+                merged[key] = round(sum(value * count for value, count in values) / total, 2)
+            else:
+                merged[key] = sum(value for value, _ in values)
+        else:
+            merged[key] = first
+    return {"success": True, "data": merged}
+
+def _concatenate_spooled(key, values):
+    # Stream the members of every part into one new file instead of loading them. Objects are
+    # combined by key like dictionaries in memory, later parts winning; anything else becomes one list
+    is_object = all(_is_object(value) for value in values)
+    with api_helpers.open_response_spool(key) as f:
+        f.write("{" if is_object else "[")
+        first = True
+        written = set()
+        # Objects are written last part first, so the first occurrence of a key is the one to keep
+        for value in reversed(values) if is_object else values:
+            if json_stream.is_spooled(value):
+                members = json_stream.iter_members(value)
+            elif isinstance(value, dict):
+                members = value.items()
+            else:
+                members = enumerate(value if isinstance(value, list) else [value])
+            for name, item in members:
+                if is_object:
+                    if name in written:
+                        continue
+                    written.add(name)
+                f.write("" if first else ",")
+                first = False
+                if is_object:
+                    f.write(json.dumps(name) + ":")
+                f.write(json.dumps(item))
+        f.write("}" if is_object else "]")
+    return {json_stream.SPOOLED_KEY: f.name, "size": os.path.getsize(f.name)}
+
+def _is_object(value):
+    if json_stream.is_spooled(value):
+        with open(value[json_stream.SPOOLED_KEY], "rb") as f:
+            return f.read(64).lstrip()[:1] == b"{"
+    return isinstance(value, dict)
+
+def _independent_groups(graph, services):
+    # Weakly connected components of the package services, each as its strongly
+    # connected components in dependency order
+    parent = {node: node for node in services}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for node in services:
+        for target in graph.callees(node):
+            if not graph.external[target]:
+                a, b = find(node), find(target)
+                if a != b:
+                    parent[a] = b
+
+    groups = {}
+    for component in graph.strongly_connected_components():
+        component = [node for node in component if not graph.external[node]]
+        if component:
+            # A component's services call each other, so they are in the same group
+            groups.setdefault(find(component[0]), []).append(component)
+    return list(groups.values())
@@ -0,0 +1,5 @@
+# The application modules live in the repository root and are imported by name
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,67 @@
+import io
+import urllib.error
+import urllib.request
+import zipfile
+
+import pytest
+
+import artifacts
+import config
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARTIFACT_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "ARTIFACT_DOWNLOAD_URL", "")
+    monkeypatch.setattr(artifacts, "_links", {})
+    return tmp_path
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(config, "ARTIFACT_SERVER_HOST", "127.0.0.1")
+    monkeypatch.setattr(config, "ARTIFACT_SERVER_PORT", 0)
+    monkeypatch.setattr(artifacts, "_server", None)
+    server = artifacts.start_download_server()
+    monkeypatch.setattr(config, "ARTIFACT_DOWNLOAD_URL", f"http://127.0.0.1:{server.server_address[1]}/")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def stored():
+    data = {"pipelines": [{"name": "getOrder", "slp": {"snap_map": {}}}, {"name": "putOrder", "slp": "{}"}]}
+    return artifacts.store_result(data, "Orders.zip")["id"]
+
+def test_read_zip_builds_archive_in_memory():
+    archive = artifacts.read_zip(stored())
+    assert archive["file_name"] == "Orders-snaplogic.zip"
+    with zipfile.ZipFile(io.BytesIO(archive["data"])) as f:
+        assert f.namelist() == ["pipelines/getOrder.slp", "pipelines/putOrder.slp"]
+    assert artifacts.read_zip("0" * 64) is None
+
+def test_no_links_without_download_url():
+    assert artifacts.get_download_url(stored(), "session") is None
+
+def test_links_are_per_session_and_reused(server):
+    manifest_id = stored()
+    url = artifacts.get_download_url(manifest_id, "session")
+    assert manifest_id not in url
+    assert artifacts.get_download_url(manifest_id, "session") == url
+    assert artifacts.get_download_url(manifest_id, "other") != url
+
+def test_server_only_serves_valid_tokens(server):
+    manifest_id = stored()
+    url = artifacts.get_download_url(manifest_id, "session")
+    with urllib.request.urlopen(url) as response:
+        with zipfile.ZipFile(io.BytesIO(response.read())) as f:
+            assert len(f.namelist()) == 2
+
+    base_url = config.ARTIFACT_DOWNLOAD_URL.rstrip("/")
+    for path in (f"/artifacts/{manifest_id}.zip", "/artifacts/" + "x" * 43 + ".zip"):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(base_url + path)
+        assert error.value.code == 404
+
+    # Expired links stop working
+    for link in artifacts._links.values():
+        link["expires_at"] = 0
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(url)
@@ -0,0 +1,67 @@
+import contextlib
+import hashlib
+import time
+import zipfile
+
+import pytest
+
+import api_helpers
+import artifacts
+import batch
+import delta
+import jobs
+import result_cache
+
+@pytest.fixture
+def package_dir(tmp_path):
+    for name in ("b.zip", "a.zip", "nested/c.zip"):
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("manifest.v3", name)
+    (tmp_path / "notes.txt").write_text("not a package")
+    return tmp_path
+
+def test_collect_packages_returns_paths_only(package_dir):
+    paths = batch.collect_packages([str(package_dir)])
+    assert [path[len(str(package_dir)) + 1:].replace("\\", "/") for path in paths] == ["a.zip", "b.zip", "nested/c.zip"]
+    assert all(isinstance(path, str) for path in paths)
+
+def test_packages_are_closed_while_their_jobs_are_queued(package_dir, monkeypatch):
+    submitted = []
+    def submit_job(package, migration_options, force=False, owner=None, reopen=None):
+        package.sha256 = api_helpers.hash_upload(package)
+        submitted.append((package, reopen))
+        return f"job{len(submitted)}"
+    monkeypatch.setattr(api_helpers, "validate_file", lambda package: (True, None))
+    monkeypatch.setattr(jobs, "submit_job", submit_job)
+    monkeypatch.setattr(jobs, "get_jobs", lambda job_ids: [None] * len(job_ids))
+
+    batch_id = batch.submit_batch(batch.collect_packages([str(package_dir)]), {})
+    deadline = time.time() + 10
+    while any(row["status"] != "queued" for row in batch.get_batch(batch_id)["rows"]):
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    assert len(submitted) == 3
+    for package, reopen in submitted:
+        assert package.closed
+        with reopen() as reopened:
+            assert not reopened.closed
+            assert reopened.sha256 == package.sha256
+            assert hashlib.sha256(reopened.read()).hexdigest() == package.sha256
+
+def test_job_closes_the_reopened_package(package_dir, monkeypatch):
+    opened = []
+    migrated = []
+    def reopen():
+        opened.append(api_helpers.PackageFile(str(package_dir / "a.zip")))
+        return opened[-1]
+    monkeypatch.setattr(delta, "send_package", lambda package, *args, **kwargs: migrated.append(package.closed) or {"success": True, "data": {}})
+    monkeypatch.setattr(artifacts, "store_result", lambda data, name: None)
+    monkeypatch.setattr(result_cache, "put", lambda key, result: None)
+    monkeypatch.setattr(api_helpers, "backend_slot", lambda: contextlib.nullcontext())
+
+    jobs._run_job("job", ("hash", ()), "key", api_helpers.PackageFile(str(package_dir / "a.zip")), {}, False, reopen)
+    assert migrated == [False]
+    assert len(opened) == 1 and opened[0].closed
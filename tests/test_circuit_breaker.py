@@ -0,0 +1,123 @@
+import pytest
+import requests
+
+import api_helpers
+import config
+import metrics
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+    def close(self):
+        pass
+
+class FakeSession:
+    """Answers each request with the next outcome, a status code or an exception"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return FakeResponse(outcome)
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(config, "CIRCUIT_RESET_SECONDS", 30)
+    monkeypatch.setattr(config, "API_MAX_RETRIES", 0)
+    breaker = api_helpers.CircuitBreaker()
+    monkeypatch.setattr(api_helpers, "get_circuit_breaker", lambda url=None: breaker)
+    return breaker
+
+def use_session(monkeypatch, *outcomes):
+    session = FakeSession(*outcomes)
+    monkeypatch.setattr(api_helpers, "get_session", lambda: session)
+    return session
+
+def open_circuit(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+def expire(breaker):
+    breaker.opened_at -= config.CIRCUIT_RESET_SECONDS
+    assert breaker.state == "half-open"
+
+def test_opens_after_threshold_and_fails_fast(breaker, monkeypatch):
+    session = use_session(monkeypatch, 503, 503)
+    assert api_helpers.request_with_retry("GET", "http://backend/").status_code == 503
+    assert breaker.state == "closed"
+    assert api_helpers.request_with_retry("GET", "http://backend/").status_code == 503
+    assert breaker.state == "open"
+
+    with pytest.raises(api_helpers.CircuitOpenError):
+        api_helpers.request_with_retry("GET", "http://backend/")
+    assert session.calls == 2
+
+def test_successful_trial_closes_circuit(breaker, monkeypatch):
+    open_circuit(breaker)
+    expire(breaker)
+    use_session(monkeypatch, 200)
+    assert api_helpers.request_with_retry("GET", "http://backend/").status_code == 200
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+def test_failed_trial_reopens_circuit(breaker, monkeypatch):
+    open_circuit(breaker)
+    expire(breaker)
+    use_session(monkeypatch, requests.exceptions.ConnectionError("refused"))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        api_helpers.request_with_retry("GET", "http://backend/")
+    assert breaker.state == "open"
+    assert not breaker.trial_in_flight
+
+def test_only_one_trial_at_a_time(breaker):
+    open_circuit(breaker)
+    expire(breaker)
+    breaker.before_request()
+    with pytest.raises(api_helpers.CircuitOpenError):
+        breaker.before_request()
+
+def test_rate_limited_trial_closes_circuit(breaker, monkeypatch):
+    open_circuit(breaker)
+    expire(breaker)
+    use_session(monkeypatch, 429)
+    assert api_helpers.request_with_retry("GET", "http://backend/").status_code == 429
+    assert breaker.state == "closed"
+    assert not breaker.trial_in_flight
+
+def test_unexpected_error_releases_trial(breaker, monkeypatch):
+    open_circuit(breaker)
+    expire(breaker)
+    use_session(monkeypatch, requests.exceptions.ChunkedEncodingError("truncated"), 200)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        api_helpers.request_with_retry("GET", "http://backend/")
+    assert not breaker.trial_in_flight
+    assert breaker.state == "half-open"
+
+    # The next request is let through as the new trial and closes the circuit
+    assert api_helpers.request_with_retry("GET", "http://backend/").status_code == 200
+    assert breaker.state == "closed"
+
+def test_retries_and_opening_are_recorded_as_spans(breaker, monkeypatch, capsys):
+    monkeypatch.setattr(config, "API_MAX_RETRIES", 2)
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    monkeypatch.setattr(config, "METRICS_LOG_PATH", "")
+    monkeypatch.setattr(api_helpers, "get_backoff_delay", lambda attempt: 0)
+    metrics.reset()
+    use_session(monkeypatch, requests.exceptions.ConnectionError("refused"), 503, 200)
+
+    assert api_helpers.request_with_retry("GET", "http://backend/").status_code == 200
+    assert metrics.get_metrics()["retry_wait"]["count"] == 2
+    for _ in range(3):
+        breaker.record_failure()
+    assert metrics.get_metrics()["circuit_open"]["count"] == 1
+    assert capsys.readouterr().out == ""
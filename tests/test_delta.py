@@ -0,0 +1,153 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+import config
+import delta
+import json_stream
+
+COUNTS = {"previous": 10, "kept": 8, "changed": 3}
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "RESPONSE_SPOOL_DIR", str(tmp_path / "responses"))
+    monkeypatch.setattr(config, "DELTA_STATE_DIR", str(tmp_path / "manifests"))
+    return tmp_path
+
+def pipelines(*names):
+    return [{"name": name, "snaps": 3} for name in names]
+
+def test_merges_collections_by_name_and_drops_removed_services():
+    previous = {"success": True, "data": {"pipelines": pipelines("a", "b", "c"), "warnings": {"a": ["old"], "c": ["x"]}}}
+    update = {"success": True, "data": {"pipelines": [{"name": "b", "snaps": 9}, {"name": "d", "snaps": 1}], "warnings": {"a": []}}}
+    merged = delta.merge_results(previous, update, ["c"], COUNTS)["data"]
+
+    assert [item["name"] for item in merged["pipelines"]] == ["a", "b", "d"]
+    assert merged["pipelines"][1]["snaps"] == 9
+    assert merged["warnings"] == {"a": []}
+
+def test_counters_are_recounted_from_merged_collections():
+    previous = {"success": True, "data": {
+        "pipelines": pipelines("a", "b", "c"), "convertedFlows": 3,
+        "warnings": {"a": ["w1", "w2"], "b": ["w3"]}, "warningCount": 3,
+    }}
+    update = {"success": True, "data": {
+        "pipelines": pipelines("b", "d"), "convertedFlows": 2,
+        "warnings": {"b": [], "d": ["w4"]}, "warningCount": 1,
+    }}
+    merged = delta.merge_results(previous, update, [], COUNTS)["data"]
+
+    assert merged["convertedFlows"] == 4
+    assert merged["warningCount"] == 3
+
+def test_counters_without_collections_are_scaled_to_unchanged_services():
+    previous = {"success": True, "data": {"convertedServices": 100, "conversionRate": 80, "migrationId": "old"}}
+    update = {"success": True, "data": {"convertedServices": 3, "conversionRate": 100, "migrationId": "new"}}
+    merged = delta.merge_results(previous, update, [], COUNTS)["data"]
+
+    # 8 of the 10 previous services are unchanged: 100 * 8 / 10 + 3
+    assert merged["convertedServices"] == 83
+    assert merged["conversionRate"] == round((80 * 8 + 100 * 3) / 11, 2)
+    assert merged["migrationId"] == "new"
+
+def test_counters_ignore_collections_that_were_not_counted_exactly():
+    previous = {"success": True, "data": {"pipelines": pipelines("a"), "convertedFlows": 20}}
+    update = {"success": True, "data": {"pipelines": pipelines("b"), "convertedFlows": 2}}
+    merged = delta.merge_results(previous, update, [], COUNTS)["data"]
+
+    assert merged["convertedFlows"] == 18
+
+def test_merges_into_spooled_collection(spool_dir):
+    spooled = spool_dir / "pipelines.json"
+    spooled.write_text(json.dumps(pipelines("a", "b", "c")))
+    previous = {"success": True, "data": {
+        "pipelines": {json_stream.SPOOLED_KEY: str(spooled), "size": spooled.stat().st_size},
+        "convertedFlows": 3,
+    }}
+    update = {"success": True, "data": {"pipelines": pipelines("b", "d"), "convertedFlows": 2}}
+    merged = delta.merge_results(previous, update, ["a"], COUNTS)["data"]
+
+    assert json_stream.is_spooled(merged["pipelines"])
+    items = [item for _, item in json_stream.iter_members(merged["pipelines"])]
+    assert [item["name"] for item in items] == ["b", "c", "d"]
+    assert merged["convertedFlows"] == 3
+
+def write_package(path, services):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("Orders/manifest.v3", "<Values/>")
+        for name, body in services.items():
+            archive.writestr(f"Orders/ns/orders/{name}/node.ndf", body)
+            archive.writestr(f"Orders/ns/orders/{name}/flow.xml", body)
+
+def test_plan_counts_kept_and_changed_services(spool_dir):
+    package = spool_dir / "Orders.zip"
+    services = {f"svc{i}": f"v1-{i}" * 50 for i in range(10)}
+    write_package(package, services)
+    with open(package, "rb") as f:
+        plan = delta.plan_migration(f, {})
+    delta.save_state(plan, {"success": True, "data": {"convertedServices": 10}})
+
+    services["svc0"] = "v2-0" * 50
+    del services["svc1"]
+    services["svc10"] = "v1-10" * 50
+    write_package(package, services)
+    with open(package, "rb") as f:
+        plan = delta.plan_migration(f, {})
+
+    assert plan["mode"] == "delta"
+    assert plan["removed_services"] == ["orders:svc1"]
+    assert plan["service_counts"] == {"previous": 10, "kept": 8, "changed": 2}
+
+def spooled_result(spool_dir):
+    spooled = spool_dir / "responses" / "0123-pipelines.json"
+    spooled.parent.mkdir(exist_ok=True)
+    spooled.write_text(json.dumps(pipelines("a", "b")))
+    return {"success": True, "data": {"pipelines": {json_stream.SPOOLED_KEY: str(spooled), "size": spooled.stat().st_size}}}
+
+def saved_plan(spool_dir):
+    package = spool_dir / "Orders.zip"
+    write_package(package, {"svc0": "v1"})
+    with open(package, "rb") as f:
+        return delta.plan_migration(f, {})
+
+def test_saved_state_outlives_response_spool(spool_dir):
+    plan = saved_plan(spool_dir)
+    result = spooled_result(spool_dir)
+    delta.save_state(plan, result)
+    # The response spool is purged after RESULT_CACHE_TTL_SECONDS
+    (spool_dir / "responses" / "0123-pipelines.json").unlink()
+
+    state = delta.load_state(plan["state_key"])
+    assert state is not None
+    items = [item for _, item in json_stream.iter_members(state["result"]["data"]["pipelines"])]
+    assert [item["name"] for item in items] == ["a", "b"]
+
+def test_state_with_missing_files_is_ignored(spool_dir):
+    plan = saved_plan(spool_dir)
+    delta.save_state(plan, spooled_result(spool_dir))
+    state = delta.load_state(plan["state_key"])
+    os.remove(state["result"]["data"]["pipelines"][json_stream.SPOOLED_KEY])
+
+    assert delta.load_state(plan["state_key"]) is None
+
+def test_replaced_state_removes_its_files(spool_dir):
+    plan = saved_plan(spool_dir)
+    delta.save_state(plan, spooled_result(spool_dir))
+    old_path = delta.load_state(plan["state_key"])["result"]["data"]["pipelines"][json_stream.SPOOLED_KEY]
+    delta.save_state(plan, {"success": True, "data": {"convertedFlows": 1}})
+
+    assert not json_stream.is_spooled(delta.load_state(plan["state_key"])["result"]["data"].get("pipelines"))
+    assert not os.path.exists(old_path)
+
+def test_unchanged_package_returns_files_in_response_spool(spool_dir):
+    plan = saved_plan(spool_dir)
+    delta.save_state(plan, spooled_result(spool_dir))
+    with open(spool_dir / "Orders.zip", "rb") as f:
+        result = delta.send_package(f, {})
+
+    assert result["delta"]["mode"] == "unchanged"
+    path = result["data"]["pipelines"][json_stream.SPOOLED_KEY]
+    assert path.startswith(config.RESPONSE_SPOOL_DIR)
+    assert [item["name"] for _, item in json_stream.iter_members(path)] == ["a", "b"]
@@ -0,0 +1,55 @@
+import dependency_graph
+
+def graph(calls):
+    # calls maps each service of the package to the services it invokes
+    index = {
+        "nodes": {name: {"kind": "flow"} for name in calls},
+        "flows": {name: {"invokes": callees} for name, callees in calls.items()},
+    }
+    return dependency_graph.build_graph(index)
+
+def names(graph, nodes):
+    return sorted(graph.names[node] for node in nodes)
+
+def test_calls_are_stored_as_adjacency_arrays():
+    g = graph({"a:main": ["a:util", "pub.flow:debugLog"], "a:util": []})
+    assert g.node_count == 3 and g.edge_count == 2
+    main = g.node_id("a:main")
+    assert names(g, g.callees(main)) == ["a:util", "pub.flow:debugLog"]
+    assert g.external[g.node_id("pub.flow:debugLog")] and not g.external[main]
+    assert g.fan_in(g.node_id("a:util")) == 1 and g.fan_out(main) == 2
+    assert g.node_id("a:unknown") is None
+
+def test_topological_order_puts_callees_first():
+    g = graph({"a:top": ["a:mid"], "a:mid": ["a:leaf"], "a:leaf": []})
+    order = [g.names[node] for node in g.topological_order()]
+    assert order == ["a:leaf", "a:mid", "a:top"]
+
+def test_cycles_include_rings_and_recursion_only():
+    g = graph({
+        "a:x": ["a:y"], "a:y": ["a:z"], "a:z": ["a:x"],
+        "a:self": ["a:self"],
+        "a:caller": ["a:x"],
+    })
+    assert sorted(names(g, component) for component in g.cycles()) == [["a:self"], ["a:x", "a:y", "a:z"]]
+
+    # A component comes after every component it calls
+    position = {node: index for index, component in enumerate(g.strongly_connected_components()) for node in component}
+    assert position[g.node_id("a:caller")] > position[g.node_id("a:x")]
+
+def test_deep_call_chain_does_not_recurse():
+    depth = 20000
+    g = graph({f"a:s{i}": [f"a:s{i + 1}"] if i + 1 < depth else [] for i in range(depth)})
+    assert len(g.strongly_connected_components()) == depth
+    assert max(g.levels()) == depth - 1
+
+def test_cycle_shares_one_level_above_its_callees():
+    g = graph({"a:x": ["a:y", "a:leaf"], "a:y": ["a:x"], "a:leaf": [], "a:top": ["a:x"]})
+    levels = {g.names[node]: level for node, level in enumerate(g.levels())}
+    assert levels == {"a:leaf": 0, "a:x": 1, "a:y": 1, "a:top": 2}
+
+def test_summary_counts_internal_services():
+    summary = dependency_graph.summarize_graph(graph({"a:x": ["a:y", "pub.string:concat"], "a:y": ["a:x"]}))
+    assert summary["services"] == 2 and summary["external_services"] == 1
+    assert summary["cycles"] == [["a:x", "a:y"]]
+    assert summary["calls"] == 3
@@ -0,0 +1,131 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import field_mappings
+
+def field(name, field_type="string", dim=0, ref=None, children=()):
+    extra = f'<value name="rec_ref">{ref}</value>' if ref else ""
+    if children:
+        extra += f'<array name="rec_fields">{"".join(children)}</array>'
+    return (
+        f'<record><value name="field_name">{name}</value><value name="field_type">{field_type}</value>'
+        f'<value name="field_dim">{dim}</value>{extra}</record>'
+    )
+
+def record(*fields):
+    return f'<Values version="2.0"><value name="node_type">record</value><array name="rec_fields">{"".join(fields)}</array></Values>'
+
+def service(inputs, outputs):
+    return (
+        '<Values version="2.0"><value name="node_type">service</value><value name="svc_type">flow</value>'
+        f'<record name="svc_sig"><record name="sig_in"><array name="rec_fields">{"".join(inputs)}</array></record>'
+        f'<record name="sig_out"><array name="rec_fields">{"".join(outputs)}</array></record></record></Values>'
+    )
+
+FLOW = """<FLOW VERSION="3.0"><SEQUENCE>
+  <MAP MODE="STANDALONE">
+    <MAPCOPY FROM="/order;4;0;orders.docs:Order/items;4;1;orders.docs:Item/sku;1;0" TO="/skus;1;1"/>
+    <MAPCOPY FROM="/order;4;0;orders.docs:Order/parent;4;0;orders.docs:Order/id;1;0" TO="/parentId;1;0"/>
+    <MAPSET FIELD="/status;1;0"><DATA>it's "new"</DATA></MAPSET>
+    <MAPDELETE FIELD="/order;4;0;orders.docs:Order"/>
+  </MAP>
+  <MAP MODE="STANDALONE"><MAPCOPY FROM="/missing;1;0" TO="/ship-to;1;0"/></MAP>
+  <MAP MODE="STANDALONE"></MAP>
+</SEQUENCE></FLOW>"""
+
+def package():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("Orders/manifest.v3", "<Values/>")
+        # An order refers to its parent order: references may be recursive
+        archive.writestr("Orders/ns/orders/docs/Order/node.ndf", record(
+            field("id"),
+            field("parent", "recref", ref="orders.docs:Order"),
+            field("items", "recref", dim=1, ref="orders.docs:Item"),
+        ))
+        archive.writestr("Orders/ns/orders/docs/Item/node.ndf", record(field("sku")))
+        archive.writestr("Orders/ns/orders/lookup/node.ndf", service(
+            [field("order", "recref", ref="orders.docs:Order")],
+            [field("skus", dim=1), field("parentId"), field("status")],
+        ))
+        archive.writestr("Orders/ns/orders/lookup/flow.xml", FLOW)
+        archive.writestr("Orders/ns/orders/empty/flow.xml", '<FLOW VERSION="3.0"/>')
+    buffer.name = "Orders.zip"
+    buffer.seek(0)
+    return buffer
+
+def test_parse_path_reads_types_dimensions_and_references():
+    assert field_mappings.parse_path("/order;4;0;orders.docs:Order/items;2;1/sku;1;0") == (
+        ("order", "recref", 0, "orders.docs:Order"),
+        ("items", "record", 1, None),
+        ("sku", "string", 0, None),
+    )
+    assert field_mappings.parse_path("/plain") == (("plain", "string", 0, None),)
+    assert field_mappings.parse_path("") == ()
+
+def test_field_paths_quote_names_that_are_not_identifiers():
+    assert field_mappings.field_path("/order;2;0/id;1;0") == "$order.id"
+    assert field_mappings.field_path("/ship-to;2;0/2nd line;1;0") == '$["ship-to"]["2nd line"]'
+    assert field_mappings.field_path("") is None
+
+@pytest.mark.parametrize("path, target_dim, expression", [
+    ("/items;2;1/sku;1;0", None, "$items.map(item => item.sku)"),
+    ("/orders;2;1/lines;2;1/sku;1;0", None, "$orders.map(item => item.lines.map(item1 => item1.sku))"),
+    ("/tags;1;1", 0, "$tags[0]"),
+    ("/tag;1;0", 1, "[$tag]"),
+    ("/tags;1;1", 1, "$tags"),
+])
+def test_source_expressions_follow_dimensions(path, target_dim, expression):
+    assert field_mappings.source_expression(path, target_dim) == expression
+
+def test_string_literals_are_escaped():
+    assert field_mappings.string_literal("it's a \\ path") == "'it\\'s a \\\\ path'"
+
+def test_maps_are_resolved_against_document_types_and_signature():
+    result = field_mappings.map_package(package())
+    copy_skus, copy_parent, set_status, delete_order = result["services"]["orders:lookup"][0]
+
+    assert copy_skus == {
+        "expression": "$order.items.map(item => item.sku)", "targetPath": "$skus",
+        "sourceType": "string", "targetType": "string", "resolved": True,
+    }
+    assert copy_parent["expression"] == "$order.parent.id" and copy_parent["resolved"]
+    assert set_status["expression"] == "'it\\'s \"new\"'" and set_status["resolved"]
+    assert delete_order["delete"] and delete_order["targetType"] == "recref"
+
+    # Fields that are in neither signature nor document types are mapped all the same
+    [unresolved] = result["services"]["orders:lookup"][1]
+    assert unresolved["targetPath"] == '$["ship-to"]' and not unresolved["resolved"]
+    assert (result["maps"], result["mappings"], result["unresolved"]) == (2, 5, 1)
+    assert "orders:empty" not in result["services"]
+
+def test_compiled_schemas_follow_recursive_references():
+    schemas = field_mappings.compile_schemas(package())
+    order = schemas["orders.docs:Order"]
+    assert order["parent"].fields is order
+    assert order["items"].dim == 1 and order["items"].fields is schemas["orders.docs:Item"]
+
+def test_services_can_be_selected_for_the_upload():
+    result = field_mappings.map_package(package())
+    assert field_mappings.map_package(package(), services={"orders:other"})["services"] == {}
+    assert field_mappings.form_fields(result, services=["orders:other"]) == {}
+    fields = field_mappings.form_fields(result, services=["orders:lookup"])
+    assert list(json.loads(fields["fieldMappings"])) == ["orders:lookup"]
+    assert field_mappings.select_services(result, ["orders:other"])["services"] == {}
+    assert field_mappings.select_services(None, ["orders:lookup"]) is None
+
+def test_transformer_mappings_stay_apart_from_their_map():
+    flow = io.BytesIO(b"""<FLOW VERSION="3.0"><MAP MODE="STANDALONE">
+      <MAPINVOKE SERVICE="pub.string:toUpper">
+        <MAP MODE="INPUT"><MAPCOPY FROM="/name;1;0" TO="/inString;1;0"/></MAP>
+        <MAP MODE="OUTPUT"><MAPCOPY FROM="/value;1;0" TO="/upperName;1;0"/></MAP>
+      </MAPINVOKE>
+      <MAPCOPY FROM="/id;1;0" TO="/orderId;1;0"/>
+    </MAP></FLOW>""")
+    maps = field_mappings._read_maps(flow)
+    assert [[attrs["TO"] for _, attrs, _ in elements] for elements in maps] == [
+        ["/inString;1;0"], ["/upperName;1;0"], ["/orderId;1;0"]
+    ]
@@ -0,0 +1,87 @@
+import io
+import zipfile
+
+import pytest
+
+import config
+import flow_converter
+import sharding
+
+FLOW = b"""<?xml version="1.0" encoding="UTF-8"?>
+<FLOW VERSION="3.0">
+  <COMMENT>Looks up an order</COMMENT>
+  <SEQUENCE>
+    <MAP MODE="STANDALONE"><COMMENT>Copy the id</COMMENT><MAPCOPY FROM="/in;1;0" TO="/out;1;0"/></MAP>
+    <INVOKE SERVICE="orders.util:getOrder"/>
+  </SEQUENCE>
+</FLOW>
+"""
+
+OPTIONS = {"include_documentation": True, "generate_mappings": True, "convert_transformations": True, "analyze_dependencies": True}
+
+def snaps(pipeline, step):
+    return [snap for snap in pipeline["snap_map"].values() if snap["class_id"] == flow_converter.SNAP_CLASSES[step]]
+
+def test_documentation_adds_comments_to_notes():
+    pipeline = flow_converter.convert_service("orders:lookup", FLOW, OPTIONS)
+    assert pipeline["property_map"]["info"]["notes"]["value"].endswith("Looks up an order")
+    assert snaps(pipeline, "MAP")[0]["property_map"]["info"]["notes"]["value"] == "Copy the id"
+    assert "description" not in pipeline
+
+def test_options_off_leave_out_notes_and_mappings():
+    pipeline = flow_converter.convert_service("orders:lookup", FLOW, dict(OPTIONS, include_documentation=False, generate_mappings=False))
+    assert "notes" not in pipeline["property_map"]["info"]
+    mapper = snaps(pipeline, "MAP")[0]["property_map"]
+    assert "notes" not in mapper["info"]
+    assert mapper["settings"]["transformations"]["value"] == []
+
+    pipeline = flow_converter.convert_service("orders:lookup", FLOW, OPTIONS)
+    assert snaps(pipeline, "MAP")[0]["property_map"]["settings"]["transformations"]["value"] == [
+        {"expression": "$in", "targetPath": "$out"}
+    ]
+
+def test_unsupported_flows_are_left_to_the_backend():
+    flow = b'<FLOW VERSION="3.0"><RETRY COUNT="3"><INVOKE SERVICE="a:b"/></RETRY></FLOW>'
+    assert flow_converter.convert_service("orders:retry", flow, OPTIONS) is None
+
+def package():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("Orders/manifest.v3", "<Values/>")
+        archive.writestr(
+            "Orders/ns/orders/lookup/node.ndf",
+            '<Values><value name="node_type">service</value><value name="svc_type">flow</value>'
+            '<value name="node_nsName">orders:lookup</value></Values>'
+        )
+        archive.writestr("Orders/ns/orders/lookup/flow.xml", FLOW)
+    buffer.name = "Orders.zip"
+    buffer.seek(0)
+    return buffer
+
+@pytest.fixture
+def backend(monkeypatch):
+    calls = []
+    monkeypatch.setattr(config, "ENABLE_FIELD_MAPPINGS", False)
+    monkeypatch.setattr(sharding, "send_package", lambda *args, **kwargs: calls.append(args) or {"success": True, "data": {}})
+    return calls
+
+def test_package_with_supported_options_is_converted_locally(backend):
+    result = flow_converter.send_package(package(), OPTIONS)
+    assert backend == []
+    assert result["local_conversion"]["services"] == 1
+    assert result["data"]["conversionRate"] == 100
+
+def test_transformation_option_does_not_change_local_pipelines():
+    without = dict(OPTIONS, convert_transformations=False, analyze_dependencies=False)
+    assert flow_converter.convert_service("orders:lookup", FLOW, without) == flow_converter.convert_service("orders:lookup", FLOW, OPTIONS)
+
+    # Maps with transformers are converted by the backend whichever way the option is set
+    flow = b'<FLOW VERSION="3.0"><MAP MODE="STANDALONE"><MAPINVOKE SERVICE="pub.string:toUpper"/></MAP></FLOW>'
+    assert flow_converter.convert_service("orders:upper", flow, OPTIONS) is None
+    assert flow_converter.convert_service("orders:upper", flow, without) is None
+
+def test_disabled_local_conversion_sends_package_to_backend(backend, monkeypatch):
+    monkeypatch.setattr(config, "ENABLE_LOCAL_CONVERSION", False)
+    result = flow_converter.send_package(package(), OPTIONS)
+    assert len(backend) == 1
+    assert "local_conversion" not in result
@@ -0,0 +1,97 @@
+import collections
+import hashlib
+import io
+
+import pytest
+
+import api_helpers
+import config
+import jobs
+import result_cache
+
+class Upload(io.BytesIO):
+    name = "orders.zip"
+    size = 7
+
+def test_package_is_hashed_once_per_submission(monkeypatch):
+    # A cached result completes the job without a worker
+    monkeypatch.setattr(result_cache, "get", lambda key: {"success": True, "data": {}})
+    package = Upload(b"package")
+    job_id = jobs.submit_job(package, {"generate_mappings": True})
+
+    assert jobs.get_job(job_id)["status"] == "completed"
+    assert package.sha256 == hashlib.sha256(b"package").hexdigest()
+    package.read = None  # later stages must not read the package to hash it
+    assert api_helpers.hash_upload(package) == package.sha256
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    # Jobs stay queued: no worker is started and nothing is cached
+    monkeypatch.setattr(jobs, "_jobs", {})
+    monkeypatch.setattr(jobs, "_active_jobs", {})
+    monkeypatch.setattr(jobs, "_queues", collections.OrderedDict())
+    monkeypatch.setattr(jobs, "_durations", collections.deque(maxlen=50))
+    monkeypatch.setattr(jobs, "_fit", None)
+    monkeypatch.setattr(jobs, "_schedule", None)
+    monkeypatch.setattr(jobs, "_start_workers", lambda: None)
+    monkeypatch.setattr(result_cache, "get", lambda key: None)
+    monkeypatch.setattr(config, "JOB_WORKERS", 1)
+    monkeypatch.setattr(config, "JOB_SCHEDULING", "round_robin")
+
+def submit(owner, content):
+    package = Upload(content.encode())
+    package.size = 1024 * 1024
+    return jobs.submit_job(package, {}, owner=owner)
+
+def test_owners_take_turns(queue):
+    heavy = [submit("heavy", f"heavy{index}") for index in range(3)]
+    light = submit("light", "light")
+
+    assert jobs._dispatch_order() == [heavy[0], light, heavy[1], heavy[2]]
+    assert jobs.get_job(light)["queue_position"] == 1
+    assert [jobs._next_job_id() for _ in range(4)] == [heavy[0], light, heavy[1], heavy[2]]
+
+def test_fifo_keeps_submission_order(queue, monkeypatch):
+    monkeypatch.setattr(config, "JOB_SCHEDULING", "fifo")
+    heavy = [submit("heavy", f"heavy{index}") for index in range(3)]
+    light = submit("light", "light")
+    assert jobs._dispatch_order() == heavy + [light]
+
+def test_same_package_is_not_queued_twice(queue):
+    assert submit("a", "package") == submit("b", "package")
+    assert jobs.get_queue_stats()["queued"] == 1
+
+def test_expected_start_follows_recent_durations(queue):
+    # 10s per job of 1 MB: with one worker, the third job starts after the first two
+    jobs._record_duration(1024 * 1024, 10.0)
+    jobs._record_duration(1024 * 1024, 10.0)
+    first, second, third = (submit("a", f"job{index}") for index in range(3))
+    now = jobs.time.time()
+    assert jobs.get_job(first)["expected_start_at"] == pytest.approx(now, abs=1)
+    assert jobs.get_job(third)["expected_start_at"] == pytest.approx(now + 20, abs=1)
+
+def test_duration_estimate_fits_size(queue):
+    assert jobs._estimate_duration(0) == jobs.DEFAULT_SECONDS_PER_JOB
+    for mb, seconds in [(1, 3.0), (2, 5.0), (3, 7.0)]:
+        jobs._record_duration(mb * 1024 * 1024, seconds)
+    assert jobs._estimate_duration(4 * 1024 * 1024) == pytest.approx(9.0)
+    # A new sample is taken into account
+    jobs._record_duration(4 * 1024 * 1024, 17.0)
+    assert jobs._estimate_duration(4 * 1024 * 1024) > 9.0
+
+def test_bulk_snapshot_estimates_the_schedule_once(queue, monkeypatch):
+    job_ids = [submit(f"owner{index}", f"job{index}") for index in range(20)]
+    computed = []
+    compute = jobs._compute_schedule
+    monkeypatch.setattr(jobs, "_compute_schedule", lambda now: computed.append(now) or compute(now))
+
+    snapshots = jobs.get_jobs(job_ids + ["unknown"])
+    assert [job["queue_position"] for job in snapshots[:-1]] == list(range(20))
+    assert snapshots[-1] is None
+    # Reused while the queue does not change, estimated again once it does
+    jobs.get_job(job_ids[0])
+    assert len(computed) == 1
+    submit("late", "late")
+    assert jobs.get_job(job_ids[0])["queue_position"] == 0
+    assert len(computed) == 2
@@ -0,0 +1,94 @@
+import io
+import json
+import random
+
+import pytest
+
+import json_stream
+
+DOCUMENTS = [
+    {"migrationId": "m1", "convertedServices": 12, "pipelines": [{"name": "a", "snaps": [1, 2]}, {"name": "b"}]},
+    {"text": 'braces } ] { [ and "quotes" \\ inside strings', "unicode": "Grüße 日本 😀", "empty": {}, "list": []},
+    [1, -2.5e3, True, False, None, "x", {"nested": [[[]]]}],
+    {},
+    [],
+]
+
+def parse(document, chunk_size, **options):
+    parser = json_stream.JsonStreamParser(**options)
+    data = json.dumps(document).encode("utf-8")
+    members = []
+    for offset in range(0, len(data), chunk_size):
+        members.extend(parser.feed(data[offset:offset + chunk_size]))
+    parser.close()
+    return parser, members
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 1 << 20])
+def test_round_trip_in_any_chunking(document, chunk_size):
+    parser, members = parse(document, chunk_size)
+    if isinstance(document, dict):
+        assert parser.kind == "object"
+        assert dict(members) == document
+        assert [key for key, _ in members] == list(document)
+    else:
+        assert parser.kind == "array"
+        assert members == list(enumerate(document))
+
+def test_members_are_returned_as_soon_as_complete():
+    parser = json_stream.JsonStreamParser()
+    assert parser.feed(b'{"migrationId": "m1", "pipelines": [{"name"') == [("migrationId", "m1")]
+    assert parser.feed(b': "a"}]}') == [("pipelines", [{"name": "a"}])]
+    parser.close()
+
+def test_large_members_are_spilled_to_disk(tmp_path):
+    files = []
+
+    def spill(key):
+        f = open(tmp_path / f"{key}.json", "w", encoding="utf-8")
+        files.append(f.name)
+        return f
+
+    pipelines = [{"name": f"pipeline_{index}", "snaps": index} for index in range(500)]
+    document = {"migrationId": "m1", "pipelines": pipelines, "warningCount": 0}
+    _, members = parse(document, 97, max_member_size=1024, spill=spill)
+    result = dict(members)
+
+    assert result["migrationId"] == "m1"
+    assert result["warningCount"] == 0
+    assert json_stream.is_spooled(result["pipelines"])
+    assert files == [str(tmp_path / "pipelines.json")]
+    assert [item for _, item in json_stream.iter_members(result["pipelines"], chunk_size=101)] == pipelines
+
+def test_iter_members_reads_file_objects():
+    document = {"a": 1, "b": [2, 3]}
+    assert list(json_stream.iter_members(io.BytesIO(json.dumps(document).encode()))) == [("a", 1), ("b", [2, 3])]
+
+@pytest.mark.parametrize("data", [b'"text"', b"{\"a\": 1", b"[1, 2] extra", b"{\"a\" 1}"])
+def test_malformed_documents_are_rejected(data):
+    parser = json_stream.JsonStreamParser()
+    with pytest.raises(ValueError):
+        parser.feed(data)
+        parser.close()
+
+def test_random_documents_round_trip():
+    rng = random.Random(7)
+
+    def value(depth):
+        kind = rng.randrange(6 if depth < 4 else 4)
+        if kind == 0:
+            return rng.randint(-1000, 1000)
+        if kind == 1:
+            return "".join(rng.choice('ab"\\{}[],: é') for _ in range(rng.randrange(8)))
+        if kind == 2:
+            return rng.choice([True, False, None])
+        if kind == 3:
+            return rng.random()
+        if kind == 4:
+            return [value(depth + 1) for _ in range(rng.randrange(4))]
+        return {f"k{index}": value(depth + 1) for index in range(rng.randrange(4))}
+
+    for _ in range(50):
+        document = {f"field{index}": value(0) for index in range(rng.randrange(1, 6))}
+        _, members = parse(document, rng.randrange(1, 40))
+        assert dict(members) == document
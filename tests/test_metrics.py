@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+import config
+import metrics
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    monkeypatch.setattr(config, "METRICS_LOG_PATH", "")
+    metrics.reset()
+    yield
+    with metrics._lock:
+        if metrics._log_file is not None:
+            metrics._log_file.close()
+        metrics._log_file = None
+
+def test_spans_are_counted_per_name():
+    with metrics.span("hash"):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.span("hash"):
+            raise ValueError("bad")
+    stats = metrics.get_metrics()["hash"]
+    assert stats["count"] == 2
+    assert stats["errors"] == 1
+
+def test_log_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metrics.record("upload", 0.01)
+    assert os.listdir(tmp_path) == []
+
+def test_log_is_rotated_at_size_limit(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setattr(config, "METRICS_LOG_PATH", str(path))
+    monkeypatch.setattr(config, "METRICS_LOG_MAX_MB", 1 / 1024)
+    monkeypatch.setattr(config, "METRICS_LOG_BACKUPS", 2)
+    for _ in range(100):
+        metrics.record("upload", 0.01, package="x" * 50)
+
+    assert sorted(os.listdir(tmp_path)) == ["metrics.jsonl", "metrics.jsonl.1", "metrics.jsonl.2"]
+    for name in os.listdir(tmp_path):
+        assert os.path.getsize(tmp_path / name) <= 1024
+        with open(tmp_path / name, encoding="utf-8") as f:
+            assert all(json.loads(line)["span"] == "upload" for line in f)
@@ -0,0 +1,70 @@
+import io
+import zipfile
+
+import pytest
+
+import api_helpers
+import config
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(config, "MAX_ZIP_ENTRIES", 10)
+    monkeypatch.setattr(config, "MAX_UNCOMPRESSED_SIZE_MB", 4)
+    monkeypatch.setattr(config, "REQUIRE_MANIFEST", True)
+
+def package(entries, manifest=True):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        if manifest:
+            archive.writestr("Orders/manifest.v3", "<Values/>")
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    buffer.name = "Orders.zip"
+    buffer.seek(0)
+    return buffer
+
+def preflight(upload):
+    is_valid, error = api_helpers.preflight_zip(upload)
+    assert upload.tell() == 0
+    return error if not is_valid else None
+
+def test_valid_package_passes():
+    assert preflight(package({"Orders/ns/orders/lookup/flow.xml": "<FLOW/>", "Orders/code/jars/lib.jar": "jar"})) is None
+
+def test_not_a_zip_is_rejected():
+    upload = io.BytesIO(b"not a zip")
+    assert "not a valid ZIP archive" in preflight(upload)
+
+@pytest.mark.parametrize("name", ["../evil.sh", "Orders/../../evil.sh", "/etc/passwd"])
+def test_unsafe_paths_are_rejected(name):
+    assert "unsafe path" in preflight(package({name: "x"}))
+
+def test_dots_inside_names_are_allowed():
+    assert preflight(package({"Orders/ns/orders..v2/flow.xml": "<FLOW/>"})) is None
+
+@pytest.mark.parametrize("name", ["Orders/resources/data.zip", "Orders/pub/archive.TAR", "Orders/pub/logs.gz"])
+def test_nested_archives_are_rejected(name):
+    assert "Nested archives" in preflight(package({name: "x"}))
+
+def test_manifest_is_required_at_the_top():
+    assert "No manifest.v3" in preflight(package({"Orders/ns/flow.xml": "<FLOW/>"}, manifest=False))
+    assert "No manifest.v3" in preflight(package({"Orders/ns/deep/manifest.v3": "<Values/>"}, manifest=False))
+    assert preflight(package({"manifest.v3": "<Values/>"}, manifest=False)) is None
+
+def test_too_many_entries_are_rejected():
+    assert "11 entries" in preflight(package({f"Orders/pub/{i}.txt": "x" for i in range(10)}))
+
+def test_decompression_bomb_is_rejected():
+    assert "compression ratio" in preflight(package({"Orders/pub/zeros.bin": bytes(2 * 1024 * 1024)}))
+
+def test_total_uncompressed_size_is_limited(monkeypatch):
+    monkeypatch.setattr(config, "MAX_COMPRESSION_RATIO", 10000)
+    entries = {f"Orders/pub/zeros{i}.bin": bytes(1536 * 1024) for i in range(3)}
+    assert "larger than 4MB" in preflight(package(entries))
+
+def test_encrypted_entries_are_rejected():
+    data = bytearray(package({"Orders/config/secret.cnf": "encrypted"}).getvalue())
+    # zipfile cannot write encrypted entries; set the flag in the central directory record of the last entry
+    header = data.rindex(b"PK\x01\x02")
+    data[header + 8] |= 0x1
+    assert "encrypted entry" in preflight(io.BytesIO(bytes(data)))
@@ -0,0 +1,80 @@
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+
+import pytest
+
+import api_helpers
+import config
+import jobs
+import result_cache
+
+RESULT = {"success": True, "data": {"pipelines": ["orders"]}}
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "RESULT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "RESULT_CACHE_TTL_SECONDS", 60)
+    monkeypatch.setattr(config, "RESULT_CACHE_MAX_MB", 1)
+    return tmp_path
+
+def age(key, seconds):
+    # Move the entry and its creation time into the past
+    path = result_cache._entry_path(key)
+    with open(path, "r", encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["created_at"] -= seconds
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+def test_key_depends_on_package_and_options():
+    key = result_cache.make_key("abc", {"generate_mappings": True, "include_documentation": False})
+    assert key == result_cache.make_key("abc", {"include_documentation": False, "generate_mappings": True})
+    assert key != result_cache.make_key("abc", {"include_documentation": True, "generate_mappings": True})
+    assert key != result_cache.make_key("abd", {"generate_mappings": True, "include_documentation": False})
+
+def test_stores_only_successful_results():
+    result_cache.put("failed", {"success": False, "error": "Backend unavailable"})
+    assert result_cache.get("failed") is None
+    result_cache.put("ok", RESULT)
+    assert result_cache.get("ok") == RESULT
+
+def test_entries_expire_after_ttl(cache_dir):
+    result_cache.put("old", RESULT)
+    age("old", 30)
+    assert result_cache.get("old") == RESULT
+    age("old", 31)
+    assert result_cache.get("old") is None
+    assert os.listdir(cache_dir) == []
+
+def test_least_recently_used_entries_are_evicted():
+    padding = "x" * 400 * 1024
+    for key in ("first", "second"):
+        result_cache.put(key, dict(RESULT, padding=padding))
+        age(key, 10 if key == "first" else 5)
+    # Reading "first" makes "second" the least recently used entry
+    assert result_cache.get("first") is not None
+    result_cache.put("third", dict(RESULT, padding=padding))
+
+    assert result_cache.get("second") is None
+    assert result_cache.get("first") is not None and result_cache.get("third") is not None
+
+def test_force_bypasses_cached_result(monkeypatch):
+    monkeypatch.setattr(jobs, "_jobs", {})
+    monkeypatch.setattr(jobs, "_active_jobs", {})
+    monkeypatch.setattr(jobs, "_queues", OrderedDict())
+    monkeypatch.setattr(jobs, "_schedule", None)
+    monkeypatch.setattr(jobs, "_start_workers", lambda: None)
+    package = io.BytesIO(b"package")
+    package.name = "orders.zip"
+    options = {"generate_mappings": True}
+    result_cache.put(result_cache.make_key(api_helpers.hash_upload(package), options), RESULT)
+
+    cached = jobs.get_job(jobs.submit_job(package, options))
+    assert cached["status"] == "completed" and cached["result"]["cached"]
+    forced = jobs.get_job(jobs.submit_job(package, options, force=True))
+    assert forced["status"] == "queued"
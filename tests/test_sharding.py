@@ -0,0 +1,104 @@
+import json
+import zipfile
+
+import pytest
+
+import api_helpers
+import config
+import json_stream
+import sharding
+
+NODE = '<Values version="2.0"><value name="node_type">service</value><value name="svc_type">flow</value><value name="node_nsName">{name}</value></Values>'
+FLOW = '<FLOW VERSION="3.0"><SEQUENCE>{invokes}</SEQUENCE></FLOW>'
+INVOKE = '<INVOKE SERVICE="{callee}"/>'
+
+@pytest.fixture(autouse=True)
+def settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SHARD_SERVICES", 10)
+    monkeypatch.setattr(config, "SHARD_PARALLELISM", 4)
+    monkeypatch.setattr(config, "RESPONSE_SPOOL_DIR", str(tmp_path / "responses"))
+
+def write_package(path, calls):
+    # calls maps each service of the folder "app" to the services it invokes
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("App/manifest.v3", "<Values/>")
+        for service, callees in calls.items():
+            name = f"app:{service}"
+            archive.writestr(f"App/ns/app/{service}/node.ndf", NODE.format(name=name))
+            invokes = "".join(INVOKE.format(callee=f"app:{callee}") for callee in callees)
+            archive.writestr(f"App/ns/app/{service}/flow.xml", FLOW.format(invokes=invokes))
+
+def plan(tmp_path, calls):
+    path = tmp_path / "App.zip"
+    write_package(path, calls)
+    with api_helpers.PackageFile(str(path)) as package:
+        return sharding.plan_shards(package)
+
+def shard_of(result):
+    return {name: index for index, shard in enumerate(result["shards"]) for name in shard["names"]}
+
+def test_small_packages_are_not_split(tmp_path):
+    assert plan(tmp_path, {f"s{i}": [] for i in range(10)}) is None
+
+def test_independent_services_are_spread_over_shards(tmp_path):
+    result = plan(tmp_path, {f"s{i:02d}": [] for i in range(40)})
+    assert len(result["shards"]) == 4
+    assert sorted(shard["services"] for shard in result["shards"]) == [10, 10, 10, 10]
+
+def test_cycle_larger_than_a_shard_is_kept_together(tmp_path):
+    # A ring of 15 services, called by a chain of 15 more: one group, three shards' worth
+    calls = {f"ring{i:02d}": [f"ring{(i + 1) % 15:02d}"] for i in range(15)}
+    calls.update({f"chain{i:02d}": [f"chain{i + 1:02d}" if i < 14 else "ring00"] for i in range(15)})
+    result = plan(tmp_path, calls)
+    shards = shard_of(result)
+
+    assert len(shards) == 30
+    assert len({shards[f"app:ring{i:02d}"] for i in range(15)}) == 1
+    assert len(result["shards"]) > 1
+
+def test_group_is_cut_only_between_components(tmp_path):
+    # Five cycles of three services each, calling the next cycle
+    calls = {}
+    for cycle in range(5):
+        for i in range(3):
+            callees = [f"c{cycle}s{(i + 1) % 3}"]
+            if i == 0 and cycle < 4:
+                callees.append(f"c{cycle + 1}s0")
+            calls[f"c{cycle}s{i}"] = callees
+    result = plan(tmp_path, calls)
+    shards = shard_of(result)
+
+    for cycle in range(5):
+        assert len({shards[f"app:c{cycle}s{i}"] for i in range(3)}) == 1
+
+def spool(tmp_path, name, value):
+    path = tmp_path / name
+    path.write_text(json.dumps(value))
+    return {json_stream.SPOOLED_KEY: str(path), "size": path.stat().st_size}
+
+def read(value):
+    with open(value[json_stream.SPOOLED_KEY], encoding="utf-8") as f:
+        return json.load(f)
+
+def test_merge_concatenates_lists_and_adds_counts():
+    merged = sharding.merge_shard_results(
+        [{"data": {"pipelines": [1, 2], "convertedServices": 2, "conversionRate": 100}},
+         {"data": {"pipelines": [3], "convertedServices": 1, "conversionRate": 70}}],
+        [2, 1]
+    )["data"]
+    assert merged == {"pipelines": [1, 2, 3], "convertedServices": 3, "conversionRate": 90}
+
+def test_merge_concatenates_spooled_lists(tmp_path):
+    merged = sharding.merge_shard_results(
+        [{"data": {"pipelines": spool(tmp_path, "a.json", [1, 2])}}, {"data": {"pipelines": [3]}}],
+        [2, 1]
+    )["data"]
+    assert read(merged["pipelines"]) == [1, 2, 3]
+
+def test_merge_combines_spooled_objects_by_key(tmp_path):
+    merged = sharding.merge_shard_results(
+        [{"data": {"services": spool(tmp_path, "a.json", {"a": 1, "b": 2})}},
+         {"data": {"services": {"b": 20, "c": 3}}}],
+        [2, 2]
+    )["data"]
+    assert read(merged["services"]) == {"a": 1, "b": 20, "c": 3}
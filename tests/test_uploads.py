@@ -0,0 +1,82 @@
+import gc
+import io
+import os
+
+import pytest
+
+import config
+import uploads
+
+class Upload(io.BytesIO):
+    name = "orders.zip"
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "UPLOAD_IDLE_TIMEOUT_SECONDS", 60)
+    # The reaper is driven by the tests
+    monkeypatch.setattr(uploads, "start_reaper", lambda: None)
+    monkeypatch.setattr(uploads, "_sessions", {})
+    monkeypatch.setattr(uploads, "_pins", {})
+    return tmp_path
+
+def later(seconds=120):
+    return uploads.time.time() + seconds
+
+def test_spool_names_file_by_content(spool_dir):
+    reference = uploads.spool_upload(Upload(b"package"))
+    assert os.path.basename(reference["path"]) == f"{reference['sha256']}.zip"
+    assert reference["size"] == 7
+    assert uploads.spool_upload(Upload(b"package")) == reference
+    assert os.listdir(spool_dir) == [os.path.basename(reference["path"])]
+
+def test_files_of_active_sessions_are_kept():
+    reference = uploads.spool_upload(Upload(b"package"), "session")
+    uploads.touch_session("session", reference)
+    assert uploads.reap_idle_sessions(now=later(30)) == {"sessions": 0, "files": 0}
+    assert os.path.exists(reference["path"])
+
+def test_idle_sessions_are_forgotten_and_their_files_deleted():
+    reference = uploads.spool_upload(Upload(b"package"), "session")
+    assert uploads.reap_idle_sessions(now=later()) == {"sessions": 1, "files": 1}
+    assert not os.path.exists(reference["path"])
+    assert uploads.open_upload(reference) is None
+
+def test_released_file_is_deleted_once_old_enough():
+    reference = uploads.spool_upload(Upload(b"package"), "session")
+    uploads.release_session("session")
+    # Not before the idle timeout, so a fresh upload survives until its session reports in
+    assert uploads.reap_idle_sessions()["files"] == 0
+    os.utime(reference["path"], (0, 0))
+    assert uploads.reap_idle_sessions()["files"] == 1
+
+def test_file_shared_by_two_sessions_is_kept_for_the_other():
+    reference = uploads.spool_upload(Upload(b"package"), "first")
+    uploads.spool_upload(Upload(b"package"), "second")
+    uploads.release_session("first")
+    os.utime(reference["path"], (0, 0))
+    assert uploads.reap_idle_sessions()["files"] == 0
+
+def test_pinned_file_is_kept_until_package_is_released():
+    reference = uploads.spool_upload(Upload(b"package"))
+    package = uploads.open_upload(reference, pin=True)
+    assert uploads.reap_idle_sessions(now=later())["files"] == 0
+    assert package.read() == b"package"
+
+    package.close()
+    del package
+    gc.collect()
+    assert uploads.reap_idle_sessions(now=later())["files"] == 1
+
+@pytest.mark.parametrize("mapped", [True, False])
+def test_readers_of_open_package_survive_deletion(spool_dir, monkeypatch, mapped):
+    monkeypatch.setattr(config, "MMAP_UPLOADS", mapped)
+    reference = uploads.spool_upload(Upload(b"package contents"))
+    with uploads.open_upload(reference) as package:
+        os.remove(reference["path"])
+        first, second = package.open_reader(), package.open_reader()
+        assert first.read(7) == b"package"
+        assert second.read() == b"package contents"
+        assert first.read() == b" contents"
+        first.close()
+        second.close()
@@ -0,0 +1,196 @@
+# Upload spooling for the Web Methods to SnapLogic Migration Accelerator
+#
+# st.file_uploader keeps an uploaded ZIP in process memory for as long as
+# the widget holds it. The app copies every upload to a file named after its
+# SHA-256 right away, keeps only a small reference in session state and
+# resets the widget, which lets Streamlit drop the bytes. From then on the
+# package is read through a memory map (api_helpers.PackageFile).
+#
+# Sessions report themselves on every rerun. A reaper thread forgets sessions
+# that have been idle for UPLOAD_IDLE_TIMEOUT_SECONDS and deletes the spooled
+# files no remaining session refers to, so closed browser tabs do not keep
+# packages on disk. Two sessions uploading the same package share one file.
+# Packages opened with pin=True, such as those of a batch, are kept until
+# their jobs are done with them, however long they wait in the queue.
+import hashlib
+import os
+import threading
+import time
+import weakref
+
+import api_helpers
+import config
+
+# Reentrant, as a pin can be released by garbage collection while the lock is held
+_lock = threading.RLock()
+_sessions = {}
+# Path of every pinned file mapped to the number of open packages pinning it
+_pins = {}
+_reaper = None
+
+def spool_upload(uploaded_file, session_id=None):
+    """
+    Copy an uploaded file to the upload spool, hashing it on the way
+
+    Args:
+        uploaded_file: The file uploaded by the user
+        session_id: Session that keeps the file alive, or None if the
+            caller references it some other way until it is reaped
+
+    Returns:
+        dict: Reference with the path, file name, size and SHA-256 of the upload
+    """
+    os.makedirs(config.UPLOAD_SPOOL_DIR, exist_ok=True)
+    temp_path = os.path.join(config.UPLOAD_SPOOL_DIR, f"upload-{threading.get_ident()}-{time.time_ns()}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    uploaded_file.seek(0)
+    with open(temp_path, "wb") as f:
+        while True:
+            chunk = uploaded_file.read(config.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+    uploaded_file.seek(0)
+
+    sha256 = digest.hexdigest()
+    path = os.path.join(config.UPLOAD_SPOOL_DIR, f"{sha256}.zip")
+    with _lock:
+        if os.path.exists(path):
+            # Already spooled by another session; refresh it so the reaper's grace period starts over
+            os.remove(temp_path)
+            os.utime(path)
+        else:
+            os.replace(temp_path, path)
+        reference = {"path": path, "name": uploaded_file.name, "size": size, "sha256": sha256}
+        if session_id is not None:
+            _sessions[session_id] = {"upload": reference, "last_seen": time.time()}
+    start_reaper()
+    return reference
+
+def open_upload(reference, pin=False):
+    """
+    Open a spooled upload for reading
+
+    Args:
+        reference: Reference returned by spool_upload
+        pin: Keep the file, whatever its session does, until the returned
+            package is no longer referenced, e.g. once the job migrating it
+            has finished
+
+    Returns:
+        api_helpers.PackageFile: Memory-mapped package with the original file
+            name, or None if the file has been reaped
+    """
+    try:
+        package = api_helpers.PackageFile(
+            reference["path"], reference["name"],
+            mapped=config.MMAP_UPLOADS,
+            sha256=reference["sha256"]
+        )
+    except OSError:
+        return None
+    if pin:
+        path = reference["path"]
+        with _lock:
+            _pins[path] = _pins.get(path, 0) + 1
+        weakref.finalize(package, _unpin, path)
+    return package
+
+def touch_session(session_id, reference=None):
+    """
+    Record that a session is still active, keeping its upload alive
+
+    Args:
+        session_id: Id of the browser session
+        reference: The session's current upload reference, or None if it has none
+    """
+    with _lock:
+        _sessions[session_id] = {"upload": reference, "last_seen": time.time()}
+
+def release_session(session_id):
+    """
+    Drop the upload of a session, e.g. when the user removes the file
+
+    The file is deleted by the next reaper pass unless another session uses it.
+
+    Args:
+        session_id: Id of the browser session
+    """
+    with _lock:
+        session = _sessions.get(session_id)
+        if session is not None:
+            session["upload"] = None
+
+def reap_idle_sessions(now=None):
+    """
+    Forget idle sessions and delete the spooled files nobody refers to
+
+    Files are only deleted once they are older than the idle timeout, so an
+    upload is never removed between being spooled and its session reporting in.
+    On systems that do not allow deleting open files, a file still read by a
+    running migration is retried on the next pass.
+
+    Args:
+        now: Current time, for tests
+
+    Returns:
+        dict: Number of sessions forgotten and files deleted
+    """
+    now = time.time() if now is None else now
+    cutoff = now - config.UPLOAD_IDLE_TIMEOUT_SECONDS
+    with _lock:
+        idle = [session_id for session_id, session in _sessions.items() if session["last_seen"] < cutoff]
+        for session_id in idle:
+            del _sessions[session_id]
+        referenced = {
+            os.path.basename(session["upload"]["path"])
+            for session in _sessions.values() if session["upload"]
+        }
+        referenced.update(os.path.basename(path) for path in _pins)
+
+        removed = 0
+        try:
+            entries = list(os.scandir(config.UPLOAD_SPOOL_DIR))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.name in referenced:
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+    return {"sessions": len(idle), "files": removed}
+
+def start_reaper():
+    """
+    Start the idle-session reaper on a background thread, once per process
+
+    Returns:
+        threading.Thread: The reaper thread
+    """
+    global _reaper
+    with _lock:
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap_forever, name="upload-reaper", daemon=True)
+            _reaper.start()
+    return _reaper
+
+def _unpin(path):
+    with _lock:
+        count = _pins.pop(path, 0) - 1
+        if count > 0:
+            _pins[path] = count
+
+def _reap_forever():
+    while True:
+        time.sleep(config.UPLOAD_REAPER_INTERVAL_SECONDS)
+        try:
+            reap_idle_sessions()
+        except Exception as e:
+            print(f"Upload reaper failed: {str(e)}")
@@ -0,0 +1,140 @@
+# Command-line entry point for the Web Methods to SnapLogic Migration Accelerator
+#
+# Runs the same validation and submission path as the Streamlit app without
+# starting or importing Streamlit, and prints machine-readable JSON:
+#
+#   python -m wmtosl migrate pkg.zip [more.zip | packages_dir ...]
+#   python -m wmtosl validate pkg.zip
+#   python -m wmtosl index pkg.zip
+#   python -m wmtosl export <artifacts id> pipelines.zip
+#
+# Settings come from the environment (SNAPLOGIC_API_ENDPOINT,
+# SNAPLOGIC_API_TOKEN) or from a KEY=VALUE file passed with --config.
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="wmtosl",
+        description="Migrate Web Methods packages to SnapLogic without the browser UI."
+    )
+    parser.add_argument("--config", help="KEY=VALUE settings file (defaults to .env)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Validate and migrate packages")
+    migrate_parser.add_argument("paths", nargs="+", help="Package ZIP files or directories containing them")
+    migrate_parser.add_argument("--force", action="store_true", help="Ignore cached results and previous migrations")
+    migrate_parser.add_argument("--workers", type=int, help="Number of packages migrated at the same time")
+    migrate_parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+
+    validate_parser = subparsers.add_parser("validate", help="Check packages without uploading them")
+    validate_parser.add_argument("paths", nargs="+", help="Package ZIP files or directories containing them")
+
+    index_parser = subparsers.add_parser("index", help="Summarize the contents of a package")
+    index_parser.add_argument("path", help="Package ZIP file")
+
+    export_parser = subparsers.add_parser("export", help="Write the generated pipelines of a migration to a ZIP")
+    export_parser.add_argument("artifact_id", help="The artifacts id from a migrate report")
+    export_parser.add_argument("path", help="ZIP file to write")
+    return parser
+
+def run_migrate(args):
+    import api_helpers
+    import batch
+    import config
+
+    if not config.API_ENDPOINT or not config.API_BEARER_TOKEN:
+        return {"success": False, "error": "SNAPLOGIC_API_ENDPOINT and SNAPLOGIC_API_TOKEN must be set"}, 2
+
+    if args.workers:
+        config.JOB_WORKERS = args.workers
+        config.BACKEND_MAX_CONCURRENCY = args.workers
+
+    packages = batch.collect_packages(args.paths)
+    if not packages:
+        return {"success": False, "error": "No packages found"}, 2
+
+    batch_id = batch.submit_batch(packages, api_helpers.get_migration_options(), force=args.force)
+    state = batch.wait_for_batch(batch_id, poll_interval=0.2, include_results=True)
+    failed = [row for row in state["rows"] if row["status"] != "completed"]
+    report = {
+        "success": not failed,
+        "elapsed_s": state["elapsed_s"],
+        "counts": state["counts"],
+        "packages": state["rows"],
+    }
+    return report, 1 if failed else 0
+
+def run_validate(args):
+    import api_helpers
+    import batch
+
+    rows = []
+    for path in batch.collect_packages(args.paths):
+        with api_helpers.PackageFile(path) as package:
+            is_valid, error_message = api_helpers.validate_file(package)
+        rows.append({"package": path, "valid": is_valid, "error": error_message or None})
+    invalid = [row for row in rows if not row["valid"]]
+    return {"success": not invalid, "packages": rows}, 1 if invalid else 0
+
+def run_index(args):
+    import config
+    import dependency_graph
+    import package_index
+
+    index = package_index.index_package(args.path)
+    report = {
+        "success": True,
+        "package_name": index["package_name"],
+        "manifest": index["manifest"],
+        "entry_count": index["entry_count"],
+        "uncompressed_size": index["uncompressed_size"],
+        "unreadable_entries": index["unreadable_entries"],
+        "summary": index["summary"],
+    }
+    if config.ENABLE_DEPENDENCY_ANALYSIS:
+        report["dependencies"] = dependency_graph.summarize_graph(dependency_graph.build_graph(index))
+    return report, 0
+
+def run_export(args):
+    import artifacts
+
+    with open(args.path, "wb") as f:
+        result = artifacts.write_zip(args.artifact_id, f)
+    if not result["success"]:
+        os.remove(args.path)
+        return result, 1
+    return dict(result, path=args.path), 0
+
+COMMANDS = {
+    "migrate": run_migrate,
+    "validate": run_validate,
+    "index": run_index,
+    "export": run_export,
+}
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.config:
+        os.environ["WMTOSL_CONFIG"] = args.config
+
+    # Keep stdout clean for the JSON report; diagnostic prints go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            report, exit_code = COMMANDS[args.command](args)
+        except Exception as e:
+            report, exit_code = {"success": False, "error": str(e)}, 2
+
+    output = json.dumps(report, indent=2, default=str)
+    if getattr(args, "output", None):
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())